@@ -28,6 +28,7 @@ setup(
     url='',
     download_url='',
     license='Mozilla Public License Version 2.0',
+    python_requires=">=3.7",
     install_requires=requirements,
     dependency_links=dependency_links,
     package_dir={'': "src"},
@@ -39,8 +40,8 @@ setup(
     },
     classifiers=[
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Education",
         "Intended Audience :: Information Technology",
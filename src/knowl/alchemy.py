@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Helper functions working directly with the tables of the RDFLib-SQLAlchemy store.
+These bypass the per-triple machinery of the store (event dispatching, one transaction per call)
+but generate exactly the same rows as the store itself would.
+"""
+
+from contextlib import nullcontext
+
+from knowl.loader import batched, DEFAULT_BATCH_SIZE
+from rdflib import Literal
+from rdflib.namespace import RDF
+from rdflib_sqlalchemy.constants import COUNT_SELECT, TRIPLE_SELECT_NO_ORDER
+from rdflib_sqlalchemy.sql import union_select
+from rdflib_sqlalchemy.termutils import extract_triple
+from sqlalchemy import event
+from sqlalchemy.sql import bindparam, expression, functions
+from sqlalchemy.sql.expression import tuple_
+
+STATEMENT_TABLES = ["asserted_statements", "type_statements", "literal_statements"]
+
+
+def insertTriples(store, triples, context, connection, batchSize: int = DEFAULT_BATCH_SIZE):
+    """Inserts triples into the store tables using multi-row "executemany" statements.
+    Already existing triples are ignored (same as with the store's addN method).
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+        An opened store
+    triples : Iterable
+        (s, p, o) triples to be inserted
+    context : rdflib.Graph
+        The graph (context) the triples belong to
+    connection : sqlalchemy.engine.Connection
+        Connection with an active transaction
+    batchSize : int, optional
+        Maximum number of rows per "executemany" call, by default DEFAULT_BATCH_SIZE
+
+    Returns
+    -------
+    int
+        Number of processed triples (including the ones that already existed)
+    """
+    count = 0
+    for batch in batched(triples, batchSize):
+        commands = {}
+        for triple in batch:
+            commandType, statement, params = store._get_build_command(tuple(triple), context)
+            command = commands.setdefault(commandType, (statement, []))
+            command[1].append(params)
+        for statement, params in commands.values():
+            connection.execute(store._add_ignore_on_conflict(statement), params)
+        count += len(batch)
+    return count
+
+
+def removeTriples(store, pattern: tuple, context, connection):
+    """Removes triples matching the pattern from the store tables.
+    Mirrors the logic of the store's remove method but uses the provided connection,
+    thus multiple removals can be performed within a single transaction.
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+        An opened store
+    pattern : tuple
+        (s, p, o) pattern, None matches anything
+    context : rdflib.Graph
+        The graph (context) the triples belong to
+    connection : sqlalchemy.engine.Connection
+        Connection with an active transaction
+
+    Returns
+    -------
+    int
+        Number of deleted rows (if reported by the database driver)
+    """
+    subject, predicate, obj = pattern
+    assertedTable = store.tables["asserted_statements"]
+    typeTable = store.tables["type_statements"]
+    literalTable = store.tables["literal_statements"]
+
+    deleted = 0
+    if predicate is None or predicate != RDF.type:
+        if not store.STRONGLY_TYPED_TERMS or isinstance(obj, Literal):
+            clause = store.build_clause(literalTable, subject, predicate, obj, context)
+            deleted += connection.execute(literalTable.delete(clause)).rowcount
+        if not isinstance(obj, Literal):
+            clause = store.build_clause(assertedTable, subject, predicate, obj, context)
+            deleted += connection.execute(assertedTable.delete(clause)).rowcount
+    if predicate is None or predicate == RDF.type:
+        clause = store.build_clause(typeTable, subject, RDF.type, obj, context, True)
+        deleted += connection.execute(typeTable.delete(clause)).rowcount
+    return deleted
+
+
+def removePatterns(store, patterns, context, connection, batchSize: int = DEFAULT_BATCH_SIZE):
+    """Removes triples matching any of the patterns. The patterns are grouped by their shape
+    (which of the subject, predicate and object are given) and each group is removed with
+    a single parametrized DELETE statement per table ("executemany"). Patterns with literal
+    objects are removed one by one (see removeTriples).
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+        An opened store
+    patterns : Iterable
+        (s, p, o) patterns, None matches anything
+    context : rdflib.Graph
+        The graph (context) the triples belong to
+    connection : sqlalchemy.engine.Connection
+        Connection with an active transaction
+    batchSize : int, optional
+        Maximum number of parameter sets per "executemany" call, by default DEFAULT_BATCH_SIZE
+
+    Returns
+    -------
+    int
+        Number of deleted rows (if reported by the database driver)
+    """
+    assertedTable = store.tables["asserted_statements"]
+    typeTable = store.tables["type_statements"]
+    literalTable = store.tables["literal_statements"]
+
+    deleted = 0
+    groups = {}
+    for pattern in patterns:
+        subject, predicate, obj = pattern
+        if isinstance(obj, Literal):  # the datatype and the language make the conditions differ
+            deleted += removeTriples(store, pattern, context, connection)
+            continue
+        kind = None if predicate is None else predicate == RDF.type
+        groups.setdefault((subject is None, kind, obj is None), []).append(pattern)
+
+    for (anySubject, kind, anyObject), group in groups.items():
+        tables = []
+        if kind is not True:
+            if not store.STRONGLY_TYPED_TERMS or anyObject:
+                tables.append((literalTable, "subject", "predicate", "object"))
+            tables.append((assertedTable, "subject", "predicate", "object"))
+        if kind is not False:
+            tables.append((typeTable, "member", None, "klass"))
+        for table, subjectColumn, predicateColumn, objectColumn in tables:
+            columns = [(i, column) for i, column, wildcard in ((0, subjectColumn, anySubject), (1, predicateColumn, kind is None),
+                                                               (2, objectColumn, anyObject)) if column is not None and not wildcard]
+            clause = [table.c[column] == bindparam(f"b_{column}") for _, column in columns]
+            clause.append(table.c.context == context.identifier)
+            statement = table.delete().where(expression.and_(*clause))
+            if not columns:  # nothing to bind, e.g. (None, None, None)
+                deleted += connection.execute(statement).rowcount
+                continue
+            for batch in batched(group, batchSize):
+                params = [{f"b_{column}": pattern[i] for i, column in columns} for pattern in batch]
+                deleted += connection.execute(statement, params).rowcount
+    return deleted
+
+
+def containedPatterns(store, patterns: list, context, batchSize: int = 1000) -> set:
+    """Checks which of the patterns match at least one triple. Similar to removePatterns, the patterns are grouped
+    by their shape and each group is checked with a single SELECT statement per table and chunk of patterns
+    (the given parts of the patterns are looked up in an IN list). Patterns with literal objects are checked
+    one by one (the store's triples method).
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+        An opened store
+    patterns : list
+        (s, p, o) patterns, None matches anything
+    context : rdflib.Graph
+        The graph (context) of the triples
+    batchSize : int, optional
+        Maximum number of patterns in a single IN list, by default 1000
+
+    Returns
+    -------
+    set
+        Indices of the patterns matching at least one triple
+    """
+    assertedTable = store.tables["asserted_statements"]
+    typeTable = store.tables["type_statements"]
+    literalTable = store.tables["literal_statements"]
+
+    found = set()
+    groups = {}
+    for index, (subject, predicate, obj) in enumerate(patterns):
+        if isinstance(obj, Literal):  # the datatype and the language make the conditions differ
+            if next(store.triples((subject, predicate, obj), context), None) is not None:
+                found.add(index)
+            continue
+        kind = None if predicate is None else predicate == RDF.type
+        groups.setdefault((subject is None, kind, obj is None), []).append(index)
+
+    with store.engine.connect() as connection:
+        for (anySubject, kind, anyObject), group in groups.items():
+            tables = []
+            if kind is not True:
+                if not store.STRONGLY_TYPED_TERMS or anyObject:
+                    tables.append((literalTable, "subject", "predicate", "object"))
+                tables.append((assertedTable, "subject", "predicate", "object"))
+            if kind is not False:
+                tables.append((typeTable, "member", None, "klass"))
+            for table, subjectColumn, predicateColumn, objectColumn in tables:
+                group = [index for index in group if index not in found]
+                if not group:
+                    break
+                columns = [(i, column) for i, column, wildcard in ((0, subjectColumn, anySubject), (1, predicateColumn, kind is None),
+                                                                   (2, objectColumn, anyObject)) if column is not None and not wildcard]
+                contextClause = table.c.context == context.identifier
+                if not columns:  # e.g. (None, None, None), any row matches
+                    if connection.execute(expression.select([table.c.id]).where(contextClause).limit(1)).first() is not None:
+                        found.update(group)
+                    continue
+                selected = [table.c[column] for _, column in columns]
+                key = selected[0] if len(selected) == 1 else tuple_(*selected)
+                for batch in batched(group, batchSize):
+                    values = {}
+                    for index in batch:
+                        values.setdefault(tuple(str(patterns[index][i]) for i, _ in columns), []).append(index)
+                    inList = [k[0] for k in values] if len(selected) == 1 else list(values)
+                    query = expression.select(selected).where(expression.and_(contextClause, key.in_(inList))).distinct()
+                    for row in connection.execute(query):
+                        found.update(values.get(tuple(str(value) for value in row), ()))
+    return found
+
+
+def selectInstancesPage(store, classes: list, context, after=None, limit: int = 1000, predicates: list = None, allPredicates: bool = False):
+    """Retrieves one page of instances of the classes (i.e., members of the rdf:type table),
+    ordered by their identifiers, optionally together with their properties. Everything is retrieved
+    with a single SQL statement. The instances are paged using the "keyset" approach (i.e.,
+    the page starts after the last instance of the previous page), which is efficient even for huge classes.
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+        An opened store
+    classes : list
+        The classes whose instances should be retrieved
+    context : rdflib.Graph
+        The graph (context) of the triples
+    after : Identifier, optional
+        The last instance of the previous page, by default None (the first page)
+    limit : int, optional
+        Maximum number of instances in the page, by default 1000
+    predicates : list, optional
+        Properties of the instances to be retrieved as well, by default None
+    allPredicates : bool, optional
+        Retrieve all properties of the instances, by default False
+
+    Returns
+    -------
+    tuple
+        (list of instances, list of (s, p, o) triples with the requested properties)
+    """
+    typeTable = store.tables["type_statements"]
+    literalTable = store.tables["literal_statements"]
+    assertedTable = store.tables["asserted_statements"]
+    contextID = context.identifier
+    predicates = list(predicates or [])
+
+    pageClause = [typeTable.c.klass.in_(classes), typeTable.c.context == contextID]
+    if after is not None:
+        pageClause.append(typeTable.c.member > after)
+    page = expression.select([typeTable.c.member.label("member")]).where(expression.and_(*pageClause)) \
+        .distinct().order_by(typeTable.c.member).limit(limit).subquery("page")
+
+    def typeSelect(table, clause):
+        return expression.select([
+            table.c.id.label("id"), table.c.member.label("subject"),
+            expression.literal(str(RDF.type)).label("predicate"), table.c.klass.label("object"),
+            table.c.context.label("context"), table.c.termComb.label("termcomb"),
+            expression.literal_column("NULL").label("objlanguage"), expression.literal_column("NULL").label("objdatatype")
+        ]).select_from(table.join(page, table.c.member == page.c.member)).where(clause)
+
+    selects = []
+    typeAlias = expression.alias(typeTable, "typetable")
+    if allPredicates or RDF.type in predicates:
+        selects.append(typeSelect(typeAlias, typeAlias.c.context == contextID))
+    else:
+        # only the membership rows
+        selects.append(typeSelect(typeAlias, expression.and_(typeAlias.c.klass.in_(classes), typeAlias.c.context == contextID)))
+
+    otherPredicates = [p for p in predicates if p != RDF.type]
+    if allPredicates or otherPredicates:
+        literal = expression.alias(literalTable, "literal")
+        asserted = expression.alias(assertedTable, "asserted")
+        for table, extraColumns in [(literal, [literal.c.objLanguage.label("objlanguage"), literal.c.objDatatype.label("objdatatype")]),
+                                    (asserted, [expression.literal_column("NULL").label("objlanguage"), expression.literal_column("NULL").label("objdatatype")])]:
+            clause = [table.c.context == contextID]
+            if not allPredicates:
+                clause.append(table.c.predicate.in_(otherPredicates))
+            selects.append(expression.select([
+                table.c.id.label("id"), table.c.subject.label("subject"), table.c.predicate.label("predicate"),
+                table.c.object.label("object"), table.c.context.label("context"), table.c.termComb.label("termcomb")
+            ] + extraColumns).select_from(table.join(page, table.c.subject == page.c.member)).where(expression.and_(*clause)))
+
+    query = expression.union_all(*selects).order_by(expression.literal_column("subject"))
+    with store.engine.connect() as connection:
+        rows = connection.execute(query).fetchall()
+
+    classes = set(classes)
+    members, triples, seen = [], [], set()
+    for row in rows:
+        _, s, p, o, _ = extract_triple(row, store, context)
+        if p == RDF.type and o in classes and s not in seen:
+            seen.add(s)
+            members.append(s)
+        if allPredicates or p in predicates:
+            triples.append((s, p, o))
+    return members, triples
+
+
+def countTriples(store, pattern: tuple, context) -> int:
+    """Counts the triples matching the pattern with a single COUNT statement
+    (the triples are not retrieved from the database).
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+        An opened store
+    pattern : tuple
+        (s, p, o) pattern, None matches anything
+    context : rdflib.Graph
+        The graph (context) of the triples
+
+    Returns
+    -------
+    int
+        Number of the matching triples
+    """
+    query = union_select(store._triples_helper(pattern, context), select_type=COUNT_SELECT)
+    with store.engine.connect() as connection:
+        return int(sum(row[0] for row in connection.execute(query)))
+
+
+def countInstances(store, classes: list, context) -> int:
+    """Counts the (distinct) instances of the classes (members of the rdf:type table) with a single statement.
+    """
+    typeTable = store.tables["type_statements"]
+    query = expression.select([functions.count(typeTable.c.member.distinct())]) \
+        .where(expression.and_(typeTable.c.klass.in_(classes), typeTable.c.context == context.identifier))
+    with store.engine.connect() as connection:
+        return int(connection.execute(query).scalar())
+
+
+def secondaryIndexes(store):
+    """Returns the non-unique indexes of the statement tables. Unique indexes
+    are never listed, since those are required to ignore duplicate triples.
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+
+    Returns
+    -------
+    list of sqlalchemy.Index
+    """
+    return [index for name in STATEMENT_TABLES for index in store.tables[name].indexes if not index.unique]
+
+
+def dropIndexes(indexes, connection):
+    for index in indexes:
+        index.drop(bind=connection)
+
+
+def createIndexes(indexes, connection):
+    for index in indexes:
+        index.create(bind=connection)
+
+
+def configureSQLite(engine, pragmas: dict):
+    """Tunes the connections of a file-backed SQLite database. The PRAGMAs are applied
+    to each new connection. Transactions are started with "BEGIN IMMEDIATE", i.e. a writer
+    acquires the database lock at the start of the transaction (waiting up to "busy_timeout"
+    for other writers) instead of failing when upgrading a read lock. Readers never block
+    (in the WAL journal mode).
+    Connections opened before the call are discarded.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        Engine of the SQLite database
+    pragmas : dict
+        PRAGMA names and values, e.g. {"journal_mode": "WAL"}
+    """
+    @event.listens_for(engine, "connect")
+    def applyPragmas(dbapiConnection, connectionRecord):
+        dbapiConnection.isolation_level = None  # the transactions are started by the "begin" listener below
+        cursor = dbapiConnection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def beginImmediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    engine.dispose()
+
+
+def addStatementListener(engine, listener: callable):
+    """Registers a "before_cursor_execute" listener of the engine, i.e. a function called
+    before each SQL statement is sent to the database, with the arguments
+    (connection, cursor, statement, parameters, context, executemany).
+    """
+    if not event.contains(engine, "before_cursor_execute", listener):
+        event.listen(engine, "before_cursor_execute", listener)
+
+
+def removeStatementListener(engine, listener: callable):
+    if event.contains(engine, "before_cursor_execute", listener):
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def triplePages(store, pattern: tuple, context, pageSize: int, lock=None):
+    """Generates the triples matching the pattern in pages (lists) of at most "pageSize" triples.
+    The rows are streamed from the database (a server-side cursor, "stream_results"),
+    i.e. the whole result is never held in memory (unlike the store's triples method).
+    The connection is held until the generator is exhausted or closed.
+
+    Parameters
+    ----------
+    store : rdflib_sqlalchemy.store.SQLAlchemy
+        An opened store
+    pattern : tuple
+        (s, p, o) pattern, None matches anything
+    context : rdflib.Graph
+        The graph (context) the triples belong to
+    pageSize : int
+        Number of rows fetched at once
+    lock : optional
+        Lock held while executing the query and fetching each page (for a connection shared by threads), by default None
+
+    Yields
+    ------
+    list
+        (s, p, o) triples
+    """
+    lock = lock if lock is not None else nullcontext()
+    query = union_select(store._triples_helper(pattern, context), distinct=True, select_type=TRIPLE_SELECT_NO_ORDER)
+    with store.engine.connect() as connection:
+        with lock:
+            result = connection.execution_options(stream_results=True, max_row_buffer=pageSize).execute(query)
+        try:
+            while True:
+                with lock:
+                    rows = result.fetchmany(pageSize)
+                if not rows:
+                    break
+                yield [extract_triple(row, store, context)[1:4] for row in rows]
+        finally:
+            result.close()
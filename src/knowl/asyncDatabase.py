@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from rdflib.term import Identifier
+
+from knowl import DBConfig, OntologyDatabase
+
+
+class AsyncOntologyDatabase():
+    """Asyncio front-end of an OntologyDatabase. Mirrors the basic query and modification methods
+    of the OntologyDatabase as coroutines, thus independent lookups can run concurrently, e.g.:
+
+        adb = AsyncOntologyDatabase(config)
+        values = await asyncio.gather(*[adb.objects(entity, predicate) for entity in entities])
+
+    The operations of the wrapped database run in a bounded thread pool, i.e. they use the same
+    connection pools (keep-alive HTTP connections of the Fuseki store or pooled DB connections
+    of the SQLAlchemy store), retries, hooks and instrumentation as the synchronous calls.
+    The in-memory SQLite database has only a single connection, therefore the operations
+    are executed one by one in that case.
+
+    At most "concurrency" operations are in progress at the same time, the others wait.
+    Writes notify the change listeners (e.g. the read cache) of the wrapped database.
+    """
+
+    def __init__(self, database=None, concurrency: int = 10):
+        """
+        Parameters
+        ----------
+        database : OntologyDatabase, DBConfig or str, optional
+            An existing (set up) database or a configuration of a new one, by default None (default config)
+        concurrency : int, optional
+            Maximum number of concurrently executed operations, by default 10
+        """
+        if concurrency < 1:
+            raise ValueError(f"The concurrency limit must be a positive integer, got {concurrency}!")
+        if not isinstance(database, OntologyDatabase):
+            database = OntologyDatabase(DBConfig.factory(database), create=True)
+            database.setup()
+        self.__database = database
+        self.__concurrency = concurrency
+        self.__semaphore = None
+        self.__executor = None
+
+    @property
+    def database(self):
+        """The wrapped (synchronous) OntologyDatabase.
+        """
+        return self.__database
+
+    @property
+    def concurrency(self):
+        return self.__concurrency
+
+    def __limit(self):
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__concurrency)
+        return self.__semaphore
+
+    async def __run(self, func: callable, *args):
+        """Runs the (blocking) function in the thread pool.
+        """
+        if self.__executor is None:
+            workers = 1 if self.__database.singleConnection else self.__concurrency
+            self.__executor = ThreadPoolExecutor(workers, thread_name_prefix="knowl")
+        async with self.__limit():
+            return await asyncio.get_running_loop().run_in_executor(self.__executor, func, *args)
+
+    async def query(self, query: str, initNs: dict = None, initBindings: dict = None):
+        """Executes a SPARQL query, see OntologyDatabase.query.
+
+        Returns
+        -------
+        rdflib.query.Result
+            The (fully retrieved) result
+        """
+        def execute():
+            result = self.__database.query(query, initNs=initNs or {}, initBindings=initBindings or {})
+            if result.type == "SELECT":
+                result.bindings  # retrieves all the rows
+            return result
+
+        return await self.__run(execute)
+
+    async def update(self, update: str, initNs: dict = None):
+        """Executes a SPARQL update, see OntologyDatabase.update.
+        """
+        await self.__run(lambda: self.__database.update(update, initNs=initNs or {}))
+
+    async def triples(self, triple: tuple):
+        """Returns a list of triples matching the pattern, see OntologyDatabase.triples.
+        """
+        pattern = tuple(triple)
+        return await self.__run(lambda: list(self.__database.triples(pattern)))
+
+    async def objects(self, subject: Identifier = None, predicate: Identifier = None):
+        """Returns a list of objects matching the query, see OntologyDatabase.objects.
+        """
+        return [o for _, _, o in await self.triples((subject, predicate, None))]
+
+    async def add(self, triple: tuple):
+        """Adds a triple (s, p, o) into the database, see OntologyDatabase.add.
+        """
+        await self.addN([triple])
+
+    async def addN(self, triples: list):
+        """Adds the triples into the database, see OntologyDatabase.addN.
+        """
+        await self.__run(self.__database.addN, [tuple(t) for t in triples])
+
+    async def remove(self, triple: tuple):
+        """Removes the triples matching the pattern, see OntologyDatabase.remove.
+        """
+        await self.__run(self.__database.remove, tuple(triple))
+
+    async def close(self):
+        """Releases the worker threads (the wrapped database is not closed).
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+        self.__semaphore = None
@@ -0,0 +1,14 @@
+"""Performance benchmarks of knowl.
+
+A seeded synthetic ontology (see generator) is imported into the benchmarked store and
+the micro-benchmarks (single API operations, see micro) and macro workloads (mixes
+of the operations, see macro) are measured. The stores are the in-memory SQLite database
+and a local stand-in of a Fuseki server (see standin). The results are JSON documents,
+which can be compared with a stored baseline:
+
+    python -m knowl.benchmarks --output baseline.json
+    python -m knowl.benchmarks --baseline baseline.json  # fails if something got slower
+"""
+
+from .generator import generateOntology, writeNTriples
+from .runner import runBenchmarks, compareResults, saveResults, loadResults
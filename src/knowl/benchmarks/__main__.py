@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from knowl.benchmarks.macro import MACRO_WORKLOADS
+from knowl.benchmarks.micro import MICRO_BENCHMARKS
+from knowl.benchmarks.runner import STORES, runBenchmarks, compareResults, saveResults, loadResults
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m knowl.benchmarks", description="Runs the knowl benchmarks.")
+    parser.add_argument("--store", action="append", choices=STORES, help="Store to benchmark (repeatable), by default all")
+    parser.add_argument("--benchmark", action="append", choices=list(MICRO_BENCHMARKS) + list(MACRO_WORKLOADS),
+                        help="Benchmark or workload to run (repeatable), by default all")
+    parser.add_argument("--depth", type=int, default=3, help="Depth of the class hierarchy")
+    parser.add_argument("--branching", type=int, default=3, help="Number of subclasses of each class")
+    parser.add_argument("--instances", type=int, default=1000, help="Number of individuals")
+    parser.add_argument("--fan-out", type=int, default=4, help="Number of properties of each individual")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=200, help="Number of operations per repetition")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions")
+    parser.add_argument("--output", help="Path of the JSON file with the results (printed if not set)")
+    parser.add_argument("--baseline", help="Path of the baseline results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    selected = args.benchmark
+    results = runBenchmarks(args.store or STORES, args.depth, args.branching, args.instances, args.fan_out, args.seed,
+                            args.count, args.repeat,
+                            micro=None if selected is None else [name for name in selected if name in MICRO_BENCHMARKS],
+                            macro=None if selected is None else [name for name in selected if name in MACRO_WORKLOADS])
+    if args.output:
+        saveResults(results, args.output)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    for store, benchmarks in results["results"].items():
+        for name, result in benchmarks.items():
+            print(f"{store:8} {name:20} {result['median'] * 1000:10.2f} ms {result['opsPerSecond'] or 0:12.1f} ops/s", file=sys.stderr)
+
+    if args.baseline:
+        regressions = compareResults(results, loadResults(args.baseline), args.tolerance)
+        for store, name, reference, current, ratio in regressions:
+            print(f"REGRESSION {store} {name}: {reference * 1000:.2f} ms -> {current * 1000:.2f} ms ({ratio:.2f}x)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
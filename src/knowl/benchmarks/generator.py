@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Seeded generator of synthetic ontologies.
+"""
+
+from collections import namedtuple
+import random
+
+from rdflib import Literal, Namespace, URIRef
+from rdflib.namespace import RDF, RDFS, OWL
+
+SyntheticOntology = namedtuple("SyntheticOntology", ["triples", "classes", "leaves", "instances", "dataProperties", "objectProperties"])
+SyntheticOntology.__doc__ = """A generated ontology.
+triples - list of all (s, p, o) triples
+classes - all classes, the root class first
+leaves - classes without subclasses (the instances belong to these)
+instances - the individuals
+dataProperties - properties with literal values
+objectProperties - properties linking the individuals
+"""
+
+
+def generateOntology(namespace: str, depth: int = 3, branching: int = 3, instances: int = 1000, fanOut: int = 4, seed: int = 0):
+    """Generates an ontology with a tree of classes and individuals of the leaf classes.
+    The same arguments always produce the same ontology.
+
+    Parameters
+    ----------
+    namespace : str
+        Namespace of the generated entities (use the base namespace of the database,
+        so that the properties can be accessed as OntoEntity attributes)
+    depth : int, optional
+        Depth of the class tree (0 means a single class), by default 3
+    branching : int, optional
+        Number of subclasses of each non-leaf class, by default 3
+    instances : int, optional
+        Number of individuals, by default 1000
+    fanOut : int, optional
+        Number of property values of each individual. There are "fanOut" data properties
+        and "fanOut" object properties, each individual gets "fanOut" randomly chosen ones, by default 4
+    seed : int, optional
+        Seed of the random generator, by default 0
+
+    Returns
+    -------
+    SyntheticOntology
+    """
+    rng = random.Random(seed)
+    ns = Namespace(namespace)
+    triples = []
+
+    root = ns["Class"]
+    classes, level = [root], [root]
+    triples.append((root, RDF.type, OWL.Class))
+    for _ in range(depth):
+        # subclasses are named after their parents, e.g. Class_0_2 is the third subclass of Class_0
+        level = [URIRef(f"{parent}_{i}") for parent in level for i in range(branching)]
+        for cls in level:
+            triples += [(cls, RDF.type, OWL.Class), (cls, RDFS.subClassOf, URIRef(cls.rsplit("_", 1)[0]))]
+        classes += level
+    leaves = level
+
+    dataProperties = [ns[f"value{i}"] for i in range(fanOut)]
+    objectProperties = [ns[f"link{i}"] for i in range(fanOut)]
+    triples += [(p, RDF.type, OWL.DatatypeProperty) for p in dataProperties]
+    triples += [(p, RDF.type, OWL.ObjectProperty) for p in objectProperties]
+
+    individuals = [ns[f"individual{i}"] for i in range(instances)]
+    properties = dataProperties + objectProperties
+    for individual in individuals:
+        triples.append((individual, RDF.type, rng.choice(leaves)))
+        for p in rng.sample(properties, min(fanOut, len(properties))):
+            if p in objectProperties:
+                triples.append((individual, p, rng.choice(individuals)))
+            elif rng.random() < 0.5:
+                triples.append((individual, p, Literal(rng.randrange(1000000))))
+            else:
+                triples.append((individual, p, Literal(f"text {rng.randrange(1000000)}")))
+    return SyntheticOntology(triples, classes, leaves, individuals, dataProperties, objectProperties)
+
+
+def writeNTriples(path: str, triples):
+    """Writes the triples into an N-Triples file (e.g., for OntologyDatabase.mergeFileIntoDB).
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        for s, p, o in triples:
+            file.write(f"{s.n3()} {p.n3()} {o.n3()} .\n")
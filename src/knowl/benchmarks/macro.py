@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Macro workloads - mixes of the micro-benchmark operations (see knowl.benchmarks.micro)
+resembling typical uses of the API.
+"""
+
+import random
+
+from knowl.benchmarks.micro import MICRO_BENCHMARKS
+
+# workload name -> {micro-benchmark name: relative frequency of its operations}
+MACRO_WORKLOADS = {
+    # an application browsing the ontology, e.g. rendering entity pages
+    "read_mostly": {"value": 40, "triples": 30, "entity_get": 20, "transitive_objects": 5, "set": 5},
+    # an application recording observations
+    "write_mostly": {"add": 40, "set": 25, "entity_set": 20, "makeEntity": 5, "value": 10},
+    # reasoning over the class hierarchy
+    "hierarchy": {"transitive_objects": 60, "triples": 30, "value": 10},
+}
+
+
+def workload(context, mix: dict, seed: int = 0):
+    """Builds an operation (see knowl.benchmarks.micro) performing a randomly chosen operation
+    of the mix. The sequence of the chosen operations only depends on the seed.
+
+    Parameters
+    ----------
+    context : knowl.benchmarks.micro.BenchmarkContext
+        The benchmark context
+    mix : dict
+        Micro-benchmark names and relative frequencies of their operations
+    seed : int, optional
+        Seed of the random choices, by default 0
+    """
+    names = list(mix)
+    operations = [MICRO_BENCHMARKS[name](context) for name in names]
+    rng = random.Random(seed)
+    choices = []
+
+    def operation(i):
+        while len(choices) <= i:
+            choices.append(rng.choices(range(len(names)), weights=[mix[name] for name in names])[0])
+        operations[choices[i]](i)
+
+    return operation
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Micro-benchmarks of single OntologyAPI operations.
+Each benchmark is a function taking a BenchmarkContext and returning an operation - a function
+of the operation index (0, 1, 2, ...), which performs a single call of the benchmarked method.
+Any preparation (e.g., creating the entities to be read) is done before the operation is returned,
+thus it is not included in the measured time.
+"""
+
+from itertools import count
+
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDF, RDFS
+
+
+class BenchmarkContext():
+    """The database and the (already loaded) synthetic ontology the benchmarks work with.
+    """
+
+    def __init__(self, onto, ontology, namespace: str):
+        self.onto = onto
+        self.ontology = ontology
+        self.ns = Namespace(namespace)
+
+    def instance(self, i: int):
+        """The i-th individual (the individuals are visited round-robin).
+        """
+        instances = self.ontology.instances
+        return instances[i * 7919 % len(instances)]  # a prime stride spreads the accesses over the data
+
+    def leaf(self, i: int):
+        leaves = self.ontology.leaves
+        return leaves[i % len(leaves)]
+
+    def dataProperty(self, i: int):
+        properties = self.ontology.dataProperties
+        return properties[i % len(properties)]
+
+
+def add(context):
+    predicate = context.ns["benchAdd"]
+    return lambda i: context.onto.add((context.instance(i), predicate, Literal(i)))
+
+
+def addN(context, batchSize: int = 100):
+    predicate = context.ns["benchAddN"]
+    return lambda i: context.onto.addN([(context.instance(i * batchSize + j), predicate, Literal(i)) for j in range(batchSize)])
+
+
+def triples(context):
+    return lambda i: list(context.onto.triples((context.instance(i), None, None)))
+
+
+def setValue(context):
+    predicate = context.ns["benchSet"]
+    return lambda i: context.onto.set((context.instance(i), predicate, Literal(i)))
+
+
+def value(context):
+    return lambda i: context.onto.value(context.instance(i), context.dataProperty(i))
+
+
+def transitive_objects(context):
+    return lambda i: list(context.onto.transitive_objects(context.leaf(i), RDFS.subClassOf))
+
+
+def _entities(context, size: int = 100):
+    """Creates proxies (OntoEntity) of some of the individuals.
+    """
+    onto = context.onto
+    return [onto.makeEntity(context.instance(i), {RDF.type: context.leaf(i)}) for i in range(size)]
+
+
+def entity_get(context):
+    entities = _entities(context)
+    name = str(context.dataProperty(0)).split("#")[-1]
+    return lambda i: getattr(entities[i % len(entities)], name)
+
+
+def entity_set(context):
+    entities = _entities(context)
+    return lambda i: setattr(entities[i % len(entities)], "benchAttribute", i)
+
+
+def makeEntity(context):
+    ns, onto = context.ns, context.onto
+    names = count()  # each call creates a new entity, even if the benchmark is repeated
+    return lambda i: onto.makeEntity(ns[f"benchEntity{next(names)}"], {RDF.type: context.leaf(i), context.dataProperty(i): Literal(i)})
+
+
+# name -> benchmark, in the order of execution (writes of one benchmark do not affect the reads of the others)
+MICRO_BENCHMARKS = {
+    "add": add,
+    "addN": addN,
+    "triples": triples,
+    "set": setValue,
+    "value": value,
+    "transitive_objects": transitive_objects,
+    "entity_get": entity_get,
+    "entity_set": entity_set,
+    "makeEntity": makeEntity,
+}
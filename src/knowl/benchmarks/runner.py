@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+from contextlib import contextmanager
+from statistics import median
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+
+from knowl import DBConfig, OntologyAPI
+from knowl.benchmarks.generator import generateOntology, writeNTriples
+from knowl.benchmarks.macro import MACRO_WORKLOADS, workload
+from knowl.benchmarks.micro import MICRO_BENCHMARKS, BenchmarkContext
+from knowl.benchmarks.standin import SPARQLStandIn
+
+logger = logging.getLogger(__name__)
+
+RESULTS_VERSION = 1
+STORES = ("memory", "fuseki")
+BASE_URL = "http://example.org/knowl-benchmark"
+
+
+@contextmanager
+def openDatabase(store: str):
+    """Opens an empty database of the given kind: "memory" (in-memory SQLite) or "fuseki" (a local stand-in,
+    see knowl.benchmarks.standin). The database is destroyed afterwards.
+    """
+    if store == "memory":
+        onto = OntologyAPI(DBConfig.getInMemoryConfig(baseURL=BASE_URL, namespaces={}))
+        try:
+            yield onto
+        finally:
+            onto.destroy("I know what I am doing")
+    elif store == "fuseki":
+        with SPARQLStandIn() as server:
+            onto = OntologyAPI(server.config(baseURL=BASE_URL, namespaces={}))
+            try:
+                yield onto
+            finally:
+                onto.destroy("I know what I am doing")
+    else:
+        raise ValueError(f"Unknown benchmark store {store}, use one of {STORES}!")
+
+
+def measure(operation: callable, count: int, repeat: int):
+    """Calls the operation "count" times (with indexes 0, 1, ...), "repeat" times in a row.
+
+    Returns
+    -------
+    list
+        Durations of the repetitions in seconds
+    """
+    times = []
+    for r in range(repeat):
+        start = time.perf_counter()
+        for i in range(r * count, (r + 1) * count):
+            operation(i)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _result(kind: str, ops: int, times: list):
+    middle = median(times)
+    return {"kind": kind, "ops": ops, "times": times, "median": middle, "opsPerSecond": ops / middle if middle > 0 else None}
+
+
+def runBenchmarks(stores=("memory",), depth: int = 3, branching: int = 3, instances: int = 1000, fanOut: int = 4,
+                  seed: int = 0, count: int = 200, repeat: int = 3, micro=None, macro=None) -> dict:
+    """Runs the benchmarks against each of the stores. The synthetic ontology (see generateOntology)
+    is imported with "mergeFileIntoDB" (measured as the "mergeFileIntoDB" benchmark), then each
+    micro-benchmark and macro workload performs "count" operations, "repeat" times.
+
+    Parameters
+    ----------
+    stores : Iterable[str], optional
+        The stores to benchmark, see openDatabase, by default ("memory",)
+    depth, branching, instances, fanOut, seed
+        Parameters of the synthetic ontology, see knowl.benchmarks.generator.generateOntology
+    count : int, optional
+        Number of operations per repetition, by default 200
+    repeat : int, optional
+        Number of repetitions (the median duration is reported), by default 3
+    micro : Iterable[str], optional
+        Names of the micro-benchmarks to run, by default None (all of them)
+    macro : Iterable[str], optional
+        Names of the macro workloads to run, by default None (all of them)
+
+    Returns
+    -------
+    dict
+        The results (JSON serializable), see saveResults
+    """
+    parameters = {"depth": depth, "branching": branching, "instances": instances, "fanOut": fanOut,
+                  "seed": seed, "count": count, "repeat": repeat}
+    namespace = BASE_URL + "#"
+    ontology = generateOntology(namespace, depth, branching, instances, fanOut, seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ontology.nt")
+        writeNTriples(path, ontology.triples)
+        for store in stores:
+            storeResults = results[store] = {}
+            with openDatabase(store) as onto:
+                start = time.perf_counter()
+                loaded = onto.mergeFileIntoDB(path)
+                storeResults["mergeFileIntoDB"] = _result("load", loaded, [time.perf_counter() - start])
+                context = BenchmarkContext(onto, ontology, namespace)
+                for name in (MICRO_BENCHMARKS if micro is None else micro):
+                    logger.info("Running %s on %s", name, store)
+                    storeResults[name] = _result("micro", count, measure(MICRO_BENCHMARKS[name](context), count, repeat))
+                for name in (MACRO_WORKLOADS if macro is None else macro):
+                    logger.info("Running the %s workload on %s", name, store)
+                    operation = workload(context, MACRO_WORKLOADS[name], seed)
+                    storeResults[name] = _result("macro", count, measure(operation, count, repeat))
+    return {
+        "version": RESULTS_VERSION,
+        "parameters": parameters,
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+
+
+def saveResults(results: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def loadResults(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compareResults(results: dict, baseline: dict, tolerance: float = 0.25):
+    """Compares the results with a baseline (e.g., results of the previous release).
+    Only the benchmarks present in both are compared, the results should come from runs
+    with the same parameters (on the same machine).
+
+    Parameters
+    ----------
+    results : dict
+        Results of runBenchmarks
+    baseline : dict
+        Baseline results
+    tolerance : float, optional
+        Allowed relative slowdown of the median duration, by default 0.25 (25 %)
+
+    Returns
+    -------
+    list
+        (store, benchmark, baseline median, median, ratio) of the benchmarks slower than allowed
+    """
+    if results["parameters"] != baseline["parameters"]:
+        logger.warning("The benchmark parameters differ from the baseline, the comparison is not meaningful")
+    regressions = []
+    for store, benchmarks in results["results"].items():
+        for name, result in benchmarks.items():
+            reference = baseline["results"].get(store, {}).get(name)
+            if reference is None or not reference["median"]:
+                continue
+            # compare the time per operation, the counts might differ (e.g., for the loads)
+            ratio = (result["median"] / result["ops"]) / (reference["median"] / reference["ops"])
+            if ratio > 1 + tolerance:
+                regressions.append((store, name, reference["median"], result["median"], ratio))
+    return regressions
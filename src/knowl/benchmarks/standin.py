@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Local stand-in of an Apache Jena Fuseki server, so that the "fuseki" store can be benchmarked
+(and tested) without a running server. The SPARQL queries and updates are evaluated by rdflib
+on an in-memory dataset, thus the absolute numbers differ from a real Fuseki server, but the
+number and the size of the HTTP round trips are the same.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape, quoteattr
+import threading
+
+from rdflib import BNode, Dataset, URIRef
+
+from knowl import DBConfig
+
+
+def _xmlTerm(node) -> str:
+    if isinstance(node, URIRef):
+        return f"<uri>{escape(node)}</uri>"
+    if isinstance(node, BNode):
+        return f"<bnode>{escape(node)}</bnode>"
+    if node.language:
+        attributes = f" xml:lang={quoteattr(node.language)}"
+    else:
+        attributes = f" datatype={quoteattr(node.datatype)}" if node.datatype else ""
+    return f"<literal{attributes}>{escape(str(node))}</literal>"
+
+
+def _xmlResults(result) -> bytes:
+    """Serializes the result in the SPARQL XML results format (rdflib writes falsy literals, e.g. 0, as empty).
+    """
+    parts = ['<?xml version="1.0" encoding="utf-8"?>\n<sparql xmlns="http://www.w3.org/2005/sparql-results#"><head>']
+    if result.type == "ASK":
+        parts.append(f"</head><boolean>{'true' if result.askAnswer else 'false'}</boolean></sparql>")
+        return "".join(parts).encode("utf-8")
+    parts.extend(f"<variable name={quoteattr(str(v))}/>" for v in result.vars)
+    parts.append("</head><results>")
+    for row in result.bindings:
+        bindings = "".join(f"<binding name={quoteattr(str(v))}>{_xmlTerm(node)}</binding>" for v, node in row.items() if node is not None)
+        parts.append(f"<result>{bindings}</result>")
+    parts.append("</results></sparql>")
+    return "".join(parts).encode("utf-8")
+
+
+class _SPARQLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # the headers and the body are written separately
+
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+            form = parse_qs(body)
+            params.update(form)
+            body = (form.get("query") or form.get("update") or [""])[0]
+        standIn = self.server.standIn
+        try:
+            if parts.path.endswith("/update"):
+                standIn.update(body)
+                self.__respond(200, b"", "text/plain")
+            else:
+                graphs = params.get("default-graph-uri")
+                xml = "application/sparql-results+xml" in self.headers.get("Accept", "")
+                data = standIn.query(body, graphs[0] if graphs else None, "xml" if xml else "json")
+                self.__respond(200, data, "application/sparql-results+xml" if xml else "application/sparql-results+json")
+        except Exception as e:
+            self.__respond(400, str(e).encode("utf-8"), "text/plain")
+
+    def __respond(self, status: int, data: bytes, contentType: str):
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SPARQLStandIn():
+    """SPARQL endpoint with the URL layout of Fuseki (/{database}/query and /{database}/update)
+    running in a background thread. Only SELECT and ASK queries are supported.
+
+        with SPARQLStandIn() as server:
+            onto = OntologyAPI(server.config(baseURL="http://example.org/onto"))
+    """
+
+    def __init__(self, database: str = "knowl", host: str = "127.0.0.1", port: int = 0):
+        self.__database = database
+        self.__dataset = Dataset(default_union=True)
+        self.__lock = threading.Lock()  # the memory store is not thread-safe
+        self.__server = ThreadingHTTPServer((host, port), _SPARQLHandler)
+        self.__server.daemon_threads = True
+        self.__server.standIn = self
+        self.__thread = None
+        self.queries = 0
+        self.updates = 0
+
+    @property
+    def host(self):
+        return self.__server.server_address[0]
+
+    @property
+    def port(self):
+        return self.__server.server_address[1]
+
+    @property
+    def dataset(self):
+        return self.__dataset
+
+    def config(self, **kwargs):
+        """Returns a DBConfig of a "fuseki" store connected to this server.
+        The keyword arguments are passed to the DBConfig.
+        """
+        kwargs.setdefault("username", "")  # no credentials needed
+        kwargs.setdefault("password", "")
+        return DBConfig(host=self.host, port=self.port, database=self.__database, store="fuseki", **kwargs)
+
+    def query(self, query: str, graph: str = None, format: str = "json") -> bytes:
+        with self.__lock:
+            self.queries += 1
+            target = self.__dataset if graph is None else self.__dataset.graph(URIRef(graph))
+            result = target.query(query)
+            if result.type not in ("SELECT", "ASK"):
+                raise ValueError(f"Unsupported query type {result.type}")
+            return _xmlResults(result) if format == "xml" else result.serialize(format=format)
+
+    def update(self, update: str):
+        with self.__lock:
+            self.updates += 1
+            self.__dataset.update(update)
+
+    def start(self):
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+from collections import OrderedDict
+from itertools import product
+import threading
+
+
+def patternsCompatible(a: tuple, b: tuple):
+    """Checks whether there can be a triple matching both patterns.
+    """
+    return all(x is None or y is None or x == y for x, y in zip(a, b))
+
+
+class TriplePatternCache():
+    """LRU cache of triple pattern query results. The key is an (s, p, o) pattern
+    (with None as the wildcard), the value is a tuple of all triples matching the pattern.
+
+    The size of the cache is bounded by the total number of cached triples (i.e., the memory
+    used by the cache is roughly proportional to "maxTriples"). Results bigger than the whole
+    cache are not cached at all.
+
+    The cache is meant to be registered as a change listener of the OntologyDatabase
+    (see OntologyDatabase.addChangeListener), which invalidates the affected entries on writes.
+    Only the entries whose pattern could match a written triple are invalidated.
+    The cache can be shared by multiple threads.
+    """
+
+    def __init__(self, maxTriples: int):
+        if maxTriples < 1:
+            raise ValueError(f"The cache size must be a positive integer, got {maxTriples}!")
+        self.__maxTriples = maxTriples
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__version = 0  # incremented on each invalidation, prevents caching of outdated results
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__invalidations = 0
+        self.__lock = threading.RLock()
+
+    def get(self, pattern: tuple):
+        """Returns the cached triples for the pattern or None if the pattern is not cached.
+        """
+        with self.__lock:
+            triples = self.__entries.get(pattern)
+            if triples is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+                self.__entries.move_to_end(pattern)
+            return triples
+
+    def put(self, pattern: tuple, triples, version: int = None):
+        """Stores the triples matching the pattern.
+
+        Parameters
+        ----------
+        pattern : tuple
+            (s, p, o) pattern
+        triples : Iterable
+            All the triples matching the pattern
+        version : int, optional
+            Value of the "version" property at the time the triples were retrieved.
+            If the cache was invalidated since then, the triples are not stored. By default None
+        """
+        with self.__lock:
+            if version is not None and version != self.__version:
+                return
+            triples = tuple(triples)
+            if len(triples) > self.__maxTriples:
+                return
+            if pattern in self.__entries:
+                self.__size -= len(self.__entries.pop(pattern))
+            while self.__entries and self.__size + len(triples) > self.__maxTriples:
+                _, evicted = self.__entries.popitem(last=False)
+                self.__size -= len(evicted)
+                self.__evictions += 1
+            self.__entries[pattern] = triples
+            self.__size += len(triples)
+
+    def fill(self, pattern: tuple, triples):
+        """Generates the triples and caches them if the whole result was consumed.
+        """
+        version = self.__version
+        collected = []
+        for triple in triples:
+            if collected is not None:
+                collected.append(triple)
+                if len(collected) > self.__maxTriples:
+                    collected = None
+            yield triple
+        if collected is not None:
+            self.put(pattern, collected, version)
+
+    @property
+    def version(self):
+        return self.__version
+
+    def __discard(self, pattern: tuple):
+        triples = self.__entries.pop(pattern, None)
+        if triples is not None:
+            self.__size -= len(triples)
+            self.__invalidations += 1
+
+    def triplesAdded(self, triples):
+        with self.__lock:
+            self.__version += 1
+            if not self.__entries:
+                return
+            for triple in triples:
+                # only patterns that are generalizations of the triple can be affected
+                for pattern in product(*((t, None) for t in triple)):
+                    self.__discard(pattern)
+
+    def triplesRemoved(self, pattern: tuple):
+        with self.__lock:
+            self.__version += 1
+            if not self.__entries:
+                return
+            if None not in pattern:
+                self.triplesAdded([pattern])
+                return
+            for key in [key for key in self.__entries if patternsCompatible(key, pattern)]:
+                self.__discard(key)
+
+    def reset(self):
+        with self.__lock:
+            self.__version += 1
+            self.__invalidations += len(self.__entries)
+            self.__entries.clear()
+            self.__size = 0
+
+    @property
+    def stats(self):
+        """Returns a dictionary with the cache statistics (hits, misses, hit rate, evictions,
+        invalidations, number of cached patterns and triples).
+        """
+        with self.__lock:
+            requests = self.__hits + self.__misses
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "hitRate": self.__hits / requests if requests > 0 else 0.0,
+                "evictions": self.__evictions,
+                "invalidations": self.__invalidations,
+                "patterns": len(self.__entries),
+                "triples": self.__size,
+                "maxTriples": self.__maxTriples,
+            }
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, pattern):
+        return pattern in self.__entries
+
+
+class PreparedQueryCache():
+    """LRU cache of prepared SPARQL queries (see OntologyDatabase.prepare). The key is
+    the query text and the namespaces used to resolve the prefixes of the query.
+    The cache can be shared by multiple threads.
+    """
+
+    def __init__(self, maxQueries: int):
+        if maxQueries < 1:
+            raise ValueError(f"The cache size must be a positive integer, got {maxQueries}!")
+        self.__maxQueries = maxQueries
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the prepared query or None if the query is not cached.
+        """
+        with self.__lock:
+            prepared = self.__entries.get(key)
+            if prepared is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+                self.__entries.move_to_end(key)
+            return prepared
+
+    def put(self, key, prepared):
+        with self.__lock:
+            self.__entries[key] = prepared
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__maxQueries:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def reset(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    @property
+    def stats(self):
+        """Returns a dictionary with the cache statistics (hits, misses, hit rate, evictions, number of cached queries).
+        """
+        with self.__lock:
+            requests = self.__hits + self.__misses
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "hitRate": self.__hits / requests if requests > 0 else 0.0,
+                "evictions": self.__evictions,
+                "queries": len(self.__entries),
+                "maxQueries": self.__maxQueries,
+            }
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
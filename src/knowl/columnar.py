@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Dictionary-encoded columnar in-memory triplestore.
+Each distinct term is stored only once (in the term dictionary) and the triples are
+stored as integer IDs in three sorted permutations (SPO, POS and OSP). Each permutation
+consists of three parallel arrays of unsigned 32-bit integers (the columns), thus a triple
+takes 36 bytes in the indexes. Triple pattern lookups are binary searches.
+"""
+
+from array import array
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain
+import threading
+
+from rdflib.store import Store
+from rdflib.term import URIRef
+
+ID_TYPECODE = "I"  # unsigned 32-bit integers
+DEFAULT_MERGE_THRESHOLD = 100000
+# column order of the permutations (indexes into the (s, p, o) triple)
+PERMUTATIONS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+
+class TermDictionary():
+    """Bidirectional mapping between RDF terms and integer IDs (assigned sequentially from 0).
+    """
+
+    def __init__(self, terms: list = None):
+        self.__terms = list(terms or [])
+        self.__ids = {term: i for i, term in enumerate(self.__terms)}
+
+    def id(self, term):
+        """Returns the ID of the term or None if the term is not in the dictionary.
+        """
+        return self.__ids.get(term)
+
+    def term(self, id: int):
+        return self.__terms[id]
+
+    def add(self, term) -> int:
+        """Returns the ID of the term, adding the term into the dictionary if necessary.
+        """
+        id = self.__ids.get(term)
+        if id is None:
+            id = len(self.__terms)
+            self.__terms.append(term)
+            self.__ids[term] = id
+        return id
+
+    def __len__(self):
+        return len(self.__terms)
+
+    def __iter__(self):
+        return iter(self.__terms)
+
+
+def _columnRange(column, value: int, lo: int, hi: int):
+    return bisect_left(column, value, lo, hi), bisect_right(column, value, lo, hi)
+
+
+class TripleIndex():
+    """A single sorted permutation of the triples, stored as three parallel columns of IDs.
+    The columns can be arrays or any other sequences of integers (e.g. memoryviews of a mapped file).
+    """
+
+    def __init__(self, order: tuple, columns: tuple = None):
+        self.order = order
+        self.columns = columns if columns is not None else tuple(array(ID_TYPECODE) for _ in range(3))
+
+    @classmethod
+    def build(cls, order: tuple, triples):
+        """Builds the index from (s, p, o) ID triples.
+        """
+        rows = sorted(tuple(triple[i] for i in order) for triple in triples)
+        return cls(order, tuple(array(ID_TYPECODE, (row[c] for row in rows)) for c in range(3)))
+
+    def merged(self, added, removed):
+        """Returns a new index with the (s, p, o) ID triples added and removed. Only the changes are sorted,
+        the existing rows are copied in slices around them (a linear merge), i.e. the cost is proportional
+        to the size of the index and not to its sorting. The added triples must not be in the index
+        and the removed ones must be in it.
+        """
+        events = []  # (row position, 0 = insert the row before the position or 1 = skip the row at the position, row)
+        for triple in removed:
+            lo, hi = self.range(tuple(triple[i] for i in self.order))
+            if lo < hi:
+                events.append((lo, 1, None))
+        for row in sorted(tuple(triple[i] for i in self.order) for triple in added):
+            events.append((self.range(row)[0], 0, row))  # the position of the first greater row
+        events.sort()
+        columns = tuple(array(ID_TYPECODE) for _ in range(3))
+        start = 0
+        for position, skip, row in events:
+            if position > start:
+                for column, source in zip(columns, self.columns):
+                    column.extend(source[start:position])
+                start = position
+            if skip:
+                start = position + 1
+            else:
+                for column, value in zip(columns, row):
+                    column.append(value)
+        for column, source in zip(columns, self.columns):
+            column.extend(source[start:])
+        return TripleIndex(self.order, columns)
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def range(self, prefix: tuple):
+        """Returns the (start, end) range of the rows starting with the ID prefix (in the index column order).
+        """
+        lo, hi = 0, len(self)
+        for column, value in zip(self.columns, prefix):
+            lo, hi = _columnRange(column, value, lo, hi)
+            if lo == hi:
+                break
+        return lo, hi
+
+    def rows(self, lo: int, hi: int):
+        """Generates the (s, p, o) ID triples of the rows in the range.
+        """
+        first, second, third = self.columns
+        inverse = [self.order.index(i) for i in range(3)]
+        for row in range(lo, hi):
+            values = (first[row], second[row], third[row])
+            yield values[inverse[0]], values[inverse[1]], values[inverse[2]]
+
+    def __contains__(self, triple: tuple):
+        lo, hi = self.range(tuple(triple[i] for i in self.order))
+        return lo < hi
+
+
+class DeltaIndex():
+    """Set of (s, p, o) ID triples that is also kept sorted in each permutation (see PERMUTATIONS),
+    so that the triples matching a pattern are found by the same prefix search as in the main indexes.
+    Used for the delta buffer of the ColumnarStore, i.e. it is meant to stay small (until it is merged).
+    """
+
+    def __init__(self):
+        self.__triples = set()
+        self.__rows = {name: [] for name in PERMUTATIONS}
+
+    def add(self, triple: tuple):
+        if triple not in self.__triples:
+            self.__triples.add(triple)
+            for name, order in PERMUTATIONS.items():
+                insort(self.__rows[name], tuple(triple[i] for i in order))
+
+    def discard(self, triple: tuple):
+        if triple in self.__triples:
+            self.__triples.discard(triple)
+            for name, order in PERMUTATIONS.items():
+                rows = self.__rows[name]
+                del rows[bisect_left(rows, tuple(triple[i] for i in order))]
+
+    def range(self, name: str, prefix: tuple):
+        """Returns the (start, end) range of the rows of the permutation starting with the ID prefix.
+        """
+        rows = self.__rows[name]
+        if not prefix:
+            return 0, len(rows)
+        return bisect_left(rows, prefix), bisect_left(rows, prefix[:-1] + (prefix[-1] + 1,))
+
+    def rows(self, name: str, lo: int, hi: int) -> list:
+        """Returns the (s, p, o) ID triples of the rows of the permutation in the range (a copy).
+        """
+        inverse = [PERMUTATIONS[name].index(i) for i in range(3)]
+        return [(row[inverse[0]], row[inverse[1]], row[inverse[2]]) for row in self.__rows[name][lo:hi]]
+
+    def __contains__(self, triple: tuple):
+        return triple in self.__triples
+
+    def __len__(self):
+        return len(self.__triples)
+
+    def __iter__(self):
+        return iter(self.__triples)
+
+
+class ColumnarStore(Store):
+    """Read-optimized rdflib Store keeping the triples in sorted, dictionary-encoded integer columns
+    (see the module documentation). The store is not context aware, i.e. it holds a single graph.
+
+    Writes are collected in a delta buffer (added and removed triples, see DeltaIndex), which is
+    searched along with the main indexes by the same prefix search. Once the buffer holds "mergeThreshold" triples, it is merged into
+    the main indexes (only the buffer is sorted, see TripleIndex.merged). Call the "compact" method
+    to merge it explicitly, e.g., after a bulk load.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None, mergeThreshold: int = DEFAULT_MERGE_THRESHOLD):
+        super().__init__(configuration)
+        self.identifier = identifier
+        self.mergeThreshold = mergeThreshold
+        self.__lock = threading.RLock()
+        self.__namespace = {}
+        self.__prefix = {}
+        self.clear()
+
+    def clear(self):
+        """Removes all triples and terms.
+        """
+        with self.__lock:
+            self._setData(TermDictionary(), {name: TripleIndex(order) for name, order in PERMUTATIONS.items()})
+
+    def _setData(self, dictionary, indexes: dict, namespaces: dict = None):
+        """Replaces the whole content of the store (the term dictionary and the SPO, POS and OSP indexes).
+        The bound namespaces are replaced as well if "namespaces" ({prefix: namespace}) are given.
+        """
+        with self.__lock:
+            self.__dictionary = dictionary
+            self.__indexes = indexes
+            if namespaces is not None:
+                self.__namespace = {prefix: URIRef(namespace) for prefix, namespace in namespaces.items()}
+                self.__prefix = {namespace: prefix for prefix, namespace in self.__namespace.items()}
+            self.__added = DeltaIndex()
+            self.__removed = DeltaIndex()
+
+    @property
+    def dictionary(self):
+        return self.__dictionary
+
+    @property
+    def indexes(self):
+        """The main (merged) indexes, a dictionary with "spo", "pos" and "osp" keys.
+        """
+        return self.__indexes
+
+    def open(self, configuration, create=False):
+        return 1  # VALID_STORE, nothing to open
+
+    def destroy(self, configuration):
+        self.clear()
+
+    # --- writing ---
+    def __encode(self, triple):
+        return tuple(self.__dictionary.add(term) for term in triple)
+
+    def __inMain(self, ids: tuple):
+        return ids in self.__indexes["spo"]
+
+    def add(self, triple, context=None, quoted=False):
+        with self.__lock:
+            self.__addIDs(self.__encode(triple))
+            self.__mergeIfNeeded()
+        super().add(triple, context, quoted)
+
+    def addN(self, quads):
+        with self.__lock:
+            for s, p, o, _ in quads:
+                self.__addIDs(self.__encode((s, p, o)))
+            self.__mergeIfNeeded()
+
+    def __addIDs(self, ids: tuple):
+        if ids in self.__removed:
+            self.__removed.discard(ids)
+        elif not self.__inMain(ids):
+            self.__added.add(ids)
+
+    def remove(self, triple, context=None):
+        with self.__lock:
+            for ids in list(self.__matchIDs(triple)):
+                if ids in self.__added:
+                    self.__added.discard(ids)
+                else:
+                    self.__removed.add(ids)
+            self.__mergeIfNeeded()
+        super().remove(triple, context)
+
+    def __mergeIfNeeded(self):
+        if len(self.__added) + len(self.__removed) >= self.mergeThreshold:
+            self.compact()
+
+    def compact(self):
+        """Merges the delta buffer into the main indexes.
+        """
+        with self.__lock:
+            if not self.__added and not self.__removed:
+                return
+            self.__indexes = {name: index.merged(self.__added, self.__removed) for name, index in self.__indexes.items()}
+            self.__added = DeltaIndex()
+            self.__removed = DeltaIndex()
+
+    @contextmanager
+    def deferredMerge(self):
+        """Context in which the delta buffer is not merged periodically but only once at the end
+        (useful for bulk loads, which would otherwise re-sort the indexes many times).
+        """
+        threshold = self.mergeThreshold
+        self.mergeThreshold = float("inf")
+        try:
+            yield self
+        finally:
+            self.mergeThreshold = threshold
+            self.compact()
+
+    # --- reading ---
+    def __lookup(self, pattern):
+        """Finds the range of the main index rows matching the (s, p, o) pattern.
+        Returns (permutation name, ID prefix, start, end) or None if the pattern contains an unknown term.
+        The bound terms of the pattern always form the prefix, i.e. all rows in the range match it.
+        """
+        ids = []
+        for term in pattern:
+            if term is None:
+                ids.append(None)
+            else:
+                id = self.__dictionary.id(term)
+                if id is None:  # unknown term, nothing can match
+                    return None
+                ids.append(id)
+        s, p, o = ids
+        if s is not None:
+            name, prefix = ("osp", (o, s)) if p is None and o is not None else ("spo", (s, p, o))
+        elif p is not None:
+            name, prefix = "pos", (p, o, s)
+        elif o is not None:
+            name, prefix = "osp", (o, s, p)
+        else:
+            name, prefix = "spo", ()
+        prefix = tuple(prefix[:prefix.index(None)] if None in prefix else prefix)
+        lo, hi = self.__indexes[name].range(prefix)
+        return name, prefix, lo, hi
+
+    def __matchIDs(self, pattern):
+        """Returns an iterator over the ID triples matching the (s, p, o) pattern.
+        The lookups work on a snapshot of the data, thus concurrent writes do not disturb the iteration.
+        """
+        with self.__lock:
+            found = self.__lookup(pattern)
+            if found is None:
+                return iter(())
+            name, prefix, lo, hi = found
+            main = self.__indexes[name].rows(lo, hi)
+            # only the delta rows in the range of the prefix are copied
+            removed = set(self.__removed.rows(name, *self.__removed.range(name, prefix)))
+            added = self.__added.rows(name, *self.__added.range(name, prefix))
+        if removed:
+            main = (triple for triple in main if triple not in removed)
+        return chain(main, added)
+
+    def triples(self, triple_pattern, context=None):
+        with self.__lock:
+            term = self.__dictionary.term
+            matches = self.__matchIDs(triple_pattern)
+        for s, p, o in matches:
+            yield (term(s), term(p), term(o)), iter(())
+
+    def count(self, triple_pattern) -> int:
+        """Number of triples matching the (s, p, o) pattern, computed from the index range
+        (and the delta buffer) without iterating the triples.
+        """
+        with self.__lock:
+            found = self.__lookup(triple_pattern)
+            if found is None:
+                return 0
+            name, prefix, lo, hi = found
+            removedLo, removedHi = self.__removed.range(name, prefix)
+            addedLo, addedHi = self.__added.range(name, prefix)
+            # the removed triples are always in the main indexes, the added ones never
+            return hi - lo - (removedHi - removedLo) + (addedHi - addedLo)
+
+    def __len__(self, context=None):
+        with self.__lock:
+            return len(self.__indexes["spo"]) - len(self.__removed) + len(self.__added)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # --- namespaces ---
+    def bind(self, prefix, namespace, override=True):
+        bound = self.__namespace.get(prefix)
+        if bound is not None and not override:
+            return
+        if bound is not None:
+            self.__prefix.pop(bound, None)
+        oldPrefix = self.__prefix.get(namespace)
+        if oldPrefix is not None:
+            if not override:
+                return
+            self.__namespace.pop(oldPrefix, None)
+        self.__namespace[prefix] = namespace
+        self.__prefix[namespace] = prefix
+
+    def namespace(self, prefix):
+        return self.__namespace.get(prefix)
+
+    def prefix(self, namespace):
+        return self.__prefix.get(namespace)
+
+    def namespaces(self):
+        return iter(list(self.__namespace.items()))
+
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Connection management: classification of errors, retry policy and a keep-alive HTTP connection pool
+for the SPARQL (Fuseki) store.
+"""
+
+import http.client
+import logging
+import random
+import select
+import socket
+import sys
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+from xml.etree.ElementTree import iterparse
+from urllib.error import URLError
+from urllib.parse import urlencode, urlsplit
+
+from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
+from rdflib.query import Result, ResultRow
+from rdflib.term import BNode, Literal, URIRef, Variable
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_HTTP_STATUSES = {408, 429, 502, 503, 504}
+# fragments of (lowercased) driver error messages meaning the operation can be simply repeated
+TRANSIENT_DB_MESSAGES = ["database is locked", "deadlock", "lock wait timeout", "server has gone away",
+                         "lost connection", "connection refused", "could not connect", "server closed the connection",
+                         "connection reset", "broken pipe", "timed out"]
+
+
+class SPARQLHTTPError(Exception):
+    """Error response of a SPARQL endpoint.
+    """
+
+    def __init__(self, status: int, reason: str, body: bytes = b""):
+        super().__init__(f"SPARQL endpoint responded with {status} {reason}: {body[:500].decode('utf-8', 'replace')}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+
+def _sqlalchemyErrors():
+    """Returns the sqlalchemy.exc module or None if SQLAlchemy was not imported
+    (in that case, the error cannot come from SQLAlchemy and the import is not worth the time).
+    """
+    return sys.modules.get("sqlalchemy.exc")
+
+
+def isTransientError(error: Exception) -> bool:
+    """Decides whether the error is a transient one, i.e. whether repeating the operation
+    (possibly on a new connection) can succeed. Errors caused by the operation itself
+    (e.g. syntax errors, constraint violations or programming errors) are never transient.
+
+    Parameters
+    ----------
+    error : Exception
+        The raised error
+
+    Returns
+    -------
+    bool
+    """
+    if isinstance(error, SPARQLHTTPError):
+        return error.status in TRANSIENT_HTTP_STATUSES
+    sqlalchemy_exc = _sqlalchemyErrors()
+    if sqlalchemy_exc is not None:
+        if isinstance(error, (sqlalchemy_exc.DisconnectionError, sqlalchemy_exc.TimeoutError)):
+            return True
+        if isinstance(error, sqlalchemy_exc.DBAPIError):
+            if error.connection_invalidated:
+                return True
+            if isinstance(error, (sqlalchemy_exc.OperationalError, sqlalchemy_exc.InterfaceError)):
+                message = str(error.orig).lower()
+                return any(fragment in message for fragment in TRANSIENT_DB_MESSAGES)
+            return False
+    if isinstance(error, URLError):  # also covers HTTPError, which has the status code
+        code = getattr(error, "code", None)
+        return code is None or code in TRANSIENT_HTTP_STATUSES
+    return isinstance(error, (ConnectionError, socket.timeout, TimeoutError, http.client.HTTPException))
+
+
+def isDisconnect(error: Exception) -> bool:
+    """Whether the error means that the connection(s) to the database are broken.
+    """
+    sqlalchemy_exc = _sqlalchemyErrors()
+    if sqlalchemy_exc is not None:
+        if isinstance(error, sqlalchemy_exc.DBAPIError):
+            return error.connection_invalidated
+        if isinstance(error, sqlalchemy_exc.DisconnectionError):
+            return True
+    return isinstance(error, (ConnectionError, http.client.HTTPException))
+
+
+class RetryPolicy():
+    """Exponential backoff with "full jitter": the n-th retry (counted from 0) waits a random time
+    between 0 and min(maxBackoff, backoff * 2^n) seconds. The jitter prevents many clients
+    from reconnecting at the same moment after a network failure.
+    """
+
+    def __init__(self, retries: int = 3, backoff: float = 0.1, maxBackoff: float = 5.0):
+        if retries < 0:
+            raise ValueError(f"The number of retries must not be negative, got {retries}!")
+        self.retries = retries
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.maxBackoff, self.backoff * 2 ** attempt))
+
+
+def _isStale(connection: http.client.HTTPConnection) -> bool:
+    """Whether the idle keep-alive connection was closed by the server, i.e. whether its socket is readable
+    (the server does not send anything between the requests, thus it is either the end of the stream or garbage).
+    """
+    return connection.sock is not None and bool(select.select([connection.sock], [], [], 0)[0])
+
+
+class HTTPConnectionPool():
+    """Thread-safe pool of persistent (keep-alive) HTTP connections to a single server.
+    Idle connections are reused, at most "maxSize" of them are kept. Idle connections closed
+    by the server are discarded before they are used. A request failing on a reused connection
+    is only sent again if it is idempotent, since the server might have already received
+    (and executed) it, otherwise the error is raised (see knowl.database.interact_with_db).
+    """
+
+    def __init__(self, host: str, port: int = None, scheme: str = "http", maxSize: int = 5, timeout: float = None):
+        self.__host = host
+        self.__port = port
+        self.__connectionClass = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self.__maxSize = maxSize
+        self.__timeout = timeout
+        self.__idle = []
+        self.__lock = threading.Lock()
+
+    def __getConnection(self):
+        while True:
+            with self.__lock:
+                if not self.__idle:
+                    break
+                connection = self.__idle.pop()
+            if not _isStale(connection):
+                return connection, True
+            logger.debug("Discarding a stale keep-alive connection to %s:%s", self.__host, self.__port)
+            connection.close()
+        return self.__connectionClass(self.__host, self.__port, timeout=self.__timeout), False
+
+    def __release(self, connection):
+        with self.__lock:
+            if len(self.__idle) < self.__maxSize:
+                self.__idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None, idempotent: bool = False):
+        """Sends the request and reads the whole response. If "idempotent" is set, the request is sent again
+        (on another connection) if the reused connection fails, e.g., it was closed by the server in the meantime.
+
+        Returns
+        -------
+        tuple
+            (status, reason, response headers, response body)
+        """
+        while True:
+            connection, reused = self.__getConnection()
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except (ConnectionError, http.client.HTTPException):
+                connection.close()
+                if reused and idempotent:  # the server closed the idle connection in the meantime, try another one
+                    logger.debug("Discarding a failed keep-alive connection to %s:%s", self.__host, self.__port)
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.__release(connection)
+            return response.status, response.reason, response.headers, data
+
+    @contextmanager
+    def stream(self, method: str, path: str, body: bytes = None, headers: dict = None, idempotent: bool = False):
+        """Sends the request and provides the response to be read incrementally. The connection
+        is returned to the pool if the whole response was read, otherwise it is closed.
+        See "request" for the meaning of "idempotent".
+
+        Yields
+        ------
+        http.client.HTTPResponse
+            The response (status, reason, headers and a file-like body)
+        """
+        while True:
+            connection, reused = self.__getConnection()
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                connection.close()
+                if reused and idempotent:
+                    logger.debug("Discarding a failed keep-alive connection to %s:%s", self.__host, self.__port)
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+        try:
+            yield response
+        except BaseException:
+            connection.close()
+            raise
+        if response.isclosed() and not response.will_close:  # fully read
+            self.__release(connection)
+        else:
+            connection.close()
+
+    def clear(self):
+        """Closes all idle connections.
+        """
+        with self.__lock:
+            idle, self.__idle = self.__idle, []
+        for connection in idle:
+            connection.close()
+
+
+class PooledSPARQLUpdateStore(SPARQLUpdateStore):
+    """SPARQLUpdateStore sending the queries and updates over pooled keep-alive HTTP connections
+    (the original store opens a new connection for each request).
+    The "onRequest" callback (if set) is called with the query or update before it is sent,
+    the "onTransfer" callback (if set) is called with the number of bytes sent and received by each request.
+    """
+
+    def __init__(self, *args, poolSize: int = 5, timeout: float = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__poolSize = poolSize
+        self.__timeout = timeout
+        self.__pools = {}
+        self.__lock = threading.Lock()
+        self.onRequest = None
+        self.onTransfer = None
+
+    def __pool(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        with self.__lock:
+            if key not in self.__pools:
+                self.__pools[key] = HTTPConnectionPool(parts.hostname, parts.port, parts.scheme or "http", self.__poolSize, self.__timeout)
+            return self.__pools[key]
+
+    def _send(self, url: str, params: dict, body: str, contentType: str, idempotent: bool = False):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        query = "&".join(q for q in [parts.query, urlencode(params)] if q)
+        headers = dict(self.kwargs.get("headers", {}))
+        headers.update({"Accept": self.response_mime_types(), "Content-Type": contentType})
+        if self.onRequest is not None:
+            self.onRequest(body)
+        payload = body.encode("utf-8")
+        status, reason, responseHeaders, data = self.__pool(url).request(
+            "POST", path + ("?" + query if query else ""), payload, headers, idempotent)
+        if self.onTransfer is not None:
+            self.onTransfer(len(payload), len(data))
+        if status >= 400:
+            raise SPARQLHTTPError(status, reason, data)
+        return responseHeaders, data
+
+    def _query(self, query, default_graph: str = None, named_graph: str = None):
+        self._queries += 1
+        params = dict(self.kwargs.get("params", {}))
+        if default_graph is not None and type(default_graph) is not BNode:
+            params["default-graph-uri"] = default_graph
+        headers, data = self._send(self.query_endpoint, params, query, "application/sparql-query", idempotent=True)
+        return Result.parse(BytesIO(data), content_type=headers["Content-Type"].split(";")[0])
+
+    def streamQuery(self, query: str, default_graph: str = None, pageSize: int = 1000, variables: list = None):
+        """Sends the SELECT query and parses the result (in the SPARQL XML results format)
+        while it is being received, i.e. the whole response is never held in memory.
+        The connection is held until the generator is exhausted or closed.
+        The "variables" list (if given) is filled with the variables of the result.
+
+        Yields
+        ------
+        list
+            Pages (lists of at most "pageSize" rdflib.query.ResultRow objects) of the result
+        """
+        self._queries += 1
+        params = dict(self.kwargs.get("params", {}))
+        if default_graph is not None and type(default_graph) is not BNode and self._is_contextual(default_graph):
+            params["default-graph-uri"] = default_graph
+        if self.onRequest is not None:
+            self.onRequest(query)
+        payload = query.encode("utf-8")
+        url = self.query_endpoint
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        queryString = "&".join(q for q in [parts.query, urlencode(params)] if q)
+        headers = dict(self.kwargs.get("headers", {}))
+        headers.update({"Accept": "application/sparql-results+xml", "Content-Type": "application/sparql-query"})
+        with self.__pool(url).stream("POST", path + ("?" + queryString if queryString else ""), payload, headers, idempotent=True) as response:
+            if response.status >= 400:
+                raise SPARQLHTTPError(response.status, response.reason, response.read())
+            reader = _CountingReader(response)
+            try:
+                yield from _parseXMLResults(reader, pageSize, variables)
+            finally:
+                if self.onTransfer is not None:
+                    self.onTransfer(len(payload), reader.count)
+
+    def _update(self, update):
+        self._updates += 1
+        self._send(self.update_endpoint, dict(self.kwargs.get("params", {})), update, "application/sparql-update; charset=UTF-8")
+
+    def sendUpdate(self, update: str):
+        """Sends the update to the endpoint as is, i.e. without the context-aware rewriting
+        performed by the "update" method. Pending edits (if autocommit is disabled) are committed first.
+        """
+        if not self.autocommit:
+            self.commit()
+        self._update(update)
+
+    def clearConnections(self):
+        """Closes all idle pooled connections.
+        """
+        with self.__lock:
+            pools, self.__pools = list(self.__pools.values()), {}
+        for pool in pools:
+            pool.clear()
+
+    def close(self, commit_pending_transaction: bool = False):
+        super().close(commit_pending_transaction)
+        self.clearConnections()
+
+
+class _CountingReader():
+    """File-like wrapper counting the bytes read.
+    """
+
+    def __init__(self, file):
+        self.__file = file
+        self.count = 0
+
+    def read(self, size: int = -1):
+        data = self.__file.read(size)
+        self.count += len(data)
+        return data
+
+
+_XML_RESULTS = "{http://www.w3.org/2005/sparql-results#}"
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+
+def _parseXMLTerm(element):
+    if element.tag == _XML_RESULTS + "uri":
+        return URIRef(element.text or "")
+    if element.tag == _XML_RESULTS + "bnode":
+        return BNode(element.text)
+    datatype = element.get("datatype")
+    return Literal(element.text or "", lang=element.get(_XML_LANG), datatype=URIRef(datatype) if datatype else None)
+
+
+def _parseXMLResults(file, pageSize: int, variables: list = None):
+    """Incrementally parses SPARQL query results in the XML format (SELECT queries only).
+    The parsed elements are discarded, thus the memory use is bounded by the page size.
+
+    Yields
+    ------
+    list
+        Pages of rdflib.query.ResultRow objects
+    """
+    variables = [] if variables is None else variables
+    page, results = [], None
+    for event, element in iterparse(file, events=("start", "end")):
+        if event == "start":
+            if element.tag == _XML_RESULTS + "results":
+                results = element
+            continue
+        if element.tag == _XML_RESULTS + "variable":
+            variables.append(Variable(element.get("name")))
+        elif element.tag == _XML_RESULTS + "result":
+            values = {Variable(binding.get("name")): _parseXMLTerm(binding[0]) for binding in element}
+            page.append(ResultRow(values, variables))
+            results.clear()  # the parsed results are not needed anymore
+            if len(page) >= pageSize:
+                yield page
+                page = []
+    if page:
+        yield page
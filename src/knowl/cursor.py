@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Cursors over big results (see OntologyDatabase.triplesCursor and OntologyDatabase.queryCursor).
+The result is retrieved from the backend in pages while being iterated, i.e. the first rows
+are available before the whole result is computed or transferred and at most a page of rows
+is held in memory at a time.
+
+    with onto.triplesCursor((None, RDF.type, None)) as cursor:
+        for s, p, o in cursor:
+            ...
+
+The cursor holds a connection to the backend until it is exhausted or closed.
+"""
+
+from collections import deque
+
+
+class Cursor():
+    """Iterator over a result retrieved in pages. Use it as a context manager or close it
+    if it is not iterated until the end, so that the connection is released.
+
+    Parameters
+    ----------
+    pages : generator
+        Generator of the pages (lists of rows) of the result
+    variables : list, optional
+        Names of the variables of a query result (rdflib.term.Variable), by default None
+    """
+
+    def __init__(self, pages, variables: list = None):
+        self.__pages = pages
+        self.__variables = variables
+        self.__buffer = deque()
+        self.__rows = 0
+        self.__fetched = 0
+        self.__pageCount = 0
+        self.__closed = False
+        self.onPage = None  # called with the number of rows of each retrieved page (e.g. by knowl.instrumentation)
+
+    def _fetchPage(self) -> bool:
+        """Retrieves the next page of the result into the buffer.
+        Returns False if the result is exhausted (the cursor is closed then).
+        """
+        if self.__closed:
+            return False
+        page = next(self.__pages, None)
+        if page is None:
+            self.close()
+            return False
+        self.__pageCount += 1
+        self.__fetched += len(page)
+        self.__buffer.extend(page)
+        if self.onPage is not None:
+            self.onPage(len(page))
+        return True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self.__buffer:
+            if not self._fetchPage():
+                raise StopIteration
+        self.__rows += 1
+        return self.__buffer.popleft()
+
+    def fetchmany(self, size: int) -> list:
+        """Retrieves the next "size" rows (fewer at the end of the result).
+
+        Returns
+        -------
+        list
+            The rows, empty if the result is exhausted
+        """
+        rows = []
+        for row in self:
+            rows.append(row)
+            if len(rows) >= size:
+                break
+        return rows
+
+    def close(self):
+        """Stops retrieving the result and releases the connection. The rows already retrieved
+        (the rest of the current page) can still be iterated.
+        """
+        if not self.__closed:
+            self.__closed = True
+            self.__pages.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        self.close()
+        self.__buffer.clear()
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    @property
+    def variables(self) -> list:
+        """The variables of the query result (None for a cursor over triples).
+        """
+        return self.__variables
+
+    @property
+    def rows(self) -> int:
+        """Number of rows iterated so far.
+        """
+        return self.__rows
+
+    @property
+    def fetched(self) -> int:
+        """Number of rows retrieved from the backend so far (including the buffered ones).
+        """
+        return self.__fetched
+
+    @property
+    def pages(self) -> int:
+        """Number of pages retrieved from the backend so far.
+        """
+        return self.__pageCount
@@ -8,49 +8,132 @@
 """
 
 from typing import Generator
+from contextlib import contextmanager
+from functools import partial, wraps
+from contextlib import closing, nullcontext
+import inspect
+import logging
+import threading
+import time
+import types
+from itertools import chain, islice
+from collections import namedtuple
 import rdflib
 from rdflib import Graph, Namespace
-from rdflib_sqlalchemy.store import SQLAlchemy
-from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore, Store, _node_to_sparql
 
 from knowl import DBConfig
+from knowl.loader import iterateTriples, loadInBatches, loadFilesInParallel, DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE
+from knowl.session import ChangeSet
+from knowl.cache import TriplePatternCache, PreparedQueryCache
+from knowl.instrumentation import Instrumentation
+from knowl.cursor import Cursor
+from knowl import sparql
+from knowl import snapshot
+from knowl.columnar import ColumnarStore
+from rdflib.exceptions import UniquenessError
 
 from rdflib import URIRef, BNode, Literal
 from rdflib.term import Identifier
 
 from rdflib.namespace import FOAF, RDF, RDFS
 
+logger = logging.getLogger(__name__)
 
-def interact_with_db(func: callable):
+# result of the bulk changes (see OntologyDatabase.replaceN): numbers of removed and written triples
+ChangeCounts = namedtuple("ChangeCounts", ["removed", "added"])
+# a SPARQL query prepared by OntologyDatabase.prepare: the original text, the namespaces used to resolve
+# its prefixes and the prepared query (rdflib.plugins.sparql.sparql.Query or, for the Fuseki store, the request text)
+PreparedQuery = namedtuple("PreparedQuery", ["text", "namespaces", "query"])
+
+
+def interact_with_db(func: callable = None, idempotent: bool = True):
     """This function is used as a wrapper for most DB interacting functions.
     Its purpose is to take care of the fact that the connection to the DB can
-    occasionally fail after some period of inactivity.
+    occasionally fail (e.g. after some period of inactivity or due to a network failure).
+
+    Only transient errors (see knowl.connection.isTransientError) are handled, any other error
+    is raised immediately. The failed operation is repeated according to the retry policy
+    of the database (exponential backoff with jitter, see the "retries" and "retry_backoff" config
+    parameters). Broken connections are discarded from the pool before the retry.
+    Operations that are not idempotent are never repeated.
+
+    Can be used either as @interact_with_db or as @interact_with_db(idempotent=False).
 
     Parameters
     ----------
     func : callable
         A function to be called
+    idempotent : bool, optional
+        Whether the function can be safely called repeatedly, by default True
 
     Returns
     -------
     [type]
         Returns the value returned by the callable function. Return type depends on the returned value.
     """
+    if func is None:
+        return partial(interact_with_db, idempotent=idempotent)
+
+    @wraps(func)
     def wrapper(self, *args, **kwargs):
-        try:
-            return func(self, *args, **kwargs)
-        except Exception as e:
-            print("Query Error", e)
-            print("Query arguments:")
-            print(args, kwargs)
-            self.closelink()
-            self.setup()
-            print("Re-connected", e)
-            return func(self, *args, **kwargs)
+        attempt = 0
+        while True:
+            try:
+                with self.connectionLock:
+                    result = func(self, *args, **kwargs)
+                    if self.singleConnection:
+                        # the shared connection must not be used by lazily evaluated results outside of the lock
+                        result = _materialize(result)
+                    return result
+            except Exception as e:
+                if not idempotent:
+                    raise
+                # the connection module (and the HTTP and XML libraries) are only imported when needed
+                from knowl.connection import isTransientError, isDisconnect
+                policy = self.retryPolicy
+                if attempt >= policy.retries or not isTransientError(e):
+                    raise
+                delay = policy.delay(attempt)
+                attempt += 1
+                logger.warning("Transient error in %s (attempt %d of %d), retrying in %.3f s: %r",
+                               func.__name__, attempt, policy.retries, delay, e)
+                instrumentation = getattr(self, "instrumentation", None)
+                if instrumentation is not None:
+                    instrumentation.retried(func.__name__)
+                if isDisconnect(e):
+                    self._resetConnections()
+                    if instrumentation is not None:
+                        instrumentation.reconnected(func.__name__)
+                time.sleep(delay)
 
     return wrapper
 
 
+def _materialize(result):
+    """Retrieves all the items of a lazily evaluated result (generator or SPARQL query result).
+    """
+    if isinstance(result, types.GeneratorType):
+        return iter(list(result))
+    if isinstance(result, rdflib.query.Result) and result.type == "SELECT":
+        result.bindings
+    return result
+
+
+def _pages(iterable, pageSize: int, lock=None):
+    """Splits the iterable into lists of at most "pageSize" items (see knowl.cursor.Cursor).
+    The lock (if given) is held while retrieving each page, e.g. for a lazily evaluated result
+    using the shared connection (see OntologyDatabase.connectionLock).
+    """
+    lock = lock if lock is not None else nullcontext()
+    iterator = iter(iterable)
+    while True:
+        with lock:
+            page = list(islice(iterator, pageSize))
+        if not page:
+            return
+        yield page
+
+
 # def my_bnode_ext(node):
 
 #    if isinstance(node, BNode):
@@ -102,24 +185,54 @@ class OntologyDatabase:
         self.__password = None
         self.__create = create
         self.__store_type = self.config["store"]
+        self.__local = threading.local()  # per-thread state (sessions)
+        self.__changes = None  # pending changes of the active session
+        self.__connectionLock = threading.RLock() if self.singleConnection else nullcontext()
+        self.__changeListeners = []
+        self.__roundTripListeners = []
+        self.__statementListener = self.__onStatement  # the same object must be used to unregister the listener
+        self.__tracedEngine = None
+        self.__retryPolicy = None  # created on the first failure, see retryPolicy
+        if self.config.cache_size > 0:
+            self.__cache = TriplePatternCache(self.config.cache_size)
+            self.addChangeListener(self.__cache)
+        else:
+            self.__cache = None
+        self.__queryCache = PreparedQueryCache(self.config.query_cache_size) if self.config.query_cache_size > 0 else None
+        self.__instrumentation = None
 
         # configure database identifier (ontology IRI/base URL)
         self.__identifier = self.config.baseURL
 
+        # the connection is opened on the first use (see _graph), the store backends are imported on demand
+        self.__graph = None
+        self.__isSetUp = False
+        self.__setupLock = threading.RLock()
         if self.store_type == "alchemy":
+            from rdflib_sqlalchemy.store import SQLAlchemy
             self.__store = SQLAlchemy(identifier=self.identifier)
-            self._graph = Graph(self.__store, identifier=self.identifier)
+            self.__graph = Graph(self.__store, identifier=self.identifier)
         elif self.store_type == "fuseki":
             self.__query_endpoint = f'http://{self.config["host"]}:{self.config["port"]}/{self.config["database"]}'
             self.__update_endpoint = f'http://{self.config["host"]}:{self.config["port"]}/{self.config["database"]}/update'
-            self.__store = SPARQLUpdateStore(queryEndpoint=self.__query_endpoint + '/sparql', update_endpoint=self.__update_endpoint, context_aware=True, postAsEncoded=False, node_to_sparql=my_bnode_ext)
+            from knowl.connection import PooledSPARQLUpdateStore
+            self.__store = PooledSPARQLUpdateStore(queryEndpoint=self.__query_endpoint + '/sparql', update_endpoint=self.__update_endpoint, context_aware=True,
+                                                   postAsEncoded=False, node_to_sparql=my_bnode_ext,
+                                                   poolSize=self.config.pool_size, timeout=self.config.pool_timeout)
             self.__query_endpoint += '/query'
             self.__store.method = 'POST'
+        elif self.store_type == "columnar":
+            self.__store = ColumnarStore(identifier=self.identifier)
+            self.__graph = Graph(self.__store, identifier=self.identifier)
         else:
             raise Exception(f"Unknown store type {self.store_type}!")
 
+        if self.config.instrumentation:
+            self.enableInstrumentation()
+
     def setup(self, create=False, username: str = None, password: str = None):
-        """Sets-up a new database connection. Call this to initialize access to the database.
+        """Sets-up a new database connection. Called automatically on the first use of the database
+        (with the default arguments), call it explicitly to (re-)connect with other arguments.
 
         Parameters
         ----------
@@ -134,22 +247,67 @@ class OntologyDatabase:
         if self.store_type == "alchemy":
             if self.__create is not None:
                 create = self.__create
-            self._graph.open(self.config.getDB_URI(self.__username if username is None else username, self.__password if password is None else password),
-                            create=create)
+            self.__graph.open(self.config.getEngineConfig(self.__username if username is None else username, self.__password if password is None else password),
+                             create=create)
+            if self.config.path is not None:
+                from knowl import alchemy
+                alchemy.configureSQLite(self.__store.engine, self.config.sqlite_pragmas)
+            self.__hookRoundTrips()
         elif self.store_type == "fuseki":
-            print(f"Query endpoint: {self.__query_endpoint}\nUpdate endpoint: {self.__update_endpoint}\nIndentifier: {self.identifier}")
+            logger.info("Query endpoint: %s, update endpoint: %s, identifier: %s", self.__query_endpoint, self.__update_endpoint, self.identifier)
             self.__store.open((self.__query_endpoint, self.__update_endpoint))
-            self._graph = Graph(self.__store, identifier=self.identifier)
+            self.__graph = Graph(self.__store, identifier=self.identifier)
+        elif self.store_type == "columnar" and self.config.snapshot is not None:
+            self.__loadSnapshot(self.config.snapshot)
         for ns, uri in self.config.namespaces.items():
-            self._graph.bind(ns.lower(), uri)
+            self.__graph.bind(ns.lower(), uri)
+        if self.__queryCache is not None:  # the prefixes of the prepared queries might resolve differently
+            self.__queryCache.reset()
+        self.__isSetUp = True
+        # the connection might be a "new" one (e.g. after re-connecting), forget anything derived from the data
+        self._notifyReset()
+
+    def __ensureSetUp(self):
+        if not self.__isSetUp:
+            with self.__setupLock:
+                if not self.__isSetUp:
+                    self.setup()
+
+    @property
+    def _graph(self):
+        """The rdflib Graph of the database. The database is set up on the first access (see setup).
+        """
+        self.__ensureSetUp()
+        return self.__graph
 
     def closelink(self):
         """Closes the database connection.
         """
+        if not self.__isSetUp:
+            return
         try:
-            self._graph.close()
-        except Exception as e:
-            print("Exception in Closing", e)
+            self.__graph.close()
+        except Exception:
+            logger.exception("Failed to close the database connection")
+
+    def _resetConnections(self):
+        """Discards the pooled connections (used after a connection failure).
+        New connections are opened on demand.
+        """
+        if self.store_type == "alchemy":
+            if self.__store.engine is not None:
+                self.__store.engine.dispose()
+        elif self.store_type == "fuseki":
+            self.__store.clearConnections()
+
+    @property
+    def retryPolicy(self):
+        """The policy (knowl.connection.RetryPolicy) of repeating operations failed due to transient errors.
+        """
+        if self.__retryPolicy is None:
+            from knowl.connection import RetryPolicy
+            self.__retryPolicy = RetryPolicy(self.config.retries, self.config.retry_backoff, self.config.retry_max_backoff)
+        return self.__retryPolicy
 
     def destroy(self, confirmation: str = None):
         """Destroys the store for the Ontology
@@ -163,7 +321,16 @@ class OntologyDatabase:
             [description], by default None
         """
         if confirmation == "I know what I am doing":
-            self._graph.destroy(self.identifier)
+            self.__ensureSetUp()
+            if self.path is not None:
+                # the store would drop the tables over a second connection while holding the (immediate) transaction
+                with self.__store.engine.begin() as connection:
+                    self.__store.metadata.drop_all(connection)
+            elif self.store_type == "fuseki":  # the SPARQL store cannot be destroyed, drop the graph of the ontology
+                self.__store.sendUpdate(f"DROP SILENT GRAPH {my_bnode_ext(self.identifier)}")
+            else:
+                self._graph.destroy(self.identifier)
+            self._notifyReset()
         else:
             raise ValueError("Destroying the DB attempted but failed - wrong confirmation string!")
 
@@ -180,21 +347,455 @@ class OntologyDatabase:
         self.__username = username
         self.__password = password
 
+    def addChangeListener(self, listener):
+        """Registers an object that will be notified about changes of the data.
+        The listener must implement the following methods:
+            triplesAdded(triples) - called with a list of added (s, p, o) triples
+            triplesRemoved(pattern) - called with an (s, p, o) pattern (None being a wildcard) of removed triples
+            reset() - called when the changes cannot be described precisely (e.g. after a SPARQL update
+                      or re-connecting to the database), i.e., anything might have changed.
+        The listeners are notified after the changes are written into the database.
+
+        Parameters
+        ----------
+        listener : object
+            The listener object (e.g., knowl.cache.TriplePatternCache)
+        """
+        self.__changeListeners.append(listener)
+
+    def removeChangeListener(self, listener):
+        self.__changeListeners.remove(listener)
+
+    def _notifyAdded(self, triples):
+        for listener in self.__changeListeners:
+            listener.triplesAdded(triples)
+
+    def _notifyRemoved(self, pattern):
+        for listener in self.__changeListeners:
+            listener.triplesRemoved(tuple(pattern))
+
+    def _notifyReset(self):
+        for listener in self.__changeListeners:
+            listener.reset()
+
+    def addRoundTripListener(self, listener: callable):
+        """Registers a function called with the text of each request sent to the database backend
+        (SQL statements of the SQLAlchemy store, SPARQL queries and updates of the Fuseki store),
+        before the request is sent. The columnar store runs in-process, it makes no round trips.
+        The backend is only hooked while there are some listeners. See also knowl.tracing.RoundTripTracer.
+
+        Parameters
+        ----------
+        listener : callable
+            Function of one argument (the SQL statement or the SPARQL request), it can be called from any thread
+        """
+        self.__roundTripListeners.append(listener)
+        self.__hookRoundTrips()
+
+    def removeRoundTripListener(self, listener: callable):
+        self.__roundTripListeners.remove(listener)
+        self.__hookRoundTrips()
+
+    def __notifyRoundTrip(self, request: str):
+        for listener in list(self.__roundTripListeners):
+            listener(request)
+
+    def __onStatement(self, connection, cursor, statement, *args):
+        self.__notifyRoundTrip(statement)
+
+    def __hookRoundTrips(self):
+        hook = self.__notifyRoundTrip if self.__roundTripListeners else None
+        if self.store_type == "alchemy":
+            # the engine is created at the setup, the setup calls this method again
+            engine = self.__store.engine if hook is not None else None
+            if engine is not self.__tracedEngine:
+                from knowl import alchemy
+                if self.__tracedEngine is not None:
+                    alchemy.removeStatementListener(self.__tracedEngine, self.__statementListener)
+                if engine is not None:
+                    alchemy.addStatementListener(engine, self.__statementListener)
+                self.__tracedEngine = engine
+        elif self.store_type == "fuseki":
+            self.__store.onRequest = hook
+
+    @property
+    def cacheStats(self):
+        """Statistics of the triple pattern cache (see knowl.cache.TriplePatternCache.stats)
+        or None if the cache is disabled (see DBConfig cache_size).
+        """
+        return None if self.__cache is None else self.__cache.stats
+
+    def clearCache(self):
+        """Empties the triple pattern cache (if enabled).
+        """
+        if self.__cache is not None:
+            self.__cache.reset()
+
+    @property
+    def queryCacheStats(self):
+        """Statistics of the prepared query cache (see knowl.cache.PreparedQueryCache.stats)
+        or None if the cache is disabled (see DBConfig query_cache_size).
+        """
+        return None if self.__queryCache is None else self.__queryCache.stats
+
+    def enableInstrumentation(self, instrumentation: Instrumentation = None) -> Instrumentation:
+        """Starts recording call counts, latencies, returned rows, retries, reconnects and (for the Fuseki store)
+        transferred bytes of each public method of the database (see knowl.instrumentation.Instrumentation).
+        The methods are replaced by timing wrappers on this object only, thus the instrumentation
+        costs nothing while disabled (see also the "instrumentation" config parameter).
+
+        Parameters
+        ----------
+        instrumentation : knowl.instrumentation.Instrumentation, optional
+            The statistics collector (e.g., shared by multiple databases), by default None (a new one is created)
+
+        Returns
+        -------
+        knowl.instrumentation.Instrumentation
+            The statistics collector, use its "stats" method to read the statistics
+            or register exporters (e.g., knowl.instrumentation.prometheusText) with "addExporter".
+        """
+        self.disableInstrumentation()
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        for name, _ in inspect.getmembers(type(self), inspect.isfunction):
+            if name.startswith("_") or name in ("enableInstrumentation", "disableInstrumentation"):
+                continue
+            setattr(self, name, instrumentation.instrument(name, getattr(self, name)))
+        if self.store_type == "fuseki":
+            self.__store.onTransfer = instrumentation.transferred
+        self.__instrumentation = instrumentation
+        return instrumentation
+
+    def disableInstrumentation(self):
+        """Stops recording the statistics and restores the original methods.
+        """
+        if self.__instrumentation is None:
+            return
+        for name, value in list(vars(self).items()):
+            if hasattr(value, "instrumented"):
+                delattr(self, name)
+        if self.store_type == "fuseki":
+            self.__store.onTransfer = None
+        self.__instrumentation = None
+
+    @property
+    def instrumentation(self):
+        """The statistics collector (knowl.instrumentation.Instrumentation) or None if the instrumentation is disabled.
+        """
+        return self.__instrumentation
+
+    @contextmanager
+    def session(self):
+        """Unit-of-work context. Additions, removals and "set" operations performed
+        within the context (directly or via entities of the OntologyAPI) are not sent
+        to the database immediately. Instead, they are buffered, redundant operations
+        are collapsed (see knowl.session.ChangeSet) and the result is written at the exit
+        of the context: in a single transaction (SQLAlchemy store) or in a single
+        SPARQL update request (Fuseki store).
+        If an exception is raised within the context, the buffered changes are discarded.
+
+        Reads performed within the session do not see the buffered changes.
+        Nested sessions are merged into the outermost one.
+        Sessions are bound to the thread that opened them, i.e. writes performed by other threads
+        are not buffered by the session.
+
+        Example:
+            with onto.session():
+                entity.name = "Cube"
+                entity.size = 3
+
+        Yields
+        -------
+        knowl.session.ChangeSet
+            The buffer of pending changes
+        """
+        if self.__changes is not None:  # nested session, the outer one takes care of the flush
+            yield self.__changes
+            return
+        self.__changes = ChangeSet()
+        try:
+            yield self.__changes
+            changes = self.__changes
+            self.__changes = None
+            self._applyChanges(changes.removals, changes.additions)
+        finally:
+            self.__changes = None
+
+    @property
+    def __changes(self):
+        # each thread has its own session
+        return getattr(self.__local, "changes", None)
+
+    @__changes.setter
+    def __changes(self, changes):
+        self.__local.changes = changes
+
+    @property
+    def path(self):
+        """Path to the database file (file-backed SQLite databases only, None otherwise).
+        """
+        return self.config.path if self.store_type == "alchemy" else None
+
+    @property
+    def singleConnection(self):
+        """Whether the database has only a single connection shared by all threads (the in-memory SQLite database).
+        In that case, the access to the database is serialized (see the "connectionLock" property).
+        """
+        return self.store_type == "alchemy" and self.config.DB_URI == DBConfig.IN_MEMORY
+
+    @property
+    def connectionLock(self):
+        """Lock held during each database operation if the database has only a single connection
+        (see the "singleConnection" property). Otherwise (each thread uses its own pooled connection),
+        this is a no-op context manager.
+        """
+        return self.__connectionLock
+
+    @property
+    def inSession(self):
+        """Whether a session (see the "session" method) is currently active.
+        """
+        return self.__changes is not None
+
     @interact_with_db
-    def mergeFileIntoDB(self, filepath: str):
+    def _applyChanges(self, removals: list, additions: list, count: bool = False, chunked: bool = False):
+        """Atomically removes triples matching the provided patterns and then adds new triples.
+
+        Parameters
+        ----------
+        removals : list
+            (s, p, o) patterns to be removed
+        additions : list
+            (s, p, o) triples to be added
+        count : bool, optional
+            Count the removed triples (the Fuseki store counts them with queries sent before the update), by default False
+        chunked : bool, optional
+            Send the changes to the Fuseki store in requests of at most "max_update_size" characters
+            instead of a single (atomic) request, by default False
+
+        Returns
+        -------
+        int
+            Number of removed triples if counted (the SQLAlchemy store always counts them), otherwise None
+        """
+        if not removals and not additions:
+            return 0
+        removals = [tuple(p) for p in removals]
+        additions = [tuple(t) for t in additions]
+        self.__ensureSetUp()
+        removed = None
+        if self.store_type == "alchemy":
+            from knowl import alchemy
+            with self.__store.engine.begin() as connection:
+                removed = alchemy.removePatterns(self.__store, removals, self._graph, connection)
+                alchemy.insertTriples(self.__store, additions, self._graph, connection)
+        elif self.store_type == "fuseki":
+            if count:
+                removed = 0
+                for query in sparql.countQueries(removals, self.config.max_update_size, my_bnode_ext):
+                    removed += sum(int(row[0]) for row in self._graph.query(query))
+            updates = chain(
+                sparql.removalUpdates(removals, self.identifier, self.config.max_update_size, my_bnode_ext),
+                sparql.dataUpdates("INSERT", additions, self.identifier, self.config.max_update_size, my_bnode_ext)
+            )
+            if chunked:
+                self._sendUpdates(updates)
+            else:  # all the changes are sent in a single (atomic) request
+                self.__store.sendUpdate(" ;\n".join(updates))
+        else:
+            if count:
+                removed = len({triple for pattern in removals for triple in self._graph.triples(pattern)})
+            for pattern in removals:
+                self._graph.remove(pattern)
+            self._graph.addN([t + (self._graph,) for t in additions])
+        for pattern in removals:
+            self._notifyRemoved(pattern)
+        self._notifyAdded(additions)
+        return removed
+
+    @interact_with_db(idempotent=False)  # a repeated parse would duplicate the blank nodes
+    def mergeFileIntoDB(self, filepath: str, format: str = None, batchSize: int = DEFAULT_BATCH_SIZE, progress: callable = None,
+                        bulk: bool = False, dropIndexes: bool = False):
         """Merge an existing ontology file into the current database. This could be used to populate
         a new ontology from an existing one stored as a file. The ontology is automatically merged
         and stored in the triplestore database server after calling this function.
 
+        The triples are pushed into the database in chunks of "batchSize" triples.
+        Line-based formats (N-Triples, optionally gzip or bzip2 compressed, e.g., "dump.nt.gz")
+        are parsed incrementally, thus the memory usage stays flat regardless of the file size.
+        Other formats have to be parsed as a whole by rdflib before the import.
+
         Parameters
         ----------
         filepath : str
             Path to the file containing the ontology. See RDFLib documentation,
             specifically, the function Graph.parse for supported formats.
+        format : str, optional
+            The rdflib format name, by default None (guessed from the file extension)
+        batchSize : int, optional
+            Number of triples sent to the database at once, by default DEFAULT_BATCH_SIZE
+        progress : callable, optional
+            Function called with a knowl.loader.LoadProgress after each batch,
+            e.g., to report the import throughput, by default None
+        bulk : bool, optional
+            Use the bulk load mode (see bulk_load), by default False
+        dropIndexes : bool, optional
+            Only used in the bulk mode (see bulk_load), by default False
+
+        Returns
+        -------
+        int
+            Number of imported triples
+        """
+        if bulk:
+            return self.bulk_load(iterateTriples(filepath, format), batchSize, dropIndexes, progress)
+        return loadInBatches(iterateTriples(filepath, format), self._addTriples, batchSize, progress)
+
+    @interact_with_db(idempotent=False)  # the triples can only be iterated once
+    def bulk_load(self, triples, batchSize: int = DEFAULT_BATCH_SIZE, dropIndexes: bool = False, progress: callable = None):
+        """Loads (possibly a huge amount of) triples into the database. Intended for "cold" loads.
+
+        With the SQLAlchemy store, the triples are written directly into the statement tables
+        using multi-row inserts, all within a single transaction. The stored rows are
+        identical to the ones created by the "add" or "addN" methods. Optionally, the non-unique
+        (secondary) indexes of the tables can be dropped before the load and rebuilt afterwards,
+        which is usually faster when loading into an empty or a small database.
+        Be aware that some database servers (e.g., MySQL) commit the transaction implicitly
+        when an index is dropped or created.
+
+        With the columnar store, the triples are merged into the sorted indexes once, at the end of the load.
+        With other stores, the triples are simply added in batches via "addN".
+
+        Parameters
+        ----------
+        triples : Iterable
+            (s, p, o) triples, e.g., a generator from knowl.loader.iterateTriples
+        batchSize : int, optional
+            Number of rows per insert statement, by default DEFAULT_BATCH_SIZE
+        dropIndexes : bool, optional
+            Whether to drop the secondary indexes during the load, by default False
+        progress : callable, optional
+            Function called with a knowl.loader.LoadProgress after each batch, by default None
+
+        Returns
+        -------
+        int
+            Number of loaded triples
+        """
+        self.__ensureSetUp()
+        if self.store_type == "columnar":
+            with self.__store.deferredMerge():
+                return loadInBatches(triples, self._addTriples, batchSize, progress)
+        if self.store_type != "alchemy":
+            return loadInBatches(triples, self._addTriples, batchSize, progress)
+        from knowl import alchemy
+
+        def flush(batch):
+            alchemy.insertTriples(self.__store, batch, self._graph, connection, batchSize)
+            self._notifyAdded(batch)
+
+        indexes = alchemy.secondaryIndexes(self.__store) if dropIndexes else []
+        try:
+            with self.__store.engine.begin() as connection:
+                alchemy.dropIndexes(indexes, connection)
+                try:
+                    loaded = loadInBatches(triples, flush, batchSize, progress)
+                except Exception:
+                    try:
+                        alchemy.createIndexes(indexes, connection)
+                    except Exception:  # the original error is more important
+                        logger.exception("Could not recreate the indexes after the failed bulk load")
+                    raise
+                alchemy.createIndexes(indexes, connection)
+        except Exception:
+            # the transaction was rolled back but the listeners were already notified about some additions
+            self._notifyReset()
+            raise
+        return loaded
+
+    @interact_with_db
+    def save_snapshot(self, path: str):
+        """Saves all triples and the bound namespaces into a compact binary snapshot file
+        (see knowl.snapshot). The snapshot can be loaded into a database with the columnar store
+        (see load_snapshot), which is much faster than parsing an ontology file.
+
+        Parameters
+        ----------
+        path : str
+            Path of the snapshot file (overwritten if it exists)
+
+        Returns
+        -------
+        int
+            Number of saved triples
+        """
+        return snapshot.save(path, self._graph.triples((None, None, None)), self._graph.namespaces())
+
+    def load_snapshot(self, path: str):
+        """Replaces the content of the database by a snapshot (see save_snapshot).
+        Only supported by the columnar store. The file is memory-mapped, thus the loading
+        takes almost no time regardless of the size of the snapshot and processes loading
+        the same file share its memory. The file must not be modified while it is loaded
+        (save_snapshot replaces the file instead of rewriting it, therefore it is safe to save a new version).
+        Changes made after the loading are kept in memory.
+
+        Parameters
+        ----------
+        path : str
+            Path of the snapshot file
+
+        Returns
+        -------
+        int
+            Number of loaded triples
         """
-        tmpGraph = Graph()
-        tmpGraph.parse(filepath)
-        self._graph += tmpGraph
+        if self.store_type != "columnar":
+            raise ValueError(f"Snapshots can only be loaded into the columnar store, not into {self.store_type}!")
+        self.__ensureSetUp()
+        self.__loadSnapshot(path)
+        self._notifyReset()
+        return len(self.__store)
+
+    def __loadSnapshot(self, path: str):
+        self.__store._setData(*snapshot.load(path))  # including the namespaces
+        self.__graph.namespace_manager.reset()
+        if self.__queryCache is not None:
+            self.__queryCache.reset()
+
+    @interact_with_db(idempotent=False)  # a repeated parse would duplicate the blank nodes
+    def mergeFilesIntoDB(self, filepaths, workers: int = None, format: str = None, batchSize: int = DEFAULT_BATCH_SIZE,
+                         chunkSize: int = DEFAULT_CHUNK_SIZE, progress: callable = None):
+        """Merge multiple ontology files into the current database. The files are parsed
+        in parallel by a pool of worker processes. Big uncompressed N-Triples files are additionally
+        split into ranges of lines (of about "chunkSize" bytes), which are parsed independently.
+        The parsed triples are written into the database by the calling process (i.e., using a single
+        connection) in batches of "batchSize" triples.
+
+        Blank nodes are kept distinct between the files but the identity of blank nodes
+        within one file is preserved, even if the file is split into multiple ranges.
+
+        Parameters
+        ----------
+        filepaths : Iterable[str]
+            Paths to the files containing the ontologies (see mergeFileIntoDB)
+        workers : int, optional
+            Number of worker processes, by default None (number of CPUs)
+        format : str, optional
+            The rdflib format name of all the files, by default None (guessed for each file)
+        batchSize : int, optional
+            Number of triples sent to the database at once, by default DEFAULT_BATCH_SIZE
+        chunkSize : int, optional
+            Size of the ranges (in bytes) that big N-Triples files are split into, by default DEFAULT_CHUNK_SIZE
+        progress : callable, optional
+            Function called with a knowl.loader.LoadProgress after each batch, by default None
+
+        Returns
+        -------
+        dict
+            Mapping of file paths to knowl.loader.FileImportStats
+        """
+        return loadFilesInParallel(filepaths, self._addTriples, workers, format, batchSize, chunkSize, progress)
 
     @property
     def config(self):
@@ -211,14 +812,124 @@ class OntologyDatabase:
     @interact_with_db
     def bind(self, prefix, namespace, override=True):
         self._graph.bind(prefix.lower(), namespace, override)
+        if self.__queryCache is not None:
+            self.__queryCache.reset()
+
+    def prepare(self, query: str, initNs: dict = None) -> PreparedQuery:
+        """Prepares the SPARQL query for repeated execution (see "query"). The query is parsed
+        and translated into the SPARQL algebra only once. For the Fuseki store, the text of the
+        request (with the prefix declarations) is prepared, the bindings are injected as a VALUES block.
+        The prepared queries are cached (see the "query_cache_size" config parameter and "queryCacheStats").
+
+        Parameters
+        ----------
+        query : str
+            The SPARQL query
+        initNs : dict, optional
+            Namespaces used to resolve the prefixes of the query, by default None (the namespaces bound in the database,
+            the same as if empty)
+
+        Returns
+        -------
+        PreparedQuery
+            The prepared query, pass it to the "query" method
+        """
+        key = (query, tuple(sorted((str(prefix), str(ns)) for prefix, ns in initNs.items())) if initNs else None)
+        if self.__queryCache is not None:
+            prepared = self.__queryCache.get(key)
+            if prepared is not None:
+                return prepared
+        namespaces = dict(initNs) if initNs else dict(self._graph.namespaces())
+        if self.store_type == "fuseki":
+            prepared = PreparedQuery(query, namespaces, self.__store._inject_prefixes(query, namespaces))
+        else:
+            from rdflib.plugins.sparql import prepareQuery
+            prepared = PreparedQuery(query, namespaces, prepareQuery(query, initNs=namespaces))
+        if self.__queryCache is not None:
+            self.__queryCache.put(key, prepared)
+        return prepared
 
     @interact_with_db
-    def query(self, *args, **kwargs) -> Generator:
-        return self._graph.query(*args, **kwargs)
+    def query(self, query, *args, **kwargs) -> Generator:
+        """Runs the SPARQL query (see rdflib.Graph.query). Queries given as text with no other arguments
+        than "initNs" and "initBindings" are prepared (see "prepare") and the prepared queries are cached.
+
+        Parameters
+        ----------
+        query : str, PreparedQuery or rdflib.plugins.sparql.sparql.Query
+            The query
+        args, kwargs
+            Arguments of rdflib.Graph.query (only "initBindings" is used for prepared queries)
+
+        Returns
+        -------
+        rdflib.query.Result
+            The query result
+        """
+        if isinstance(query, str) and self.__queryCache is not None and not args and set(kwargs) <= {"initNs", "initBindings"}:
+            query = self.prepare(query, kwargs.get("initNs"))
+        if not isinstance(query, PreparedQuery):
+            return self._graph.query(query, *args, **kwargs)
+        initBindings = kwargs.get("initBindings")
+        if self.store_type == "fuseki":
+            self.__ensureSetUp()
+            # the prefixes are already declared, the store only appends the VALUES block with the bindings
+            return self.__store.query(query.query, None, initBindings, self.identifier)
+        # the namespaces are passed just to avoid their look-up (the query is already translated)
+        return self._graph.query(query.query, initNs=query.namespaces, initBindings=initBindings)
 
     @interact_with_db
+    def queryCursor(self, query, initNs: dict = None, initBindings: dict = None, pageSize: int = None) -> Cursor:
+        """Runs the SELECT query and returns a cursor retrieving the result in pages (see knowl.cursor).
+        Unlike "query", the result is not fully computed (local stores) or transferred (Fuseki store,
+        the response is parsed while being received) before the first rows are returned.
+
+        Parameters
+        ----------
+        query : str or PreparedQuery
+            The query (see "prepare")
+        initNs : dict, optional
+            Namespaces used to resolve the prefixes of a query given as text, by default None
+        initBindings : dict, optional
+            Initial bindings of the variables, by default None
+        pageSize : int, optional
+            Number of rows retrieved at once, by default None (the "cursor_page_size" config parameter)
+
+        Returns
+        -------
+        knowl.cursor.Cursor
+            Cursor over the rows (rdflib.query.ResultRow)
+        """
+        pageSize = pageSize or self.config.cursor_page_size
+        if not isinstance(query, PreparedQuery):
+            query = self.prepare(query, initNs)
+        if self.store_type == "fuseki":
+            self.__ensureSetUp()
+            text = query.query
+            if initBindings:
+                text += "\nVALUES ( %s )\n{ ( %s ) }\n" % (" ".join("?" + str(v) for v in initBindings),
+                                                           " ".join(my_bnode_ext(node) for node in initBindings.values()))
+            variables = []  # filled in while parsing the response
+            cursor = Cursor(self.__store.streamQuery(text, self.identifier, pageSize, variables), variables)
+        else:
+            from rdflib.plugins.sparql.evaluate import evalQuery
+            from rdflib.query import ResultRow
+            if query.query.algebra.name != "SelectQuery":
+                raise ValueError(f"Only SELECT queries are supported by cursors, got {query.query.algebra.name}")
+            result = evalQuery(self._graph, query.query, initBindings or {})
+            variables = result["vars_"]
+            lock = self.connectionLock if self.singleConnection else None
+            cursor = Cursor(_pages((ResultRow(bindings, variables) for bindings in result["bindings"]), pageSize, lock), variables)
+        cursor._fetchPage()  # failures of the request are retried here
+        return cursor
+
+    @interact_with_db(idempotent=False)
     def update(self, *args, **kwargs) -> Generator:
-        return self._graph.update(*args, **kwargs)
+        try:
+            return self._graph.update(*args, **kwargs)
+        finally:
+            # the effects of an arbitrary update cannot be tracked
+            self._notifyReset()
 
     @interact_with_db
     def add(self, triple: tuple):
@@ -231,7 +942,14 @@ class OntologyDatabase:
         triple : tuple
             (s, p, o) triple
         """
-        self._graph.add(triple)
+        if self.__changes is not None:
+            self.__changes.add(triple)
+            return
+        if self.store_type == "fuseki":
+            self._sendUpdates(sparql.dataUpdates("INSERT", [triple], self.identifier, self.config.max_update_size, my_bnode_ext))
+        else:
+            self._graph.add(triple)
+        self._notifyAdded([tuple(triple)])
 
     @interact_with_db
     def addN(self, triples: list):
@@ -247,9 +965,26 @@ class OntologyDatabase:
         triples : list
             list of (s, p, o) triples to be added into the database
         """
+        if self.__changes is not None:
+            self.__changes.addN(triples)
+            return
+        self._addTriples(triples)
+
+    def _addTriples(self, triples: list):
         # automatically add self.graph as context if not specified directly
-        quads = [t + (self._graph,) for t in triples if len(t) == 3]
-        self._graph.addN(quads)
+        quads = [tuple(t) + (self._graph,) for t in triples if len(t) == 3]
+        if self.store_type == "fuseki":
+            self._sendUpdates(sparql.dataUpdates("INSERT", [q[:3] for q in quads], self.identifier, self.config.max_update_size, my_bnode_ext))
+        else:
+            self._graph.addN(quads)
+        self._notifyAdded([q[:3] for q in quads])
+
+    def _sendUpdates(self, updates):
+        """Sends the SPARQL updates to the Fuseki store packed into as few requests
+        as the "max_update_size" config parameter allows.
+        """
+        for request in sparql.packUpdates(updates, self.config.max_update_size):
+            self.__store.sendUpdate(request)
 
     @interact_with_db
     def remove(self, triple: tuple):
@@ -269,7 +1004,14 @@ class OntologyDatabase:
         triple : tuple
             (s, p, o) triple
         """
-        self._graph.remove(triple)
+        if self.__changes is not None:
+            self.__changes.remove(triple)
+            return
+        if self.store_type == "fuseki":
+            self._sendUpdates(sparql.removalUpdates([tuple(triple)], self.identifier, self.config.max_update_size, my_bnode_ext))
+        else:
+            self._graph.remove(triple)
+        self._notifyRemoved(triple)
 
     @interact_with_db
     def triples(self, triple: tuple):
@@ -292,7 +1034,96 @@ class OntologyDatabase:
         generator
             generator of matching triples
         """
-        return self._graph.triples(triple)
+        return self._triples(tuple(triple))
+
+    def _triples(self, pattern: tuple):
+        """Returns an iterator over the triples matching the pattern, served from the cache if possible.
+        """
+        if self.__cache is None:
+            return self._graph.triples(pattern)
+        cached = self.__cache.get(pattern)
+        if cached is not None:
+            return iter(cached)
+        return self.__cache.fill(pattern, self._graph.triples(pattern))
+
+    @interact_with_db
+    def count(self, pattern: tuple = (None, None, None)) -> int:
+        """Counts the triples matching the pattern without retrieving them, i.e. faster
+        than len(list(db.triples(pattern))). The SQLAlchemy store runs a SELECT COUNT(*) statement,
+        the Fuseki store a SELECT (COUNT(*) ...) query and the columnar store computes the count
+        from its indexes. Cached patterns (see the "cache_size" config parameter) are counted from the cache.
+
+        Parameters
+        ----------
+        pattern : tuple, optional
+            (s, p, o) pattern, None matches anything, by default all triples
+
+        Returns
+        -------
+        int
+            Number of the matching triples
+        """
+        return self._count(tuple(pattern))
+
+    def _count(self, pattern: tuple) -> int:
+        """Counts the triples matching the pattern (see count), without the retries of the decorator
+        (for the use within other decorated methods).
+        """
+        if self.__cache is not None:
+            cached = self.__cache.get(pattern)
+            if cached is not None:
+                return len(cached)
+        self.__ensureSetUp()
+        if self.store_type == "alchemy":
+            from knowl import alchemy
+            return alchemy.countTriples(self.__store, pattern, self._graph)
+        if self.store_type == "fuseki":
+            return sum(int(row[0]) for query in sparql.countQueries([pattern], nodeToSparql=my_bnode_ext) for row in self._graph.query(query))
+        if isinstance(self.__store, ColumnarStore):
+            return self.__store.count(pattern)
+        return sum(1 for _ in self._graph.triples(pattern))
+
+    @interact_with_db
+    def triplesCursor(self, pattern: tuple, pageSize: int = None) -> Cursor:
+        """Returns a cursor retrieving the triples matching the pattern in pages (see knowl.cursor).
+        The SQLAlchemy store streams the rows from the database (server-side cursor), the Fuseki store
+        parses the response while it is being received. Neither holds the whole result in memory.
+        The cache (see the "cache_size" config parameter) is not used.
+
+        Parameters
+        ----------
+        pattern : tuple
+            (s, p, o) pattern, None matches anything
+        pageSize : int, optional
+            Number of triples retrieved at once, by default None (the "cursor_page_size" config parameter)
+
+        Returns
+        -------
+        knowl.cursor.Cursor
+            Cursor over the (s, p, o) triples
+        """
+        pageSize = pageSize or self.config.cursor_page_size
+        pattern = tuple(pattern)
+        if self.store_type == "alchemy":
+            from knowl import alchemy
+            lock = self.connectionLock if self.singleConnection else None
+            pages = alchemy.triplePages(self.__store, pattern, self._graph, pageSize, lock)
+        elif self.store_type == "fuseki":
+            self.__ensureSetUp()
+            query = sparql.triplesQuery(pattern, my_bnode_ext)
+            variables = [rdflib.Variable(v[1:]) for v in sparql.VARIABLES]
+
+            def filled(rows):  # the bound positions are not selected
+                with closing(rows):
+                    for page in rows:
+                        yield [tuple(node if node is not None else row.get(variables[i]) for i, node in enumerate(pattern)) for row in page]
+
+            pages = filled(self.__store.streamQuery(query, self.identifier, pageSize))
+        else:
+            pages = _pages(self._graph.triples(pattern), pageSize, self.connectionLock if self.singleConnection else None)
+        cursor = Cursor(pages)
+        cursor._fetchPage()  # failures of the request are retried here
+        return cursor
 
     @interact_with_db
     def subjects(self, predicate: Identifier = None, object: Identifier = None):
@@ -314,6 +1145,8 @@ class OntologyDatabase:
         generator
             Subjects matching the query
         """
+        if self.__cache is not None:
+            return (s for s, _, _ in self._triples((None, predicate, object)))
         return self._graph.subjects(predicate, object)
 
     @interact_with_db
@@ -379,6 +1212,8 @@ class OntologyDatabase:
         generator
             The objects matching the query
         """
+        if self.__cache is not None:
+            return (o for _, _, o in self._triples((subject, predicate, None)))
         return self._graph.objects(subject, predicate)
 
     @interact_with_db
@@ -494,7 +1329,104 @@ class OntologyDatabase:
         triple : set
             (s, p, o) triple
         """
-        self._graph.set(triple)
+        if self.__changes is not None:
+            self.__changes.set(triple)
+            return
+        if self.store_type == "fuseki":
+            self.__store.sendUpdate(sparql.setUpdate(tuple(triple), self.identifier, my_bnode_ext))
+        else:
+            self._graph.set(triple)
+        s, p, o = triple
+        self._notifyRemoved((s, p, None))
+        self._notifyAdded([(s, p, o)])
+
+    def replaceProperties(self, subject: Identifier, properties: dict):
+        """Replaces all the values of several properties of the subject at once, i.e. a "set"
+        operation for multiple properties (and multiple values). The old values are removed
+        and the new ones added atomically: in a single transaction (SQLAlchemy store)
+        or in a single SPARQL update request (Fuseki store).
+
+        Parameters
+        ----------
+        subject : Identifier
+            The subject
+        properties : dict
+            Mapping of predicates to lists of the new objects, an empty list removes the property
+        """
+        removals = [(subject, predicate, None) for predicate in properties]
+        additions = [(subject, predicate, o) for predicate, objects in properties.items() for o in objects]
+        if self.__changes is not None:
+            for pattern in removals:
+                self.__changes.remove(pattern)
+            self.__changes.addN(additions)
+            return
+        self._applyChanges(removals, additions)
+
+    def replaceN(self, patterns, triples) -> ChangeCounts:
+        """Removes all triples matching any of the patterns and then adds the triples, in bulk.
+        The SQLAlchemy store performs the changes in a single transaction, with one parametrized
+        statement per table and pattern shape (see knowl.alchemy.removePatterns). The Fuseki store
+        sends them in as few SPARQL updates as the "max_update_size" config parameter allows
+        (i.e. large changes are not atomic).
+        Within a session (see "session"), the changes are buffered and nothing is counted.
+
+        Parameters
+        ----------
+        patterns : Iterable
+            (s, p, o) patterns to be removed, None matches anything
+        triples : Iterable
+            (s, p, o) triples to be added
+
+        Returns
+        -------
+        ChangeCounts
+            Number of removed triples (the Fuseki store counts them by queries sent before the updates)
+            and number of added triples (including the ones that already existed), None within a session
+        """
+        patterns = [tuple(pattern) for pattern in patterns]
+        triples = list(dict.fromkeys(tuple(triple) for triple in triples))
+        if self.__changes is not None:
+            for pattern in patterns:
+                self.__changes.remove(pattern)
+            self.__changes.addN(triples)
+            return None
+        removed = self._applyChanges(patterns, triples, count=True, chunked=True)
+        return ChangeCounts(removed, len(triples))
+
+    def setMany(self, triples) -> ChangeCounts:
+        """Bulk version of "set": replaces all values of the subject's property by the object, for each triple.
+        If more triples have the same subject and predicate, the last one is set. See replaceN.
+
+        Parameters
+        ----------
+        triples : Iterable
+            (s, p, o) triples
+
+        Returns
+        -------
+        ChangeCounts
+            Number of removed (old values, including the ones equal to the new values) and added triples
+        """
+        values = {}
+        for s, p, o in triples:
+            values[(s, p)] = o
+        return self.replaceN([(s, p, None) for s, p in values], [(s, p, o) for (s, p), o in values.items()])
+
+    def removeN(self, patterns) -> int:
+        """Bulk version of "remove": removes all triples matching any of the patterns. See replaceN.
+
+        Parameters
+        ----------
+        patterns : Iterable
+            (s, p, o) patterns, None matches anything
+
+        Returns
+        -------
+        int
+            Number of removed triples (None within a session)
+        """
+        counts = self.replaceN(patterns, [])
+        return None if counts is None else counts.removed
 
     @interact_with_db
     def value(self, subject: Identifier = None, predicate: Identifier = RDF.value, object: Identifier = None, default=None, any=True):
@@ -522,7 +1454,63 @@ class OntologyDatabase:
         any
             The expected value
         """
-        return self._graph.value(subject, predicate, object, default, any)
+        pattern = (subject, predicate, object)
+        if self.__cache is None or pattern.count(None) != 1:
+            return self._graph.value(subject, predicate, object, default, any)
+        position = pattern.index(None)
+        values = [t[position] for t in self._triples(pattern)]
+        if not values:
+            return default
+        if any is False and len(values) > 1:
+            raise UniquenessError(values)
+        return values[0]
+
+    @interact_with_db
+    def _instancesPage(self, classes: list, typePredicate: Identifier = RDF.type, after: Identifier = None, limit: int = 1000,
+                       predicates: list = None, allPredicates: bool = False, blankNodes: int = 0):
+        """Retrieves one page of instances of the specified classes, ordered by the instance identifiers
+        (see OntologyAPI.getEntsByClass). Uses a single query per page (two for the page where the IRIs end).
+        Blank nodes cannot be compared in SPARQL, therefore the SPARQL stores return them after all the IRIs,
+        paged by the number of the blank node instances retrieved by the previous pages ("blankNodes").
+
+        Returns
+        -------
+        tuple
+            (list of instances, list of (s, p, o) triples with the requested properties of the instances)
+        """
+        if self.store_type == "alchemy" and typePredicate == RDF.type:
+            from knowl import alchemy
+            return alchemy.selectInstancesPage(self.__store, classes, self._graph, after, limit, predicates, allPredicates)
+
+        nodeToSparql = my_bnode_ext if self.store_type == "fuseki" else (lambda node: node.n3())
+        members, triples = [], []
+
+        def select(**page):
+            query = sparql.instancesPageQuery(classes, typePredicate, limit=limit - len(members), predicates=predicates,
+                                              allPredicates=allPredicates, nodeToSparql=nodeToSparql, **page)
+            for s, p, o in self._graph.query(query):
+                if not members or members[-1] != s:
+                    members.append(s)
+                if p is not None:
+                    triples.append((s, p, o))
+
+        if not isinstance(after, BNode):
+            select(after=after)
+        if len(members) < limit:  # no (more) IRIs
+            select(offset=blankNodes)
+        return members, triples
+
+    @interact_with_db
+    def _countInstances(self, classes: list, typePredicate: Identifier = RDF.type) -> int:
+        """Counts the (distinct) instances of the classes with a single query (see OntologyAPI.countEntsByClass).
+        """
+        if self.store_type == "alchemy" and typePredicate == RDF.type:
+            from knowl import alchemy
+            return alchemy.countInstances(self.__store, classes, self._graph)
+        if len(classes) == 1:
+            return self._count((None, typePredicate, classes[0]))
+        nodeToSparql = my_bnode_ext if self.store_type == "fuseki" else (lambda node: node.n3())
+        return sum(int(row[0]) for row in self._graph.query(sparql.instancesCountQuery(classes, typePredicate, nodeToSparql)))
 
     @interact_with_db
     def compute_qname(self, uri):
@@ -555,7 +1543,47 @@ class OntologyDatabase:
         This function is only a "safe" re-implementation of the original rdflib graph function.
         See rdflib.Graph documentation for more information.
         """
-        return item in self._graph
+        if self.__cache is not None and isinstance(item, tuple) and len(item) == 3:
+            cached = self.__cache.get(item)
+            if cached is not None:
+                return len(cached) > 0
+        return item in self._graph  # stops at the first match, the (possibly big) result is not cached
+
+    @interact_with_db
+    def containsMany(self, triples) -> list:
+        """Checks which of the triples (or patterns, see "__contains__") are contained in the database.
+        Unlike checking them one by one, the SQLAlchemy and Fuseki stores need a single query per chunk
+        of triples of the same shape (an IN list or a VALUES block, respectively).
+
+        Parameters
+        ----------
+        triples : Iterable
+            (s, p, o) triples, None matches anything
+
+        Returns
+        -------
+        list
+            Whether each of the triples is contained in the database (bool, in the order of the triples)
+        """
+        patterns = [tuple(t) for t in triples]
+        if not patterns:
+            return []
+        self.__ensureSetUp()
+        if self.store_type == "alchemy":
+            from knowl import alchemy
+            found = alchemy.containedPatterns(self.__store, patterns, self._graph)
+            return [i in found for i in range(len(patterns))]
+        if self.store_type == "fuseki":
+            found = set()  # (positions of the given parts, the given parts) of the matching patterns
+            for bound, query in sparql.existenceQueries(patterns, self.config.max_update_size, my_bnode_ext):
+                for row in self._graph.query(query):
+                    found.add((bound, tuple(my_bnode_ext(row[i]) for i in range(len(bound)))))
+            contained = []
+            for pattern in patterns:
+                bound = tuple(i for i, node in enumerate(pattern) if node is not None)
+                contained.append((bound, tuple(my_bnode_ext(pattern[i]) for i in bound)) in found)
+            return contained
+        return [pattern in self._graph for pattern in patterns]
 
     @property
     def graph(self):
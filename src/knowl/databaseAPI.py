@@ -8,19 +8,39 @@
 """
 
 from knowl import OntologyDatabase, DBConfig
+from knowl.hierarchy import HierarchyIndex
 from rdflib import URIRef, BNode, Literal
 from rdflib.term import Identifier
-from rdflib.namespace import Namespace, RDF, RDFS, OWL, FOAF
+from rdflib.namespace import Namespace, RDF, RDFS, OWL, FOAF, split_uri
 from collections import defaultdict
 from collections.abc import Iterable
 from itertools import chain
-from rdflib.extras.infixowl import classOrIdentifier
 import re
+import threading
+
+
+def classOrIdentifier(thing):
+    """Returns the identifier of an infixowl class (or the thing itself), see rdflib.extras.infixowl.classOrIdentifier.
+    """
+    from rdflib.extras.infixowl import classOrIdentifier  # infixowl is imported on the first use
+    return classOrIdentifier(thing)
 
 
 class OntologyAPI(OntologyDatabase):
+    """Object-oriented API of an ontology database.
+
+    Thread safety: a single OntologyAPI object (per ontology) can be shared by multiple threads,
+    e.g. by the workers of a threaded WSGI server. Each database operation checks out its own
+    connection from the connection pool (see the "pool_size" config parameter), thus reads
+    of different threads run in parallel. The only exception is the in-memory SQLite database,
+    which has a single connection and the operations are serialized (see OntologyDatabase.connectionLock).
+    The registry of the ontologies and the identity map of the entities are protected by locks,
+    sessions (see OntologyDatabase.session) are per thread.
+    """
 
     __databaseDict = {}
+    __registryLock = threading.RLock()
+    __initialized = False
 
     def __new__(cls, config=None, *args, **kwargs):
         """Returns an ontology database. The ontologies are identified by the uniqueID
@@ -39,31 +59,67 @@ class OntologyAPI(OntologyDatabase):
         """
         config = DBConfig.factory(config)  # factory enables config specification in several formats, this line unifies them.
         id = config.uniqueID  # get the unique ID for the specific database+ontology
-        if id in cls.__databaseDict:  # if ontology was already initialized in this program session, retrieve its reference
-            db = cls.__databaseDict[id]
-        else:  # otherwise create new ontology connection
-            # db = OntologyAPI(config=config)
-            db = super().__new__(cls)
-            cls.__databaseDict[id] = db
+        with cls.__registryLock:
+            if id in cls.__databaseDict:  # if ontology was already initialized in this program session, retrieve its reference
+                db = cls.__databaseDict[id]
+            else:  # otherwise create new ontology connection
+                # db = OntologyAPI(config=config)
+                db = super().__new__(cls)
+                cls.__databaseDict[id] = db
         return db
 
     def __init__(self, config=None):
-        super().__init__(config=config, create=True)
-        self.setup()
+        # __new__ returns already initialized objects for known ontologies, initialize each only once
+        with OntologyAPI.__registryLock:
+            if self.__initialized:
+                return
+            self.__initialize(config)
+            self.__initialized = True
+
+    def __initialize(self, config):
+        super().__init__(config=config, create=True)  # the database is set up on the first use
         self.__objects = {}
-        self.__nss = {ns[0]: Namespace(ns[1]) for ns in self._graph.namespaces()}
-
-        self.__baseNamespace = self.namespaces["base"]
+        self.__objectsLock = threading.RLock()
+        self.__nss = None
+        self.__prefetch = False
+        self.__hierarchies = {}
+        for predicate in [RDFS.subClassOf, RDFS.subPropertyOf]:
+            self.__hierarchies[predicate] = HierarchyIndex(predicate, lambda predicate=predicate: self.subject_objects(predicate))
+            self.addChangeListener(self.__hierarchies[predicate])
+
+    def destroy(self, confirmation: str = None):
+        """Destroys the store for the Ontology (see OntologyDatabase.destroy).
+        The ontology is also removed from the registry, i.e. the next OntologyAPI
+        call with the same config creates a new object.
+        """
+        super().destroy(confirmation)
+        with OntologyAPI.__registryLock:
+            OntologyAPI.__databaseDict.pop(self.config.uniqueID, None)
+        with self.__objectsLock:
+            self.__objects.clear()
 
     @property
     def namespaces(self):
-        """Returns a dictionary of namespaces binded to the database
+        """Returns a dictionary of namespaces binded to the database (retrieved on the first access)
         """
+        if self.__nss is None:
+            self.__nss = {ns[0]: Namespace(ns[1]) for ns in self._graph.namespaces()}
         return self.__nss
 
     @property
     def baseNS(self):
-        return self.__baseNamespace
+        return self.namespaces["base"]
+
+    @property
+    def prefetch(self):
+        """If True, entities load all their properties with a single query on the first
+        access to any of them and serve subsequent reads locally (see OntoEntity.refresh).
+        """
+        return self.__prefetch
+
+    @prefetch.setter
+    def prefetch(self, value: bool):
+        self.__prefetch = bool(value)
 
     def getProperty(self, property):
         # TODO
@@ -89,16 +145,39 @@ class OntologyAPI(OntologyDatabase):
             predicate = None
         else:
             predicate = RDF.type
-        return (reference, predicate, None) in self._graph
+        return (reference, predicate, None) in self
+
+    def existMany(self, references, anyRecord: bool = False) -> list:
+        """Checks which of the entities exist in the ontology (see existEntity), using a single query
+        per chunk of references (see OntologyDatabase.containsMany).
+
+        Parameters
+        ----------
+        references : Iterable
+            References to the entities
+        anyRecord : bool, optional
+            If set to True, will search for any entry referencing the objects (as the subject).
+            If set to False, existence of the entity's type is required. By default False
+
+        Returns
+        -------
+        list
+            Whether each of the entities exists within the database (bool, in the order of the references)
+        """
+        predicate = None if anyRecord else RDF.type
+        return self.containsMany([(URIRef(r) if isinstance(r, str) and not isinstance(r, Identifier) else r, predicate, None)
+                                  for r in references])
 
     def getEntity(self, reference, makeIfDoesNotExist: bool = False):
         """Returns a proxy to an entity in the ontology.
         If the object corresponding to the reference already exists in the database then simply the reference
         is returned. If it does not exist, it will be created.
+        If a collection of references is provided, a list of proxies is returned and the existence
+        of all the entities is checked at once (see existMany).
 
         Parameters
         ----------
-        reference : Identifier
+        reference : Identifier or Iterable
             [description]
 
         makeIfDoesNotExist : bool
@@ -110,6 +189,8 @@ class OntologyAPI(OntologyDatabase):
         OntoEntity
             A proxy for the entity in the ontology.
         """
+        if _isCollection(reference):
+            return self.__getEntities(reference, makeIfDoesNotExist)
         # create empty object as a default return value if no object exist and create is False
         obj = None
         # make sure reference is a valid identifier
@@ -117,13 +198,15 @@ class OntologyAPI(OntologyDatabase):
             reference = URIRef(reference)
         # create reference string
         refString = reference.n3()
-        # check if the referenced objects is remembered by the API
-        if refString in self.__objects:
-            obj = self.__objects[refString]
+        # the lock only guards the identity map, the database is queried without holding it
+        with self.__objectsLock:
+            # check if the referenced objects is remembered by the API
+            obj = self.__objects.get(refString)
+        if obj is not None:
             # check if the referenced object still exists within the DB
             if not obj.exists:
                 # if the object is no longer in DB, remove it from the dict and return None
-                del self.__objects[refString]
+                self.__forgetObject(refString, obj)
                 return None
         else:
             # check if the reference exist within the database
@@ -134,6 +217,41 @@ class OntologyAPI(OntologyDatabase):
                 obj = self.makeEntity(reference)
         return obj
 
+    def __forgetObject(self, refString: str, obj):
+        """Removes the object from the identity map, unless it was replaced by another thread meanwhile.
+        """
+        with self.__objectsLock:
+            if self.__objects.get(refString) is obj:
+                del self.__objects[refString]
+
+    def __rememberObject(self, refString: str, obj):
+        """Stores the object in the identity map. Returns the object stored by another thread meanwhile, if any.
+        """
+        with self.__objectsLock:
+            return self.__objects.setdefault(refString, obj)
+
+    def __getEntities(self, references, makeIfDoesNotExist: bool = False):
+        """The same as getEntity for each of the references, but with a single existence check (per chunk).
+        """
+        references = [URIRef(r) if isinstance(r, str) and not isinstance(r, Identifier) else r for r in references]
+        with self.__objectsLock:
+            known = [self.__objects.get(reference.n3()) for reference in references]
+        # the remembered objects must still exist in the DB, the others must have a type
+        exist = self.containsMany([(reference, None, None) if obj is not None else (reference, RDF.type, None)
+                                   for reference, obj in zip(references, known)])
+        objects, missing = [], []
+        for reference, obj, exists in zip(references, known, exist):
+            if obj is not None and not exists:
+                self.__forgetObject(reference.n3(), obj)
+                obj = None
+            elif obj is None and not exists and makeIfDoesNotExist:
+                missing.append((len(objects), reference))
+            objects.append(obj)
+        if missing:
+            for (i, _), obj in zip(missing, self.makeEntity([reference for _, reference in missing])):
+                objects[i] = obj
+        return objects
+
     def makeEntity(self, reference, attributes: dict = {}, **kwargs):
         """Creates and object in this ontology
         Objects should only be created using this function (i.e. not by instantiating the OntoObject class directly).
@@ -149,11 +267,15 @@ class OntologyAPI(OntologyDatabase):
         Returns
         -------
         OntoEntity
-            A proxy for the entity in the ontology.
+            A proxy for the entity in the ontology. A list of proxies if a collection of references is provided
+            (the same attributes are set to all the entities, the existence of the entities is checked at once).
         """
-        refString = reference.n3()
         # merge the attributes
         attributes = {**attributes, **self.__expandPythonAttributes(kwargs)}
+        if _isCollection(reference):
+            return self.__makeEntities([URIRef(r) if isinstance(r, str) and not isinstance(r, Identifier) else r for r in reference],
+                                       attributes)
+        refString = reference.n3()
         # check if the referenced objects is remembered by the API
         obj = self.getEntity(reference, makeIfDoesNotExist=False)
         if obj is not None:
@@ -167,9 +289,28 @@ class OntologyAPI(OntologyDatabase):
             else:
                 # This kind of entity creation assumes that the class/type of the entity is specified in the attributes!!!
                 obj = OntoEntity(self, name=reference, **attributes)
-            self.__objects[refString] = obj
+            # prevents duplicate proxies if another thread created the same entity meanwhile
+            obj = self.__rememberObject(refString, obj)
         return obj
 
+    def __makeEntities(self, references: list, attributes: dict):
+        """The same as makeEntity for each of the references, but with batched existence checks.
+        """
+        objects = self.getEntity(references, makeIfDoesNotExist=False)
+        missing = [i for i, obj in enumerate(objects) if obj is None]
+        isClass = self.containsMany([(references[i], RDF.type, OWL.Class) for i in missing])
+        for obj in objects:
+            if obj is not None:
+                obj[attributes.keys()] = attributes.values()
+        for i, referenceIsClass in zip(missing, isClass):
+            reference = references[i]
+            if referenceIsClass:
+                obj = OntoEntity(self, **{**{RDF.type: reference}, **attributes})
+            else:
+                obj = OntoEntity(self, name=reference, **attributes)
+            objects[i] = self.__rememberObject(reference.n3(), obj)
+        return objects
+
     def __getattr__(self, key):
         """Properties that do not exist as a part of this class are returned as URI from the base namespace
         """
@@ -205,8 +346,13 @@ class OntologyAPI(OntologyDatabase):
         self._graph.compute_qname
         return pyattributes
 
-    def getEntsByClass(self, cls, typePredicate: URIRef = RDF.type):
-        """Returns a list of entities of the specified class or type.
+    def getEntsByClass(self, cls, typePredicate: URIRef = RDF.type, includeSubclasses: bool = False,
+                       prefetch=False, pageSize: int = 1000):
+        """Generates entities of the specified class or type. The entities are retrieved lazily,
+        in pages of "pageSize" entities, using one query per page. Thus, classes with huge amounts
+        of instances can be iterated without loading all of them into memory.
+        The entities are registered in the API (i.e., getEntity will return the same objects)
+        without checking their existence again.
 
         Parameters
         ----------
@@ -218,22 +364,138 @@ class OntologyAPI(OntologyDatabase):
             denoting the "entity is of class" statement. Under normal circumstances,
             there shall be no need to actually change this, by default RDF.type.
 
+        includeSubclasses : bool, optional
+            Also generate instances of the (transitive) subclasses of the class, by default False
+
+        prefetch : [bool, list], optional
+            Properties of the entities to be retrieved within the same query as the entities
+            (see OntoEntity.refresh). Either True (all properties) or a list of properties, by default False
+
+        pageSize : int, optional
+            Number of entities retrieved per query, by default 1000
+
+        Yields
+        -------
+        OntoEntity
+            Entities with the specified type, ordered by their identifiers
+            (with the SPARQL stores, the blank nodes come after the IRIs in the order of the store).
+        """
+        if isinstance(cls, str) and not isinstance(cls, Identifier):
+            cls = URIRef(cls)
+        cls = classOrIdentifier(cls)
+        classes = [cls] + sorted(self.descendants(cls)) if includeSubclasses else [cls]
+
+        allPredicates = prefetch is True
+        predicates = None if isinstance(prefetch, bool) else [castIntoProperURI(p, self.baseNS) for p in prefetch]
+
+        after, blankNodes = None, 0
+        while True:
+            members, triples = self._instancesPage(classes, typePredicate, after, pageSize, predicates, allPredicates, blankNodes)
+            properties = {}
+            for s, p, o in triples:
+                properties.setdefault(s, {}).setdefault(p, []).append(o)
+            for member in members:
+                entity = self.__registerEntity(member)
+                if prefetch is not False:
+                    entity._hydrate(properties.get(member, {}), predicates)
+                yield entity
+            if len(members) < pageSize:
+                break
+            after = members[-1]
+            blankNodes += sum(1 for member in members if isinstance(member, BNode))
+
+    def countEntsByClass(self, cls, typePredicate: URIRef = RDF.type, includeSubclasses: bool = False) -> int:
+        """Counts the entities of the specified class or type (see getEntsByClass) with a single query,
+        without retrieving them.
+
+        Parameters
+        ----------
+        cls : [str, URIRef]
+            The identifier of the class
+        typePredicate : URIRef, optional
+            The predicate denoting the "entity is of class" statement, by default RDF.type
+        includeSubclasses : bool, optional
+            Also count instances of the (transitive) subclasses of the class (each entity once), by default False
+
         Returns
         -------
-        list of OntoEntity
-            A list of objects with the specified type.
+        int
+            Number of the entities
         """
-        pass
+        if isinstance(cls, str) and not isinstance(cls, Identifier):
+            cls = URIRef(cls)
+        cls = classOrIdentifier(cls)
+        classes = [cls] + sorted(self.descendants(cls)) if includeSubclasses else [cls]
+        return self._countInstances(classes, typePredicate)
+
+    def __registerEntity(self, reference):
+        """Returns the entity proxy for the reference from the identity map (or creates one)
+        without checking the entity existence in the database.
+        """
+        refString = reference.n3()
+        with self.__objectsLock:
+            if refString not in self.__objects:
+                self.__objects[refString] = OntoEntity(self, name=reference)
+            return self.__objects[refString]
 
     def isAncestorOf(self, alleged_ancestor, thing):
-        # FIXME: there simply HAS TO BE a better way
-        return classOrIdentifier(alleged_ancestor) in self.transitive_objects(classOrIdentifier(thing), RDFS.subClassOf)
+        """Checks whether the "alleged_ancestor" is a (transitive) superclass of the "thing"
+        (or the thing itself). Answered from the class hierarchy index, see the "ancestors" method.
+        """
+        alleged_ancestor, thing = classOrIdentifier(alleged_ancestor), classOrIdentifier(thing)
+        return alleged_ancestor == thing or self.__hierarchies[RDFS.subClassOf].isAncestorOf(alleged_ancestor, thing)
+
+    def ancestors(self, cls, predicate: URIRef = RDFS.subClassOf):
+        """Returns all (transitive) superclasses of the class.
+
+        The hierarchy (all rdfs:subClassOf and rdfs:subPropertyOf triples) is loaded into an in-memory
+        index on the first use and then kept up to date with the changes made through this API.
+        The closures are memoized, thus repeated calls are answered without touching the database.
+
+        Parameters
+        ----------
+        cls : Identifier or OntoEntity
+            The class
+        predicate : URIRef, optional
+            The hierarchical predicate, either RDFS.subClassOf or RDFS.subPropertyOf, by default RDFS.subClassOf
+
+        Returns
+        -------
+        frozenset
+            The ancestors (not including the class itself)
+        """
+        return self.__hierarchy(predicate).ancestors(classOrIdentifier(cls))
+
+    def descendants(self, cls, predicate: URIRef = RDFS.subClassOf):
+        """Returns all (transitive) subclasses of the class (not including the class itself).
+        See the "ancestors" method for details.
+        """
+        return self.__hierarchy(predicate).descendants(classOrIdentifier(cls))
+
+    def superProperties(self, prop):
+        """Returns all (transitive) super-properties of the property.
+        """
+        return self.ancestors(prop, RDFS.subPropertyOf)
+
+    def subProperties(self, prop):
+        """Returns all (transitive) sub-properties of the property.
+        """
+        return self.descendants(prop, RDFS.subPropertyOf)
+
+    def __hierarchy(self, predicate):
+        if predicate not in self.__hierarchies:
+            raise ValueError(f"There is no hierarchy index for the predicate {predicate}!")
+        return self.__hierarchies[predicate]
 
 
 # TODO: maybe more thought should be put into this
 uriMatchingRegex = re.compile(r".+\/\w+\.\w+", re.IGNORECASE)
 
 
+def _isCollection(reference):
+    return isinstance(reference, Iterable) and not isinstance(reference, str)
+
+
 def isValidURI(ref):
     return uriMatchingRegex.search(ref) is not None
 
@@ -314,6 +576,11 @@ class OntoEntity():
     This class provides a convenience access to the entities inside the ontologic database.
     Creating this object directly is not recommended. Use OntologyAPI.makeObject or similar function instead.
 
+    The "name" keyword argument sets the node of the entity: an rdflib Identifier (e.g., the URIRef passed
+    to OntologyAPI.makeEntity) is used as it is, any other name becomes a blank node with that name.
+    Earlier versions made a blank node of every name, thus makeEntity(URIRef(...)) wrote the properties
+    of a blank node labelled by the IRI instead of the IRI itself.
+
     # TODO: check whether an object should be a VALUE or not (i.e. update only once)
     """
 
@@ -322,9 +589,12 @@ class OntoEntity():
 
         self.__onto = onto
         self.__baseNS = self.__onto.baseNS
+        self.__snapshot = None  # local copy of the properties (predicate -> list of objects)
+        self.__snapshotPredicates = None  # properties held by the snapshot, None means all of them
 
         if "name" in kwargs:
-            self.__node = BNode(kwargs["name"])
+            name = kwargs["name"]
+            self.__node = name if isinstance(name, Identifier) else BNode(name)
             del kwargs["name"]
         else:
             self.__node = BNode()
@@ -352,8 +622,7 @@ class OntoEntity():
         elif key.lower() in self.__onto.namespaces:
             return ProxyAttribute(self.__onto.namespaces[key.lower()], self)
         else:
-            q = (self.node, castIntoProperURI(key, self.__baseNS), None)
-            ans = [a[2] for a in self.__onto.triples(q)]
+            ans = self.__values(castIntoProperURI(key, self.__baseNS))
             if len(ans) == 1:
                 return ans[0]
             else:
@@ -372,10 +641,10 @@ class OntoEntity():
             if key.lower() in self.__onto.namespaces:
                 return ProxyAttribute(self.__onto.namespaces[key.lower()], self)
             else:
-                value = castIntoValidTerm(value)
                 # TODO: take care of "set" values!
-                q = (self.node, castIntoProperURI(key, self.__baseNS), value)
-                self.__onto.set(q)
+                changes = {castIntoProperURI(key, self.__baseNS): [castIntoValidTerm(value)]}
+                self.__onto.replaceProperties(self.node, changes)
+                self.__updateSnapshot(changes)
 
     def __setitem__(self, keys, values):
         """Working examples
@@ -389,11 +658,13 @@ class OntoEntity():
         """
         # check if multiple values were provided
         if isinstance(keys, Iterable) and not (isinstance(keys, Identifier) or isinstance(keys, str)):
-            # form multiple triples and send them at once to the database
-            for k in keys:
-                # Remove previous entries with the same property, i.e. perform an "update" - maybe change this in the future
-                self.__onto.remove((self.node, k, None))
-            self.__onto.addN([(self.node, castIntoProperURI(k, self.__baseNS), castIntoValidTerm(v)) for (k, v) in zip(keys, values)])
+            # replace the previous values of the properties (i.e. perform an "update") in a single atomic call
+            keys = [castIntoProperURI(k, self.__baseNS) for k in keys]
+            changes = {k: [] for k in keys}
+            for k, v in zip(keys, values):
+                changes[k].append(castIntoValidTerm(v))
+            self.__onto.replaceProperties(self.node, changes)
+            self.__updateSnapshot(changes)
         else:
             # is only a single field is to be updated, use the setattr method
             self.__setattr__(keys, values)
@@ -410,7 +681,7 @@ class OntoEntity():
         """
         if isinstance(keys, Iterable) and not (isinstance(keys, Identifier) or isinstance(keys, str)):
             # form multiple triples and send them at once to the database
-            ans = list(chain(*[self.__onto.objects(self.node, castIntoProperURI(k, self.__baseNS)) for k in keys]))
+            ans = list(chain(*[self.__values(castIntoProperURI(k, self.__baseNS)) for k in keys]))
             return ans
         else:
             # is only a single field is to be updated, use the setattr method
@@ -422,6 +693,8 @@ class OntoEntity():
 
     @property
     def properties(self):
+        if self.__isLoaded() and self.__snapshotPredicates is None:
+            return [(p, o) for p, objects in self.__snapshot.items() for o in objects]
         return list(self.__onto.predicate_objects(self.node))
 
     @property
@@ -430,7 +703,7 @@ class OntoEntity():
 
     @property
     def type(self):
-        ans = list(self.__onto.objects(subject=self.node, predicate=RDF.type))
+        ans = self.__values(RDF.type)
         return ans[0] if len(ans) == 1 else ans
 
     @property
@@ -439,12 +712,81 @@ class OntoEntity():
         That is, only the last part of the type URI (e.g., "Cube")
         """
         globalType = self.type
+        # split_uri yields the same local name as compute_qname but does not need to look up the prefixes
         if isinstance(globalType, list):
-            localType = [self.__onto.compute_qname(t)[2] for t in globalType]
+            localType = [split_uri(t)[1] for t in globalType]
         else:
-            _, _, localType = self.__onto.compute_qname(globalType)
+            _, localType = split_uri(globalType)
         return localType
 
+    def refresh(self):
+        """(Re-)loads all the properties of this entity from the database using a single query.
+        Afterwards, property reads (attributes, item access, "type", "properties")
+        are served from this local copy, which is kept up to date with the writes done
+        via this entity. Call this method again to see changes made by other means.
+
+        Returns
+        -------
+        OntoEntity
+            self
+        """
+        snapshot = {}
+        for p, o in self.__onto.predicate_objects(self.node):
+            snapshot.setdefault(p, []).append(o)
+        self._hydrate(snapshot)
+        return self
+
+    def _hydrate(self, properties: dict, predicates: list = None):
+        """Sets the local copy of the properties (see refresh) from already retrieved data.
+
+        Parameters
+        ----------
+        properties : dict
+            Mapping of predicates to lists of objects
+        predicates : list, optional
+            The predicates that were retrieved (the missing ones have no values),
+            by default None, meaning all the properties of the entity were retrieved
+        """
+        self.__snapshot = {p: list(objects) for p, objects in properties.items()}
+        self.__snapshotPredicates = None if predicates is None else set(predicates)
+
+    def forget(self):
+        """Drops the local copy of the properties (see refresh). Subsequent reads will query the database.
+        """
+        self.__snapshot = None
+        self.__snapshotPredicates = None
+
+    @property
+    def loaded(self):
+        """Whether the properties of this entity are held locally (see refresh).
+        """
+        return self.__snapshot is not None
+
+    def __isLoaded(self):
+        if self.__snapshot is None and self.__onto.prefetch:
+            self.refresh()
+        return self.__snapshot is not None
+
+    def __values(self, predicate):
+        """Returns a list of objects of the specified property of this entity.
+        """
+        if self.__isLoaded() and (self.__snapshotPredicates is None or predicate in self.__snapshotPredicates):
+            return list(self.__snapshot.get(predicate, []))
+        return [o for _, _, o in self.__onto.triples((self.node, predicate, None))]
+
+    def __updateSnapshot(self, changes: dict):
+        """Replaces the values of the properties in the local copy.
+        """
+        if self.__snapshot is None:
+            return
+        if self.__onto.inSession:
+            # the changes are not yet written and might be discarded, read from the DB next time
+            self.forget()
+            return
+        self.__snapshot.update({p: list(objects) for p, objects in changes.items()})
+        if self.__snapshotPredicates is not None:
+            self.__snapshotPredicates.update(changes.keys())
+
     # def _set_type(self, kind):
     # TODO:
     #     if not kind:
@@ -464,7 +806,9 @@ class OntoEntity():
         if name.startswith("_") or name in self.__dir__():
             return super().__delattr__(name)
         else:
-            return self.__onto.remove((self.node, name, None))
+            predicate = castIntoProperURI(name, self.__baseNS)
+            self.__onto.remove((self.node, predicate, None))
+            self.__updateSnapshot({predicate: []})
 
     def destroy(self):
         """Removes any entries containing this entity. Removes entries containing this entity
@@ -473,6 +817,7 @@ class OntoEntity():
         # TODO: more careful removal
         self.__onto.remove((self.node, None, None))
         self.__onto.remove((None, None, self.node))
+        self.forget()
 
     @property
     def exists(self):
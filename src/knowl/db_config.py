@@ -11,7 +11,6 @@ from rdflib.namespace import FOAF
 from rdflib import Literal, URIRef
 from warnings import warn
 import os
-import yaml
 import json
 
 
@@ -26,8 +25,37 @@ class DBConfig(object):
     @staticmethod
     def getInMemoryConfig(database: str = "onto",
                           baseURL: str = "http://dbpedia.org/ontology/",
-                          namespaces: dict = {"foaf": FOAF}):
-        return DBConfig(host=DBConfig.IN_MEMORY, database=database, baseURL=baseURL, namespaces=namespaces)
+                          namespaces: dict = {"foaf": FOAF},
+                          **kwargs):
+        return DBConfig(host=DBConfig.IN_MEMORY, database=database, baseURL=baseURL, namespaces=namespaces, **kwargs)
+
+    @staticmethod
+    def getFileConfig(path: str,
+                      baseURL: str = "http://dbpedia.org/ontology/",
+                      namespaces: dict = {"foaf": FOAF},
+                      **kwargs):
+        """Creates a configuration for an embedded, file-backed SQLite database.
+        The connections are tuned for local use (see the "sqlite_pragmas" parameter of the constructor).
+
+        Parameters
+        ----------
+        path : str
+            Path to the database file (created if it does not exist). A "sqlite:///path" URI is accepted as well.
+        baseURL : str, optional
+            Base URL or ontology IRI, by default "http://dbpedia.org/ontology/"
+        namespaces : dict, optional
+            Additional namespaces to bind to the database, by default {"foaf": FOAF}
+        kwargs
+            Other parameters of the config, see the DBConfig constructor
+
+        Returns
+        -------
+        DBConfig
+        """
+        if path.startswith(DBConfig.FILE_PREFIX):
+            path = path[len(DBConfig.FILE_PREFIX):]
+        return DBConfig(host="", port=None, dialect="sqlite", driver="pysqlite", database=path,
+                        baseURL=baseURL, namespaces=namespaces, **kwargs)
 
     @staticmethod
     def factory(cfg=None):
@@ -75,6 +103,7 @@ class DBConfig(object):
         extension = extension[1:].lower()
         with open(filepath, 'r') as file:
             if any([ext in extension.lower() for ext in ['yaml', 'yml']]):
+                import yaml  # only needed for YAML configs
                 cfg = yaml.safe_load(file)
             elif 'json' in extension.lower():
                 cfg = json.load(file)
@@ -83,6 +112,18 @@ class DBConfig(object):
         return DBConfig(**cfg)
 
     IN_MEMORY = "sqlite://"
+    FILE_PREFIX = "sqlite:///"
+    # connection settings of file-backed SQLite databases: write-ahead log (readers do not block the writer
+    # and vice versa), fsync only at checkpoints, memory-mapped reads (256 MB), 64 MB page cache,
+    # wait up to 5 s for a lock held by another connection
+    DEFAULT_SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    }
 
     def __init__(self, host: str = "127.0.0.1", port: int = 3306,
                  username: str = None, password: str = None,
@@ -91,7 +132,22 @@ class DBConfig(object):
                  baseURL: str = "http://dbpedia.org/ontology/",
                  namespaces: dict = {"foaf": FOAF},
                  store:str = "alchemy",
-                 fuseki_path:str = ""):
+                 fuseki_path:str = "",
+                 cache_size: int = 0,
+                 query_cache_size: int = 128,
+                 cursor_page_size: int = 1000,
+                 pool_size: int = 5,
+                 max_overflow: int = 10,
+                 pool_timeout: float = 30,
+                 pool_recycle: int = 3600,
+                 pool_pre_ping: bool = True,
+                 retries: int = 3,
+                 retry_backoff: float = 0.1,
+                 retry_max_backoff: float = 5.0,
+                 max_update_size: int = 1000000,
+                 sqlite_pragmas: dict = None,
+                 snapshot: str = None,
+                 instrumentation: bool = False):
         """Creates a configuration object for RDFLib-SQLAlchemy store database.
 
         Parameters
@@ -123,6 +179,50 @@ class DBConfig(object):
             you are most likely using a custom namespace (e.g. your ontology IRI). You can bind that namespace
             (add shorthand reference to it) by specifing it here. Also, additional/non-standard namespaces
             or collections of ontology classes can be provided, by default {"foaf": FOAF}
+        store : str, optional
+            Type of the triplestore, either "alchemy" (RDFLib-SQLAlchemy), "fuseki" (Apache Jena Fuseki server)
+            or "columnar" (in-process, read-optimized memory store, see knowl.columnar), by default "alchemy"
+        fuseki_path : str, optional
+            Path of the Fuseki server, by default ""
+        cache_size : int, optional
+            Maximum number of triples held by the in-process read cache of triple pattern queries
+            (see knowl.cache.TriplePatternCache). Set to 0 to disable the cache, by default 0
+        query_cache_size : int, optional
+            Maximum number of prepared SPARQL queries kept by the database (see OntologyDatabase.prepare).
+            Set to 0 to disable the cache, by default 128
+        cursor_page_size : int, optional
+            Number of rows retrieved at once by the result cursors (see OntologyDatabase.triplesCursor
+            and OntologyDatabase.queryCursor), by default 1000
+        pool_size : int, optional
+            Number of persistent connections kept in the connection pool (database connections for the SQLAlchemy store,
+            keep-alive HTTP connections for the Fuseki store), by default 5
+        max_overflow : int, optional
+            Number of additional connections that can be opened when the pool is exhausted (SQLAlchemy store only), by default 10
+        pool_timeout : float, optional
+            Seconds to wait for a free connection from the pool (SQLAlchemy store) or for an HTTP response (Fuseki store), by default 30
+        pool_recycle : int, optional
+            Connections older than this number of seconds are replaced by new ones. Should be lower than the server's idle
+            connection timeout (e.g. "wait_timeout" of MySQL). Set to -1 to disable, by default 3600
+        pool_pre_ping : bool, optional
+            Test the connections for liveness before handing them out of the pool, by default True
+        retries : int, optional
+            How many times an operation failed due to a transient error (e.g. a dropped connection) is repeated, by default 3
+        retry_backoff : float, optional
+            Base delay in seconds before a retry. The delay doubles with each retry and a random jitter is applied, by default 0.1
+        retry_max_backoff : float, optional
+            Maximum delay in seconds before a retry, by default 5.0
+        max_update_size : int, optional
+            Maximum length (in characters) of a single SPARQL update request sent to the Fuseki store.
+            Bigger batches of changes are split into multiple requests, by default 1000000
+        sqlite_pragmas : dict, optional
+            PRAGMA settings applied to each connection to a file-backed SQLite database (dialect "sqlite",
+            "database" is the path to the file, see also getFileConfig). The values override
+            the DEFAULT_SQLITE_PRAGMAS, by default None
+        snapshot : str, optional
+            Path to a snapshot file (see OntologyDatabase.save_snapshot) loaded at the setup of a columnar store, by default None
+        instrumentation : bool, optional
+            Record call counts, latencies and other statistics of the public database methods
+            (see OntologyDatabase.enableInstrumentation), by default False
         """
 
         self.__host = host
@@ -136,6 +236,21 @@ class DBConfig(object):
         self.__namespaces = namespaces
         self.__store = store
         self.__fuseki_path = fuseki_path
+        self.__cache_size = cache_size
+        self.__query_cache_size = query_cache_size
+        self.__cursor_page_size = cursor_page_size
+        self.__pool_size = pool_size
+        self.__max_overflow = max_overflow
+        self.__pool_timeout = pool_timeout
+        self.__pool_recycle = pool_recycle
+        self.__pool_pre_ping = pool_pre_ping
+        self.__retries = retries
+        self.__retry_backoff = retry_backoff
+        self.__retry_max_backoff = retry_max_backoff
+        self.__max_update_size = max_update_size
+        self.__sqlite_pragmas = {**self.DEFAULT_SQLITE_PRAGMAS, **(sqlite_pragmas or {})}
+        self.__snapshot = snapshot
+        self.__instrumentation = instrumentation
 
         self.__namespaces["base"] = self.baseURL + "#"
 
@@ -143,6 +258,9 @@ class DBConfig(object):
             self.__DB_URI = self.IN_MEMORY
             self.__dialect = "sqlite"
             self.__driver = "sqlite"
+        elif dialect == "sqlite":
+            # the path must not be interpreted as a template (see DB_URI)
+            self.__DB_URI = f"sqlite+{driver}:///" + database.replace("{", "{{").replace("}", "}}")
         else:
             self.__DB_URI = "{dialect}+{driver}://{username}:{password}@{host}:{port}/{database}"
 
@@ -211,7 +329,7 @@ class DBConfig(object):
         Literal
             The DB access string.
         """
-        if self.DB_URI == self.IN_MEMORY:
+        if self.dialect == "sqlite":  # no credentials
             return Literal(self.DB_URI)
         else:
             if username is None:
@@ -227,6 +345,47 @@ class DBConfig(object):
 
             return Literal(self.DB_URI.format(username=username, password=password))
 
+    def getEngineConfig(self, username: str = None, password: str = None):
+        """Generates the configuration for the SQLAlchemy engine of the store, i.e. the DB access string
+        (under the "url" key) and the connection pool parameters.
+
+        Parameters
+        ----------
+        username : str, optional
+            DB access credentials (if not provided before), by default None
+        password : str, optional
+            DB access credentials (if not provided before), by default None
+
+        Returns
+        -------
+        dict
+            Keyword arguments for the sqlalchemy.create_engine function
+        """
+        from sqlalchemy.pool import QueuePool, StaticPool  # SQLAlchemy is only imported if the store uses it
+
+        engineConfig = {"url": str(self.getDB_URI(username, password))}
+        if self.DB_URI == self.IN_MEMORY:
+            # the in-memory database lives only as long as its (single) connection, which must be shared by all threads
+            engineConfig.update({"poolclass": StaticPool, "connect_args": {"check_same_thread": False}})
+        elif self.path is not None:
+            # pooled connections (each thread reads through its own one), the PRAGMAs are set by OntologyDatabase.setup
+            engineConfig.update({
+                "poolclass": QueuePool,
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "pool_timeout": self.pool_timeout,
+                "connect_args": {"check_same_thread": False},
+            })
+        else:
+            engineConfig.update({
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "pool_timeout": self.pool_timeout,
+                "pool_recycle": self.pool_recycle,
+                "pool_pre_ping": self.pool_pre_ping,
+            })
+        return engineConfig
+
     def setCredentials(self, username: str = None, password: str = None):
         """Set access credentials for the database server.
 
@@ -282,5 +441,73 @@ class DBConfig(object):
     def fuseki_path(self):
         return self.__fuseki_path
 
+    @property
+    def cache_size(self):
+        return self.__cache_size
+
+    @property
+    def query_cache_size(self):
+        return self.__query_cache_size
+
+    @property
+    def cursor_page_size(self):
+        return self.__cursor_page_size
+
+    @property
+    def pool_size(self):
+        return self.__pool_size
+
+    @property
+    def max_overflow(self):
+        return self.__max_overflow
+
+    @property
+    def pool_timeout(self):
+        return self.__pool_timeout
+
+    @property
+    def pool_recycle(self):
+        return self.__pool_recycle
+
+    @property
+    def pool_pre_ping(self):
+        return self.__pool_pre_ping
+
+    @property
+    def retries(self):
+        return self.__retries
+
+    @property
+    def retry_backoff(self):
+        return self.__retry_backoff
+
+    @property
+    def retry_max_backoff(self):
+        return self.__retry_max_backoff
+
+    @property
+    def max_update_size(self):
+        return self.__max_update_size
+
+    @property
+    def sqlite_pragmas(self):
+        return self.__sqlite_pragmas
+
+    @property
+    def snapshot(self):
+        return self.__snapshot
+
+    @property
+    def instrumentation(self):
+        return self.__instrumentation
+
+    @property
+    def path(self):
+        """Absolute path to the database file of a file-backed SQLite database, None for other databases.
+        """
+        if self.dialect != "sqlite" or self.DB_URI == self.IN_MEMORY:
+            return None
+        return os.path.abspath(self.database)
+
     def __repr__(self):
         return "\n".join(("{}: {}".format(name, self[name]) for name in dir(self) if not (name.startswith('_') or callable(self[name]))))
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+from collections import defaultdict
+import threading
+
+
+class HierarchyIndex():
+    """In-memory transitive closure index of a hierarchical predicate (e.g., rdfs:subClassOf).
+
+    The direct edges of the hierarchy are loaded with a single query on the first use.
+    Afterwards, the index is kept up to date incrementally - it is meant to be registered
+    as a change listener of the OntologyDatabase (see OntologyDatabase.addChangeListener).
+    Closures (ancestors/descendants) are computed on demand in O(result) and memoized,
+    i.e., repeated questions are answered in O(1). Changes of the hierarchy only invalidate
+    the memoized closures of the affected nodes. The index can be shared by multiple threads.
+    """
+
+    def __init__(self, predicate, loader: callable):
+        """
+        Parameters
+        ----------
+        predicate : URIRef
+            The hierarchical predicate, e.g., RDFS.subClassOf
+        loader : callable
+            Function returning an iterable of all (child, parent) pairs linked by the predicate
+        """
+        self.__predicate = predicate
+        self.__loader = loader
+        self.__built = False
+        self.__parents = defaultdict(set)
+        self.__children = defaultdict(set)
+        self.__ancestors = {}
+        self.__descendants = {}
+        self.__lock = threading.RLock()
+        self.__generation = 0  # incremented on every change notification
+
+    @property
+    def predicate(self):
+        return self.__predicate
+
+    def __build(self):
+        """Loads the edges if the index is not built yet. The loader is called outside of the lock
+        (it queries the database, which might in turn notify the listeners). If the hierarchy
+        was changed during the loading, the edges are loaded again.
+        """
+        while True:
+            with self.__lock:
+                if self.__built:
+                    return
+                generation = self.__generation
+            edges = list(self.__loader())
+            with self.__lock:
+                if self.__built:
+                    return
+                if generation == self.__generation:
+                    for child, parent in edges:
+                        self.__parents[child].add(parent)
+                        self.__children[parent].add(child)
+                    self.__built = True
+                    return
+
+    @staticmethod
+    def __closure(node, edges):
+        result = set()
+        stack = [node]
+        while stack:
+            for neighbour in edges.get(stack.pop(), ()):
+                if neighbour not in result:
+                    result.add(neighbour)
+                    stack.append(neighbour)
+        result.discard(node)
+        return frozenset(result)
+
+    def ancestors(self, node):
+        """Returns all (transitive) ancestors of the node, excluding the node itself.
+        """
+        while True:
+            self.__build()
+            with self.__lock:
+                if not self.__built:  # reset in the meantime
+                    continue
+                if node not in self.__ancestors:
+                    self.__ancestors[node] = self.__closure(node, self.__parents)
+                return self.__ancestors[node]
+
+    def descendants(self, node):
+        """Returns all (transitive) descendants of the node, excluding the node itself.
+        """
+        while True:
+            self.__build()
+            with self.__lock:
+                if not self.__built:  # reset in the meantime
+                    continue
+                if node not in self.__descendants:
+                    self.__descendants[node] = self.__closure(node, self.__children)
+                return self.__descendants[node]
+
+    def isAncestorOf(self, ancestor, node):
+        return ancestor in self.ancestors(node)
+
+    def parents(self, node):
+        while True:
+            self.__build()
+            with self.__lock:
+                if self.__built:
+                    return frozenset(self.__parents.get(node, ()))
+
+    def children(self, node):
+        while True:
+            self.__build()
+            with self.__lock:
+                if self.__built:
+                    return frozenset(self.__children.get(node, ()))
+
+    def __invalidate(self, child, parent):
+        """Forgets the memoized closures affected by a change of the child -> parent edge.
+        """
+        for node in self.descendants(child) | {child}:
+            self.__ancestors.pop(node, None)
+        for node in self.ancestors(parent) | {parent}:
+            self.__descendants.pop(node, None)
+
+    def __addEdge(self, child, parent):
+        if parent in self.__parents[child]:
+            return
+        self.__invalidate(child, parent)
+        self.__parents[child].add(parent)
+        self.__children[parent].add(child)
+
+    def __removeEdge(self, child, parent):
+        if parent not in self.__parents.get(child, ()):
+            return
+        self.__invalidate(child, parent)
+        self.__parents[child].discard(parent)
+        self.__children[parent].discard(child)
+
+    def triplesAdded(self, triples):
+        edges = [(s, o) for s, p, o in triples if p == self.__predicate]
+        if not edges:
+            return
+        with self.__lock:
+            self.__generation += 1
+            if not self.__built:
+                return
+            for child, parent in edges:
+                self.__addEdge(child, parent)
+
+    def triplesRemoved(self, pattern: tuple):
+        s, p, o = pattern
+        if p is not None and p != self.__predicate:
+            return
+        with self.__lock:
+            self.__generation += 1
+            if not self.__built:
+                return
+            if s is not None:
+                edges = [(s, parent) for parent in self.__parents.get(s, ()) if o is None or parent == o]
+            elif o is not None:
+                edges = [(child, o) for child in self.__children.get(o, ())]
+            else:
+                edges = [(child, parent) for child, parents in self.__parents.items() for parent in parents]
+            for child, parent in edges:
+                self.__removeEdge(child, parent)
+
+    def reset(self):
+        """Forgets everything, the index will be re-loaded on the next use.
+        """
+        with self.__lock:
+            self.__generation += 1
+            self.__built = False
+            self.__parents.clear()
+            self.__children.clear()
+            self.__ancestors.clear()
+            self.__descendants.clear()
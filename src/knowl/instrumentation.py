@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Per-method timing and counters of the database API (see OntologyDatabase.enableInstrumentation).
+"""
+
+from collections.abc import Iterator
+from functools import partial, wraps
+from bisect import bisect_left
+import threading
+import time
+
+from rdflib.query import Result
+
+from knowl.cursor import Cursor
+
+# upper bounds (in seconds) of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNKNOWN_METHOD = "<other>"  # bytes transferred outside of any instrumented method
+
+
+class Instrumentation():
+    """Collects statistics of the instrumented methods:
+        calls - number of calls
+        errors - number of calls that raised an exception
+        seconds - total time spent in the calls
+        histogram - latencies, a list of (upper bound, cumulative count) pairs (Prometheus style)
+        retries - number of operations repeated after a transient error
+        reconnects - number of times the connections were discarded after a connection failure
+        rows - number of items returned (collections, iterators and SELECT results), iterators are counted as they are consumed
+        bytesSent, bytesReceived - HTTP traffic (SPARQL store only)
+
+    The calls of lazily evaluated results (iterators) are timed until the result is returned,
+    the time of the iteration is not included. Nested calls are recorded for each method.
+    The exporters are callables receiving the statistics (see "stats"), they are called by "export".
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.__buckets = tuple(sorted(buckets))
+        self.__methods = {}
+        self.__exporters = []
+        self.__lock = threading.Lock()
+        self.__local = threading.local()  # stack of the methods being executed by the thread
+
+    def __stack(self):
+        stack = getattr(self.__local, "stack", None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
+
+    def __method(self, name: str):
+        """Returns the (mutable) statistics of the method, call with the lock held.
+        """
+        method = self.__methods.get(name)
+        if method is None:
+            method = self.__methods[name] = {"calls": 0, "errors": 0, "seconds": 0.0, "buckets": [0] * (len(self.__buckets) + 1),
+                                             "retries": 0, "reconnects": 0, "rows": 0, "bytesSent": 0, "bytesReceived": 0}
+        return method
+
+    def record(self, name: str, seconds: float, rows: int = 0, error: bool = False):
+        """Records a single call of the method.
+        """
+        with self.__lock:
+            method = self.__method(name)
+            method["calls"] += 1
+            method["errors"] += error
+            method["seconds"] += seconds
+            method["buckets"][bisect_left(self.__buckets, seconds)] += 1
+            method["rows"] += rows
+
+    def __count(self, name: str, key: str, value: int = 1):
+        with self.__lock:
+            self.__method(name)[key] += value
+
+    def retried(self, name: str):
+        self.__count(name, "retries")
+
+    def reconnected(self, name: str):
+        self.__count(name, "reconnects")
+
+    def transferred(self, sent: int, received: int):
+        """Records an HTTP request (attributed to the innermost instrumented method running in the thread).
+        """
+        stack = self.__stack()
+        name = stack[-1] if stack else UNKNOWN_METHOD
+        with self.__lock:
+            method = self.__method(name)
+            method["bytesSent"] += sent
+            method["bytesReceived"] += received
+
+    def __countRows(self, name: str, iterator):
+        rows = 0
+        try:
+            for item in iterator:
+                rows += 1
+                yield item
+        finally:
+            self.__count(name, "rows", rows)
+
+    def instrument(self, name: str, func: callable):
+        """Returns a wrapper of the function recording its calls under the name.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self.__stack()
+            stack.append(name)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                self.record(name, time.perf_counter() - start, error=True)
+                raise
+            finally:
+                stack.pop()
+            rows = 0
+            if isinstance(result, Cursor):  # keeps the cursor, the rows of the following pages are counted as retrieved
+                self.record(name, time.perf_counter() - start, result.fetched)
+                result.onPage = partial(self.__count, name, "rows")
+                return result
+            if isinstance(result, (list, tuple, set, frozenset, dict)):
+                rows = len(result)
+            elif isinstance(result, Result) and result.type == "SELECT":
+                rows = len(result.bindings)  # retrieves the rows
+            self.record(name, time.perf_counter() - start, rows)
+            if isinstance(result, Iterator):
+                return self.__countRows(name, result)
+            return result
+
+        wrapper.instrumented = func
+        return wrapper
+
+    def stats(self) -> dict:
+        """Returns a copy of the statistics, a dictionary {method name: statistics}, see the class documentation.
+        """
+        with self.__lock:
+            result = {}
+            for name, method in self.__methods.items():
+                stats = {key: value for key, value in method.items() if key != "buckets"}
+                cumulative, histogram = 0, []
+                for bound, count in zip(self.__buckets + (float("inf"),), method["buckets"]):
+                    cumulative += count
+                    histogram.append((bound, cumulative))
+                stats["histogram"] = histogram
+                result[name] = stats
+            return result
+
+    def reset(self):
+        with self.__lock:
+            self.__methods.clear()
+
+    def addExporter(self, exporter: callable):
+        """Registers a function called with the statistics by "export" (e.g., writing the prometheusText of the statistics).
+        """
+        self.__exporters.append(exporter)
+
+    def removeExporter(self, exporter: callable):
+        self.__exporters.remove(exporter)
+
+    def export(self):
+        """Passes the current statistics to all the exporters.
+        """
+        stats = self.stats()
+        for exporter in list(self.__exporters):
+            exporter(stats)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def prometheusText(stats: dict, prefix: str = "knowl") -> str:
+    """Formats the statistics (see Instrumentation.stats) in the Prometheus text exposition format.
+
+    Parameters
+    ----------
+    stats : dict
+        The statistics
+    prefix : str, optional
+        Prefix of the metric names, by default "knowl"
+
+    Returns
+    -------
+    str
+    """
+    counters = [("calls", "calls_total", "Number of calls"),
+                ("errors", "errors_total", "Number of calls that raised an exception"),
+                ("retries", "retries_total", "Number of operations repeated after a transient error"),
+                ("reconnects", "reconnects_total", "Number of discarded broken connections"),
+                ("rows", "rows_total", "Number of returned items"),
+                ("bytesSent", "sent_bytes_total", "Bytes sent to the SPARQL endpoint"),
+                ("bytesReceived", "received_bytes_total", "Bytes received from the SPARQL endpoint")]
+    lines = []
+    for key, metric, description in counters:
+        lines += [f"# HELP {prefix}_{metric} {description}.", f"# TYPE {prefix}_{metric} counter"]
+        lines += [f'{prefix}_{metric}{{method="{_label(name)}"}} {method[key]}' for name, method in sorted(stats.items())]
+    metric = f"{prefix}_call_duration_seconds"
+    lines += [f"# HELP {metric} Duration of the calls.", f"# TYPE {metric} histogram"]
+    for name, method in sorted(stats.items()):
+        label = _label(name)
+        lines += [f'{metric}_bucket{{method="{label}",le="{_number(bound)}"}} {count}' for bound, count in method["histogram"]]
+        lines += [f'{metric}_sum{{method="{label}"}} {_number(method["seconds"])}',
+                  f'{metric}_count{{method="{label}"}} {method["calls"]}']
+    return "\n".join(lines) + "\n"
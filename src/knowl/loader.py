@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+from collections import namedtuple
+from rdflib import Graph, BNode
+from rdflib.util import guess_format
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser, ParseError
+import bz2
+import gzip
+import os
+import time
+import uuid
+
+
+DEFAULT_BATCH_SIZE = 10000
+# uncompressed line-based files larger than this (in bytes) are split into multiple parsing tasks
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+
+COMPRESSION_OPENERS = {
+    ".gz": gzip.open,
+    ".gzip": gzip.open,
+    ".bz2": bz2.open,
+}
+
+# formats that can be parsed line-by-line, i.e., without loading the whole file into memory
+LINE_BASED_FORMATS = {"nt", "nt11", "ntriples", "n-triples"}
+
+
+LoadProgress = namedtuple("LoadProgress", ["triples", "batches", "elapsed", "rate"])
+LoadProgress.__doc__ = """Snapshot of a running import, passed to the progress callbacks.
+triples - number of triples flushed into the database so far
+batches - number of batches flushed so far
+elapsed - seconds since the start of the import
+rate - average throughput in triples per second
+"""
+
+
+FileImportStats = namedtuple("FileImportStats", ["path", "triples", "chunks", "parseTime", "loadTime"])
+FileImportStats.__doc__ = """Per-file statistics returned by OntologyDatabase.mergeFilesIntoDB.
+path - path to the imported file
+triples - number of triples parsed from the file and sent to the database
+chunks - number of parsing tasks the file was split into
+parseTime - total seconds spent parsing the file (summed over the worker processes)
+loadTime - total seconds spent writing the triples of the file into the database
+"""
+
+ParseTask = namedtuple("ParseTask", ["path", "format", "start", "end", "bnodePrefix"])
+
+
+def splitCompression(filepath: str):
+    """Splits the compression extension (if any) from the file path.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to a (possibly compressed) RDF file
+
+    Returns
+    -------
+    tuple
+        (path without the compression extension, compression extension or None)
+    """
+    root, extension = os.path.splitext(filepath)
+    if extension.lower() in COMPRESSION_OPENERS:
+        return root, extension.lower()
+    return filepath, None
+
+
+def guessRDFFormat(filepath: str):
+    """Guesses the RDF serialization format from the file extension.
+    Compression extensions (e.g., ".nt.gz") are ignored.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the RDF file
+
+    Returns
+    -------
+    str
+        The rdflib format name or None if the format could not be guessed.
+    """
+    return guess_format(splitCompression(filepath)[0])
+
+
+def openRDFFile(filepath: str, mode: str = "rt"):
+    """Opens a (possibly compressed) RDF file. Gzip and bzip2 compressed files
+    are decompressed on the fly, based on the file extension.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the file
+    mode : str, optional
+        Either "rt" (text) or "rb" (binary), by default "rt"
+
+    Returns
+    -------
+    file object
+    """
+    _, compression = splitCompression(filepath)
+    opener = COMPRESSION_OPENERS.get(compression, open)
+    if "b" in mode:
+        return opener(filepath, mode)
+    return opener(filepath, mode, encoding="utf-8")
+
+
+class _ListSink():
+    """Parser sink collecting the triples of the last parsed line.
+    """
+
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((s, p, o))
+
+
+class FileBNodeContext(dict):
+    """Blank node label mapping that derives the blank node from its label
+    and a per-file prefix. Unlike the default (random) mapping, this one yields
+    the same blank nodes in different processes, hence parts of one file
+    can be parsed independently without breaking the blank node identity.
+    """
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.__prefix = prefix
+
+    def get(self, label, default=None):
+        if label not in self:
+            self[label] = BNode(f"{self.__prefix}{label}")
+        return super().get(label)
+
+
+def iterateNTriples(lines, bnodeContext: dict = None):
+    """Lazily parses N-Triples lines. Only the currently parsed line is held in memory.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Lines of an N-Triples document (e.g., an opened text file)
+    bnodeContext : dict, optional
+        Mapping of blank node labels to BNode objects. Pass the same dictionary
+        to multiple calls to preserve the blank node identity between them, by default None
+
+    Yields
+    -------
+    tuple
+        (s, p, o) triples
+    """
+    sink = _ListSink()
+    parser = W3CNTriplesParser(sink=sink, bnode_context=bnodeContext)
+    for line in lines:
+        parser.line = line.rstrip("\r\n")
+        try:
+            parser.parseline(bnode_context=bnodeContext)
+        except ParseError:
+            raise ParseError(f"Invalid line: {line}")
+        if sink.triples:
+            yield from sink.triples
+            sink.triples.clear()
+
+
+def iterateTriples(filepath: str, format: str = None, bnodeContext: dict = None):
+    """Generates triples from an RDF file. Line-based formats (N-Triples) are parsed
+    incrementally, i.e., the memory usage does not depend on the size of the file.
+    Other formats have to be parsed as a whole (rdflib limitation) and the triples are
+    generated from a temporary graph.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the (possibly gzip or bzip2 compressed) RDF file
+    format : str, optional
+        The rdflib format name, by default None (guessed from the file extension)
+    bnodeContext : dict, optional
+        Blank node label mapping for line-based formats (see iterateNTriples), by default None
+
+    Yields
+    -------
+    tuple
+        (s, p, o) triples
+    """
+    if format is None:
+        format = guessRDFFormat(filepath)
+    if format in LINE_BASED_FORMATS:
+        with openRDFFile(filepath, "rt") as file:
+            yield from iterateNTriples(file, bnodeContext)
+    else:
+        tmpGraph = Graph()
+        with openRDFFile(filepath, "rb") as file:
+            tmpGraph.parse(source=file, format=format)
+        yield from tmpGraph
+
+
+def batched(triples, batchSize: int = DEFAULT_BATCH_SIZE):
+    """Groups the triples into lists of at most batchSize items.
+
+    Parameters
+    ----------
+    triples : Iterable
+        Triples to be grouped
+    batchSize : int, optional
+        Maximum number of triples in a batch, by default DEFAULT_BATCH_SIZE
+
+    Yields
+    -------
+    list
+        Batch of triples
+    """
+    if batchSize < 1:
+        raise ValueError(f"Batch size must be a positive integer, got {batchSize}!")
+    batch = []
+    for triple in triples:
+        batch.append(triple)
+        if len(batch) >= batchSize:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def loadInBatches(triples, flush: callable, batchSize: int = DEFAULT_BATCH_SIZE, progress: callable = None):
+    """Pushes the triples into a flush function (e.g., OntologyDatabase.addN)
+    in chunks of fixed size. At most one batch is held in memory at a time.
+
+    Parameters
+    ----------
+    triples : Iterable
+        Triples to be loaded
+    flush : callable
+        Function accepting a list of triples, called for each batch
+    batchSize : int, optional
+        Number of triples per batch, by default DEFAULT_BATCH_SIZE
+    progress : callable, optional
+        Called with a LoadProgress after each flushed batch, by default None
+
+    Returns
+    -------
+    int
+        Total number of loaded triples
+    """
+    start = time.perf_counter()
+    loaded, batches = 0, 0
+    for batch in batched(triples, batchSize):
+        flush(batch)
+        loaded += len(batch)
+        batches += 1
+        if progress is not None:
+            elapsed = time.perf_counter() - start
+            progress(LoadProgress(loaded, batches, elapsed, loaded / elapsed if elapsed > 0 else float("inf")))
+    return loaded
+
+
+def _iterateLineRange(filepath: str, start: int, end: int):
+    """Generates lines of a file that start within the [start, end) byte range.
+    """
+    with open(filepath, "rb") as file:
+        if start > 0:
+            file.seek(start - 1)
+            if file.read(1) != b"\n":
+                file.readline()  # skip the line that belongs to the previous range
+        while end is None or file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            yield line.decode("utf-8")
+
+
+def planParseTasks(filepath: str, format: str = None, chunkSize: int = DEFAULT_CHUNK_SIZE):
+    """Splits a file into independent parsing tasks. Uncompressed line-based files
+    bigger than chunkSize are split into byte ranges, other files produce a single task.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the RDF file
+    format : str, optional
+        The rdflib format name, by default None (guessed from the file extension)
+    chunkSize : int, optional
+        Approximate size of a range in bytes, by default DEFAULT_CHUNK_SIZE
+
+    Returns
+    -------
+    list of ParseTask
+    """
+    if format is None:
+        format = guessRDFFormat(filepath)
+    bnodePrefix = f"f{uuid.uuid4().hex}"
+    if format not in LINE_BASED_FORMATS or splitCompression(filepath)[1] is not None:
+        return [ParseTask(filepath, format, None, None, bnodePrefix)]
+    size = os.path.getsize(filepath)
+    starts = list(range(0, max(size, 1), max(chunkSize, 1)))
+    return [ParseTask(filepath, format, start, end, bnodePrefix) for start, end in zip(starts, starts[1:] + [None])]
+
+
+def parseTask(task: ParseTask):
+    """Parses the part of a file described by the task. Executed in the worker processes.
+
+    Returns
+    -------
+    tuple
+        (the task, list of parsed triples, seconds spent parsing)
+    """
+    start = time.perf_counter()
+    if task.start is None:
+        triples = list(iterateTriples(task.path, task.format, FileBNodeContext(task.bnodePrefix)))
+    else:
+        triples = list(iterateNTriples(_iterateLineRange(task.path, task.start, task.end), FileBNodeContext(task.bnodePrefix)))
+    return task, triples, time.perf_counter() - start
+
+
+def loadFilesInParallel(filepaths, flush: callable, workers: int = None, format: str = None,
+                        batchSize: int = DEFAULT_BATCH_SIZE, chunkSize: int = DEFAULT_CHUNK_SIZE, progress: callable = None):
+    """Parses the files in a pool of worker processes and pushes the parsed triples
+    into a single flush function (the "writer") in batches. To keep the memory bounded,
+    at most two parsing tasks per worker are in flight at any time.
+
+    Parameters
+    ----------
+    filepaths : Iterable[str]
+        Paths to the RDF files
+    flush : callable
+        Function accepting a list of triples, called for each batch (in the calling process)
+    workers : int, optional
+        Number of worker processes, by default None (number of CPUs).
+        With a single worker, the files are parsed in the calling process.
+    format : str, optional
+        The rdflib format name of all files, by default None (guessed for each file)
+    batchSize : int, optional
+        Number of triples per flushed batch, by default DEFAULT_BATCH_SIZE
+    chunkSize : int, optional
+        Size (in bytes) of the ranges big N-Triples files are split into, by default DEFAULT_CHUNK_SIZE
+    progress : callable, optional
+        Called with a LoadProgress after each flushed batch, by default None
+
+    Returns
+    -------
+    dict
+        Mapping of the file paths to FileImportStats
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = [task for path in filepaths for task in planParseTasks(path, format, chunkSize)]
+    stats = {task.path: {"triples": 0, "chunks": 0, "parseTime": 0.0, "loadTime": 0.0} for task in tasks}
+    start = time.perf_counter()
+    totals = {"triples": 0, "batches": 0}
+
+    def write(task, triples, parseTime):
+        loadStart = time.perf_counter()
+        for batch in batched(triples, batchSize):
+            flush(batch)
+            totals["triples"] += len(batch)
+            totals["batches"] += 1
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress(LoadProgress(totals["triples"], totals["batches"], elapsed, totals["triples"] / elapsed if elapsed > 0 else float("inf")))
+        fileStats = stats[task.path]
+        fileStats["triples"] += len(triples)
+        fileStats["chunks"] += 1
+        fileStats["parseTime"] += parseTime
+        fileStats["loadTime"] += time.perf_counter() - loadStart
+
+    if workers <= 1:
+        for task in tasks:
+            write(*parseTask(task))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait  # slow to import, rarely needed
+
+        pending = iter(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            inFlight = set()
+            while True:
+                while len(inFlight) < 2 * workers:
+                    task = next(pending, None)
+                    if task is None:
+                        break
+                    inFlight.add(pool.submit(parseTask, task))
+                if not inFlight:
+                    break
+                done, inFlight = wait(inFlight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(*future.result())
+
+    return {path: FileImportStats(path, **fileStats) for path, fileStats in stats.items()}
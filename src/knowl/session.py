@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+
+def patternMatches(pattern: tuple, triple: tuple):
+    """Checks whether the triple matches the pattern. None in the pattern matches anything.
+
+    Parameters
+    ----------
+    pattern : tuple
+        (s, p, o) pattern, where any item can be None
+    triple : tuple
+        (s, p, o) triple
+
+    Returns
+    -------
+    bool
+    """
+    return all(p is None or p == t for p, t in zip(pattern, triple))
+
+
+def patternSubsumes(general: tuple, specific: tuple):
+    """Checks whether every triple matching the "specific" pattern also matches the "general" one.
+    """
+    return all(g is None or g == s for g, s in zip(general, specific))
+
+
+class ChangeSet():
+    """Coalesced buffer of pending changes (additions and removals of triples).
+
+    The changes are kept in a form that can be applied in two steps: first, all
+    the removals are performed, then all the additions. Redundant operations are
+    collapsed as they are recorded. E.g., adding a triple and later removing it
+    cancels the addition, setting the same property twice results in a single removal
+    and a single addition, removing (s, p, None) makes the removal of (s, p, o) superfluous.
+    """
+
+    def __init__(self):
+        self.__removals = []
+        self.__additions = {}  # dict is used as an insertion-ordered set
+
+    def add(self, triple: tuple):
+        self.__additions[tuple(triple)] = None
+
+    def addN(self, triples):
+        for triple in triples:
+            self.add(triple)
+
+    def remove(self, pattern: tuple):
+        pattern = tuple(pattern)
+        # pending additions matching the pattern would be removed by it
+        for triple in [t for t in self.__additions if patternMatches(pattern, t)]:
+            del self.__additions[triple]
+        if any(patternSubsumes(removal, pattern) for removal in self.__removals):
+            return
+        self.__removals = [removal for removal in self.__removals if not patternSubsumes(pattern, removal)]
+        self.__removals.append(pattern)
+
+    def set(self, triple: tuple):
+        s, p, o = triple
+        self.remove((s, p, None))
+        self.add((s, p, o))
+
+    def clear(self):
+        self.__removals = []
+        self.__additions = {}
+
+    @property
+    def removals(self):
+        """List of (s, p, o) patterns to be removed (applied before the additions)
+        """
+        return list(self.__removals)
+
+    @property
+    def additions(self):
+        """List of (s, p, o) triples to be added (applied after the removals)
+        """
+        return list(self.__additions)
+
+    def __len__(self):
+        return len(self.__removals) + len(self.__additions)
+
+    def __repr__(self):
+        return f"<ChangeSet: {len(self.__removals)} removals, {len(self.__additions)} additions>"
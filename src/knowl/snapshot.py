@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Compact binary snapshots of triplestores.
+A snapshot consists of a sorted term dictionary and the SPO, POS and OSP integer indexes
+of the columnar store (see knowl.columnar). Loading a snapshot only maps the file into memory,
+nothing is parsed or copied - the terms are decoded when they are accessed. Multiple processes
+loading the same snapshot share the physical memory pages of the file.
+
+File layout (all numbers are in the byte order of the machine that wrote the file):
+    header (see HEADER)
+    namespaces (JSON object {prefix: namespace})
+    term offsets (nTerms + 1 unsigned 64-bit integers, positions of the terms in the term data)
+    term data (encoded terms, sorted, see encodeTerm)
+    indexes (SPO, POS, OSP, each as three columns of nTriples unsigned 32-bit integers)
+Sections are aligned to 8 bytes.
+"""
+
+from array import array
+import json
+import mmap
+import os
+import struct
+
+from rdflib import URIRef, BNode, Literal
+
+from knowl.columnar import ID_TYPECODE, PERMUTATIONS, TripleIndex
+
+MAGIC = b"KNOWLSNP"
+VERSION = 1
+BYTE_ORDER_MARK = 0x01020304
+OFFSET_TYPECODE = "Q"  # unsigned 64-bit integers
+# magic, byte order mark, version, nTerms, nTriples, offsets of the sections and the length of the namespaces
+HEADER = struct.Struct("=8sIIQQQQQQQ")
+
+
+def encodeTerm(term) -> bytes:
+    """Encodes an RDF term into bytes. The first byte is the kind of the term ("U" - URIRef, "B" - BNode,
+    "L" - Literal), literals continue with the language tag and the datatype, each terminated by a zero byte.
+    The rest is the (UTF-8 encoded) value of the term.
+    """
+    if isinstance(term, Literal):
+        header = f"L{term.language or ''}\0{term.datatype or ''}\0"
+    elif isinstance(term, URIRef):
+        header = "U"
+    elif isinstance(term, BNode):
+        header = "B"
+    else:
+        raise ValueError(f"Terms of type {type(term).__name__} cannot be stored in a snapshot!")
+    return (header + str(term)).encode("utf-8", "surrogatepass")
+
+
+def decodeTerm(data: bytes):
+    """Inverse of encodeTerm.
+    """
+    kind, text = data[:1], data[1:].decode("utf-8", "surrogatepass")
+    if kind == b"U":
+        return URIRef(text)
+    if kind == b"B":
+        return BNode(text)
+    if kind == b"L":
+        language, datatype, value = text.split("\0", 2)
+        return Literal(value, lang=language or None, datatype=URIRef(datatype) if datatype else None)
+    raise ValueError(f"Unknown term kind {kind!r}, the snapshot is corrupted!")
+
+
+class MappedTermDictionary():
+    """Term dictionary (see knowl.columnar.TermDictionary) reading the terms from a snapshot.
+    The terms are sorted by their encoding, thus a term is found by a binary search over the encoded terms.
+    Terms added after the loading are kept in memory and get IDs following the ones from the snapshot.
+    """
+
+    def __init__(self, data, offsets):
+        """
+        Parameters
+        ----------
+        data : memoryview
+            The encoded terms
+        offsets : Sequence[int]
+            Start of each term in the data, followed by the end of the last term
+        """
+        self.__data = data
+        self.__offsets = offsets
+        self.__size = len(offsets) - 1
+        self.__added = []
+        self.__addedIDs = {}
+
+    def __encoded(self, id: int) -> bytes:
+        return bytes(self.__data[self.__offsets[id]:self.__offsets[id + 1]])
+
+    def id(self, term):
+        id = self.__addedIDs.get(term)
+        if id is not None:
+            return id
+        try:
+            encoded = encodeTerm(term)
+        except ValueError:
+            return None
+        lo, hi = 0, self.__size
+        while lo < hi:
+            middle = (lo + hi) // 2
+            current = self.__encoded(middle)
+            if current == encoded:
+                return middle
+            if current < encoded:
+                lo = middle + 1
+            else:
+                hi = middle
+        return None
+
+    def term(self, id: int):
+        if id < self.__size:
+            return decodeTerm(self.__encoded(id))
+        return self.__added[id - self.__size]
+
+    def add(self, term) -> int:
+        id = self.id(term)
+        if id is None:
+            id = self.__size + len(self.__added)
+            self.__added.append(term)
+            self.__addedIDs[term] = id
+        return id
+
+    def __len__(self):
+        return self.__size + len(self.__added)
+
+    def __iter__(self):
+        return (self.term(id) for id in range(len(self)))
+
+
+def _align(position: int) -> int:
+    return (position + 7) // 8 * 8
+
+
+def save(path: str, triples, namespaces=()):
+    """Writes the triples into a snapshot file. The file is written under a temporary name
+    and then renamed, thus processes using the previous version of the file are not affected.
+
+    Parameters
+    ----------
+    path : str
+        Path of the snapshot file
+    triples : Iterable
+        (s, p, o) triples
+    namespaces : Iterable, optional
+        (prefix, namespace) pairs, by default ()
+
+    Returns
+    -------
+    int
+        Number of stored triples
+    """
+    encoded = {}
+    encodedTriples = set()
+    for triple in triples:
+        key = []
+        for term in triple:
+            code = encoded.get(term)
+            if code is None:
+                code = encoded[term] = encodeTerm(term)
+            key.append(code)
+        encodedTriples.add(tuple(key))
+    terms = sorted(set(encoded.values()))
+    del encoded
+    ids = {code: id for id, code in enumerate(terms)}
+    idTriples = [tuple(ids[code] for code in triple) for triple in encodedTriples]
+    del ids, encodedTriples
+
+    namespaceData = json.dumps({str(prefix): str(namespace) for prefix, namespace in namespaces}).encode("utf-8")
+    offsets = array(OFFSET_TYPECODE, [0])
+    for code in terms:
+        offsets.append(offsets[-1] + len(code))
+    namespacesStart = _align(HEADER.size)
+    offsetsStart = _align(namespacesStart + len(namespaceData))
+    dataStart = _align(offsetsStart + len(offsets) * offsets.itemsize)
+    indexesStart = _align(dataStart + offsets[-1])
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, BYTE_ORDER_MARK, VERSION, len(terms), len(idTriples),
+                                namespacesStart, len(namespaceData), offsetsStart, dataStart, indexesStart))
+            for start, data in ((namespacesStart, namespaceData), (offsetsStart, offsets.tobytes()), (dataStart, b"".join(terms))):
+                f.write(b"\0" * (start - f.tell()))
+                f.write(data)
+            f.write(b"\0" * (indexesStart - f.tell()))
+            for order in PERMUTATIONS.values():
+                for column in TripleIndex.build(order, idTriples).columns:
+                    column.tofile(f)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return len(idTriples)
+
+
+def load(path: str):
+    """Maps a snapshot file into memory.
+
+    Parameters
+    ----------
+    path : str
+        Path of the snapshot file
+
+    Returns
+    -------
+    tuple
+        (term dictionary, dictionary of the indexes, namespaces), see knowl.columnar.ColumnarStore._setData
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # the mapping outlives the file object
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError(f"The file {path} is not a knowl snapshot!")
+    magic, byteOrderMark, version, nTerms, nTriples, namespacesStart, namespacesLength, \
+        offsetsStart, dataStart, indexesStart = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(f"The file {path} is not a knowl snapshot!")
+    if byteOrderMark != BYTE_ORDER_MARK:
+        raise ValueError(f"The snapshot {path} was written on a machine with a different byte order!")
+    if version != VERSION:
+        raise ValueError(f"Unsupported version {version} of the snapshot {path}!")
+    idSize = array(ID_TYPECODE).itemsize
+    if len(view) < indexesStart + 9 * nTriples * idSize:
+        raise ValueError(f"The snapshot {path} is truncated!")
+
+    namespaces = json.loads(bytes(view[namespacesStart:namespacesStart + namespacesLength]).decode("utf-8"))
+    offsets = view[offsetsStart:offsetsStart + (nTerms + 1) * 8].cast(OFFSET_TYPECODE)
+    dictionary = MappedTermDictionary(view[dataStart:dataStart + offsets[nTerms]], offsets)
+    indexes = {}
+    position = indexesStart
+    for name, order in PERMUTATIONS.items():
+        columns = []
+        for _ in range(3):
+            columns.append(view[position:position + nTriples * idSize].cast(ID_TYPECODE))
+            position += nTriples * idSize
+        indexes[name] = TripleIndex(order, tuple(columns))
+    return dictionary, indexes, namespaces
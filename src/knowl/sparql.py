@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Builders of SPARQL query and update strings.
+The "nodeToSparql" arguments are functions serializing rdflib terms into SPARQL
+(e.g., knowl.database.my_bnode_ext for the Fuseki store), by default the terms' n3 method is used.
+"""
+
+from rdflib import Literal
+
+
+def _n3(node):
+    return node.n3()
+
+
+def instancesPageQuery(classes: list, typePredicate, after=None, limit: int = 1000, predicates: list = None,
+                       allPredicates: bool = False, nodeToSparql: callable = _n3, offset: int = None):
+    """Builds a SELECT query retrieving one page of instances of the classes, optionally together
+    with their properties. The query returns ?s ?p ?o bindings, where ?s is the instance and ?p ?o
+    is one of its properties (unbound if no properties were requested or the instance has none of them).
+
+    The IRI instances are ordered by their IRIs and paged using the "keyset" approach (after the last
+    instance of the previous page). Blank nodes cannot be compared in SPARQL (STR of a blank node
+    is an error), therefore the blank node instances are retrieved by separate queries (if "offset" is given),
+    in the order of the endpoint and paged by the offset.
+
+    Parameters
+    ----------
+    classes : list
+        The classes whose instances should be retrieved
+    typePredicate : URIRef
+        The "is instance of" predicate (usually rdf:type)
+    after : Identifier, optional
+        The last instance of the previous page, by default None (the first page)
+    limit : int, optional
+        Maximum number of instances in the page, by default 1000
+    predicates : list, optional
+        Properties of the instances to be retrieved as well, by default None
+    allPredicates : bool, optional
+        Retrieve all properties of the instances, by default False
+    nodeToSparql : callable, optional
+        Term serialization function
+    offset : int, optional
+        Retrieve the page of the blank node instances starting at the offset instead of the IRI instances,
+        by default None
+
+    Returns
+    -------
+    str
+        The SPARQL query
+    """
+    classValues = " ".join(nodeToSparql(c) for c in classes)
+    if offset is not None:
+        pageFilter, order, page = "FILTER(isBlank(?s))", "?s", f"LIMIT {int(limit)} OFFSET {int(offset)}"
+    else:
+        pageFilter = f"FILTER(isIRI(?s) && STR(?s) > {Literal(str(after)).n3()})" if after is not None else "FILTER(isIRI(?s))"
+        order, page = "STR(?s)", f"LIMIT {int(limit)}"
+    properties = ""
+    if allPredicates:
+        properties = "OPTIONAL { ?s ?p ?o . }"
+    elif predicates:
+        properties = "OPTIONAL { VALUES ?p { %s } ?s ?p ?o . }" % " ".join(nodeToSparql(p) for p in predicates)
+    return f"""SELECT ?s ?p ?o WHERE {{
+  {{ SELECT DISTINCT ?s WHERE {{ VALUES ?class {{ {classValues} }} ?s {nodeToSparql(typePredicate)} ?class . {pageFilter} }}
+    ORDER BY {order} {page} }}
+  {properties}
+}} ORDER BY {order}"""
+
+
+def instancesCountQuery(classes: list, typePredicate, nodeToSparql: callable = _n3):
+    """Builds a SELECT query counting the (distinct) instances of the classes, the query returns a single ?count binding.
+    """
+    classValues = " ".join(nodeToSparql(c) for c in classes)
+    return f"SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {{ VALUES ?class {{ {classValues} }} ?s {nodeToSparql(typePredicate)} ?class . }}"
+
+
+DEFAULT_UPDATE_SIZE = 1000000  # maximum length of a single update request (in characters)
+VARIABLES = ("?s", "?p", "?o")
+
+
+def _triplePattern(triple, nodeToSparql: callable = _n3):
+    return " ".join(VARIABLES[i] if node is None else nodeToSparql(node) for i, node in enumerate(triple))
+
+
+def _inGraph(block: str, graph=None, nodeToSparql: callable = _n3):
+    return block if graph is None else f"GRAPH {nodeToSparql(graph)} {{ {block} }}"
+
+
+def triplesQuery(pattern: tuple, nodeToSparql: callable = _n3):
+    """Builds a SELECT query retrieving the triples matching the pattern. Only the unbound
+    positions of the pattern (?s, ?p and ?o) are selected.
+    """
+    variables = " ".join(VARIABLES[i] for i, node in enumerate(pattern) if node is None)
+    return f"SELECT {variables or '*'} WHERE {{ {_triplePattern(pattern, nodeToSparql)} . }}"
+
+
+def dataUpdates(operation: str, triples, graph=None, maxSize: int = DEFAULT_UPDATE_SIZE, nodeToSparql: callable = _n3):
+    """Generates "INSERT DATA" or "DELETE DATA" updates with the triples.
+    The triples are packed into as few updates as possible, each at most "maxSize" characters long
+    (an update with a single triple can be longer if the triple itself exceeds the limit).
+
+    Parameters
+    ----------
+    operation : str
+        Either "INSERT" or "DELETE"
+    triples : Iterable
+        (s, p, o) triples, all of them have to be concrete (no None values)
+    graph : URIRef, optional
+        The named graph the triples belong to, by default None (the default graph)
+    maxSize : int, optional
+        Maximum length of an update, by default DEFAULT_UPDATE_SIZE
+    nodeToSparql : callable, optional
+        Term serialization function
+
+    Yields
+    ------
+    str
+        The SPARQL updates
+    """
+    if operation not in ("INSERT", "DELETE"):
+        raise ValueError(f"Unknown data operation {operation}!")
+    prefix = f"{operation} DATA {{ " + ("" if graph is None else f"GRAPH {nodeToSparql(graph)} {{ ")
+    suffix = " }" + ("" if graph is None else " }")
+    statements, size = [], len(prefix) + len(suffix)
+    for triple in triples:
+        statement = _triplePattern(triple, nodeToSparql) + " ."
+        if statements and size + len(statement) + 1 > maxSize:
+            yield prefix + " ".join(statements) + suffix
+            statements, size = [], len(prefix) + len(suffix)
+        statements.append(statement)
+        size += len(statement) + 1
+    if statements:
+        yield prefix + " ".join(statements) + suffix
+
+
+def deleteWhereUpdate(pattern: tuple, graph=None, nodeToSparql: callable = _n3):
+    """Builds a "DELETE WHERE" update removing all triples matching the (s, p, o) pattern (None matches anything).
+    """
+    return f"DELETE WHERE {{ {_inGraph(_triplePattern(pattern, nodeToSparql) + ' .', graph, nodeToSparql)} }}"
+
+
+def _shapes(patterns):
+    """Groups the patterns by their shape, i.e. by the positions of the wildcards (None).
+    """
+    groups = {}
+    for pattern in patterns:
+        groups.setdefault(tuple(node is None for node in pattern), []).append(tuple(pattern))
+    return groups
+
+
+def _valuesBlocks(shape: tuple, patterns: list, maxSize: int, nodeToSparql: callable = _n3):
+    """Generates VALUES blocks binding the given parts of the patterns (of the same shape)
+    followed by the "?s ?p ?o" triple pattern, each block at most (about) "maxSize" characters long.
+    """
+    bound = [i for i, wildcard in enumerate(shape) if not wildcard]
+    head = "VALUES ({}) {{ ".format(" ".join(VARIABLES[i] for i in bound))
+    tail = " } ?s ?p ?o ."
+    rows, size = [], len(head) + len(tail)
+    for pattern in patterns:
+        row = "(" + " ".join(nodeToSparql(pattern[i]) for i in bound) + ")"
+        if rows and size + len(row) + 1 > maxSize:
+            yield head + " ".join(rows) + tail
+            rows, size = [], len(head) + len(tail)
+        rows.append(row)
+        size += len(row) + 1
+    if rows:
+        yield head + " ".join(rows) + tail
+
+
+def removalUpdates(patterns, graph=None, maxSize: int = DEFAULT_UPDATE_SIZE, nodeToSparql: callable = _n3):
+    """Generates updates removing the triples matching the patterns. Concrete triples
+    are packed into "DELETE DATA" updates, a pattern with wildcards (None) is removed with "DELETE WHERE".
+    Multiple patterns of the same shape (e.g. (s, p, None) patterns) are removed together,
+    by "DELETE ... WHERE" updates with the patterns listed in a VALUES block.
+    """
+    patterns = [tuple(pattern) for pattern in patterns]
+    concrete = [pattern for pattern in patterns if None not in pattern]
+    yield from dataUpdates("DELETE", concrete, graph, maxSize, nodeToSparql)
+    for shape, group in _shapes(pattern for pattern in patterns if None in pattern).items():
+        if len(group) == 1 or all(shape):
+            yield deleteWhereUpdate(group[0], graph, nodeToSparql)
+            continue
+        template = _inGraph("?s ?p ?o .", graph, nodeToSparql)
+        for block in _valuesBlocks(shape, group, maxSize, nodeToSparql):
+            yield f"DELETE {{ {template} }} WHERE {{ {_inGraph(block, graph, nodeToSparql)} }}"
+
+
+def countQueries(patterns, maxSize: int = DEFAULT_UPDATE_SIZE, nodeToSparql: callable = _n3):
+    """Generates SELECT queries counting the (distinct) triples matching any of the patterns,
+    the query returns a single ?count binding. The patterns are split into multiple queries
+    of at most (about) "maxSize" characters, i.e. a triple matching patterns counted by
+    different queries is counted multiple times.
+    """
+    head, tail = "SELECT (COUNT(*) AS ?count) WHERE { SELECT DISTINCT ?s ?p ?o WHERE { ", " } }"
+    blocks, size = [], len(head) + len(tail)
+    for shape, group in _shapes(patterns).items():
+        for block in _valuesBlocks(shape, group, maxSize, nodeToSparql) if not all(shape) else ["?s ?p ?o ."]:
+            block = "{ " + block + " }"
+            if blocks and size + len(block) + 7 > maxSize:
+                yield head + " UNION ".join(blocks) + tail
+                blocks, size = [], len(head) + len(tail)
+            blocks.append(block)
+            size += len(block) + 7
+    if blocks:
+        yield head + " UNION ".join(blocks) + tail
+
+
+def existenceQueries(patterns, maxSize: int = DEFAULT_UPDATE_SIZE, nodeToSparql: callable = _n3):
+    """Generates SELECT queries finding which of the patterns match at least one triple. The patterns
+    are grouped by their shape, the given parts of the patterns of each group are bound by a VALUES block
+    and selected by the query (i.e., a pattern matches if its given parts are in the result).
+
+    Yields
+    ------
+    tuple
+        (positions of the given parts of the patterns, the query)
+    """
+    for shape, group in _shapes(patterns).items():
+        bound = tuple(i for i, wildcard in enumerate(shape) if not wildcard)
+        if not bound:
+            yield bound, "SELECT * WHERE { ?s ?p ?o . } LIMIT 1"
+            continue
+        variables = " ".join(VARIABLES[i] for i in bound)
+        for block in _valuesBlocks(shape, group, maxSize, nodeToSparql):
+            yield bound, f"SELECT DISTINCT {variables} WHERE {{ {block} }}"
+
+
+def setUpdate(triple: tuple, graph=None, nodeToSparql: callable = _n3):
+    """Builds a single update replacing all values of the subject's property by the object of the triple.
+    The OPTIONAL clause ensures the new value is inserted even if the property had no value before.
+    """
+    subject, predicate, obj = (nodeToSparql(node) for node in triple)
+    target = "" if graph is None else f"WITH {nodeToSparql(graph)} "
+    return f"{target}DELETE {{ {subject} {predicate} ?old . }} INSERT {{ {subject} {predicate} {obj} . }} " \
+           f"WHERE {{ OPTIONAL {{ {subject} {predicate} ?old . }} }}"
+
+
+def packUpdates(updates, maxSize: int = DEFAULT_UPDATE_SIZE):
+    """Joins the updates into as few requests as possible, each at most "maxSize" characters
+    long (unless a single update is longer).
+    """
+    request, size = [], 0
+    for update in updates:
+        if request and size + len(update) + 3 > maxSize:
+            yield " ;\n".join(request)
+            request, size = [], 0
+        request.append(update)
+        size += len(update) + 3
+    if request:
+        yield " ;\n".join(request)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Pytest fixtures for the tests of code using knowl. Import them into the conftest.py:
+
+    from knowl.testing import round_trip_budget  # noqa: F401
+"""
+
+import pytest
+
+from knowl.tracing import RoundTripTracer
+
+
+@pytest.fixture
+def round_trip_budget():
+    """Returns a function creating a RoundTripTracer (see knowl.tracing) that fails the test
+    if the code block sends more requests to the database backend than allowed:
+
+        def test_names(onto, round_trip_budget):
+            with round_trip_budget(onto, 2) as tracer:
+                names = [person.name for person in people]
+    """
+    def budget(onto, maxRoundTrips: int, repeatThreshold: int = 2):
+        return RoundTripTracer(onto, budget=maxRoundTrips, repeatThreshold=repeatThreshold)
+
+    return budget
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Radoslav Škoviera
+
+  This Source Code Form is subject to the terms of the Mozilla Public
+  License, v. 2.0. If a copy of the MPL was not distributed with this
+  file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Tracing of the requests (round trips) sent to the database backend. Innocent looking code
+using the entities (e.g. reading attributes of OntoEntity objects in a loop) can send
+a request per call ("N+1 queries"). The tracer records the requests together with the call site
+(the line of the code outside of knowl that caused them) and reports requests of the same shape
+repeated from the same call site.
+
+    with RoundTripTracer(onto) as tracer:
+        names = [person.name for person in people]
+    print(tracer.report())
+
+See also knowl.testing.round_trip_budget (a pytest fixture).
+"""
+
+from collections import Counter, OrderedDict, namedtuple
+import contextlib
+import os
+import re
+import sys
+
+# a request sent to the backend: the statement (SQL or SPARQL), its shape (see shapeOf),
+# the outermost knowl function that caused it and the call site ("file:line (function)") in the calling code
+RoundTrip = namedtuple("RoundTrip", ["statement", "shape", "operation", "callSite"])
+
+# literals, IRIs and numbers, i.e. the parts of a statement that differ between queries of the same shape
+_VALUES = re.compile(r"""<[^<>\s]*>|"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|(?<![\w?$])\d+(?:\.\d+)?(?:e[+-]?\d+)?""", re.IGNORECASE)
+_VALUE_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")  # e.g. IN (?, ?, ?) of a varying length
+_SPACES = re.compile(r"\s+")
+
+_PACKAGE = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_CONTEXTLIB = os.path.abspath(contextlib.__file__)
+_BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks") + os.sep
+
+
+def shapeOf(statement: str) -> str:
+    """Returns the statement with the values (literals, IRIs and numbers) replaced by "?",
+    i.e. statements differing only in the values have the same shape.
+    """
+    shape = _VALUES.sub("?", statement)
+    shape = _VALUE_LISTS.sub("?", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+def _isInternal(filename: str) -> bool:
+    filename = os.path.abspath(filename)
+    return filename.startswith(_PACKAGE) and not filename.startswith(_BENCHMARKS)
+
+
+def _callSite(frame):
+    """Finds the outermost knowl function on the stack (the API function called by the user)
+    and the calling code (the frame just outside of it).
+    """
+    operation, callSite = None, None
+    while frame is not None:
+        code = frame.f_code
+        if _isInternal(code.co_filename):
+            if code.co_name not in ("wrapper", "inner", "__enter__", "__exit__"):  # decorators and context managers
+                operation = getattr(code, "co_qualname", code.co_name)
+            callSite = frame.f_back
+        frame = frame.f_back
+    while callSite is not None and os.path.abspath(callSite.f_code.co_filename) == _CONTEXTLIB:  # e.g. "with onto.session()"
+        callSite = callSite.f_back
+    if callSite is None:
+        return operation, None
+    return operation, f"{callSite.f_code.co_filename}:{callSite.f_lineno} ({callSite.f_code.co_name})"
+
+
+class RoundTripTracer():
+    """Records the requests sent to the database backend while active (use it as a context manager
+    or call start and stop). The requests are recorded from all the threads.
+
+    Parameters
+    ----------
+    onto : knowl.OntologyDatabase
+        The traced database
+    budget : int, optional
+        Maximum number of requests, more requests raise an AssertionError when the tracer is stopped
+        (with the report as the message), by default None (no limit)
+    repeatThreshold : int, optional
+        Requests of the same shape sent from the same call site at least this many times are
+        reported as repeated (see "repeated"), by default 2
+    """
+
+    def __init__(self, onto, budget: int = None, repeatThreshold: int = 2):
+        self.__onto = onto
+        self.__budget = budget
+        self.__repeatThreshold = repeatThreshold
+        self.__roundTrips = []
+        self.__active = False
+
+    def __record(self, statement: str):
+        operation, callSite = _callSite(sys._getframe(1))
+        self.__roundTrips.append(RoundTrip(statement, shapeOf(statement), operation, callSite))
+
+    def start(self):
+        if not self.__active:
+            self.__onto.addRoundTripListener(self.__record)
+            self.__active = True
+        return self
+
+    def stop(self):
+        """Stops the tracing. Raises an AssertionError if the budget is exceeded.
+        """
+        if self.__active:
+            self.__onto.removeRoundTripListener(self.__record)
+            self.__active = False
+        if self.__budget is not None and len(self.__roundTrips) > self.__budget:
+            raise AssertionError(f"{len(self.__roundTrips)} round trips exceed the budget of {self.__budget}:\n{self.report()}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, excType, exc, tb):
+        if excType is None:
+            self.stop()
+        elif self.__active:  # do not hide the original error
+            self.__onto.removeRoundTripListener(self.__record)
+            self.__active = False
+
+    def __len__(self):
+        return len(self.__roundTrips)
+
+    @property
+    def roundTrips(self) -> list:
+        """The recorded requests (RoundTrip tuples), in the order they were sent.
+        """
+        return list(self.__roundTrips)
+
+    def clear(self):
+        self.__roundTrips = []
+
+    def byCallSite(self) -> dict:
+        """Groups the requests by the call site.
+
+        Returns
+        -------
+        dict
+            {call site: list of RoundTrip}, in the order of the first request of each call site
+        """
+        groups = OrderedDict()
+        for roundTrip in self.__roundTrips:
+            groups.setdefault(roundTrip.callSite, []).append(roundTrip)
+        return groups
+
+    def repeated(self) -> list:
+        """Requests of the same shape repeatedly sent from the same call site (N+1 query candidates).
+
+        Returns
+        -------
+        list
+            (call site, operation, shape, count) tuples, the most repeated first
+        """
+        counts = Counter((roundTrip.callSite, roundTrip.operation, roundTrip.shape) for roundTrip in self.__roundTrips)
+        return [key + (count,) for key, count in counts.most_common() if count >= self.__repeatThreshold]
+
+    def report(self, maxShapeLength: int = 200) -> str:
+        """Human readable summary of the requests per call site and the repeated requests.
+        """
+        lines = [f"{len(self.__roundTrips)} round trip(s)"]
+        for callSite, roundTrips in self.byCallSite().items():
+            operations = ", ".join(sorted({str(roundTrip.operation) for roundTrip in roundTrips}))
+            lines.append(f"  {len(roundTrips)} from {callSite} via {operations}")
+        repeated = self.repeated()
+        if repeated:
+            lines.append("Repeated requests of the same shape (possible N+1 queries):")
+            for callSite, operation, shape, count in repeated:
+                if len(shape) > maxShapeLength:
+                    shape = shape[:maxShapeLength] + "..."
+                lines.append(f"  {count}x from {callSite} via {operation}: {shape}")
+        return "\n".join(lines)
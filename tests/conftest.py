@@ -0,0 +1,110 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl.benchmarks.standin import SPARQLStandIn
+from knowl.testing import round_trip_budget  # noqa: F401
+from rdflib import Literal
+from rdflib.namespace import RDF, OWL
+
+
+class StubSPARQLHandler(BaseHTTPRequestHandler):
+    """Minimal SPARQL endpoint: records the requests, accepts any update
+    and answers queries with the bindings set in "server.bindings".
+    Paths containing "broken" respond with 503 Service Unavailable.
+    The first "server.drops" updates are received but the connection is closed without a response.
+    If "server.closeIdle" is set, the connection is closed after each response (without "Connection: close").
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        self.server.requests.append((self.path, self.client_address[1], body))
+        if self.server.drops and "update" in self.path:  # the update was received, but the connection breaks
+            self.server.drops -= 1
+            self.close_connection = True
+            return
+        if "broken" in self.path:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if "update" in self.path:
+            data, contentType = b"", "text/plain"
+        else:
+            data = json.dumps({"head": {"vars": self.server.variables}, "results": {"bindings": self.server.bindings}}).encode()
+            contentType = "application/sparql-results+json"
+        self.send_response(200)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if self.server.closeIdle:  # the server closes the keep-alive connection without telling the client
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def sparql_stub():
+    """Runs a stub SPARQL endpoint (see StubSPARQLHandler) on a random local port.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSPARQLHandler)
+    server.requests = []
+    server.variables = ["s", "p", "o"]
+    server.bindings = []
+    server.drops = 0
+    server.closeIdle = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sparql_standin():
+    """Runs a local stand-in of a Fuseki server (see knowl.benchmarks.standin) on a random local port.
+    """
+    with SPARQLStandIn() as server:
+        yield server
+
+
+@pytest.fixture
+def onto_config():
+    """Additional configuration of the "onto" fixture, override it in a test module to change it.
+    """
+    return {}
+
+
+@pytest.fixture(params=["alchemy", "columnar", "fuseki"])
+def onto(request, onto_config):
+    """OntologyAPI over each of the stores (the Fuseki store runs against "sparql_standin").
+    Test modules with their own "onto" fixture override this one.
+    """
+    baseURL = f"http://example.org/{request.module.__name__}/{request.param}"
+    if request.param == "fuseki":
+        config = request.getfixturevalue("sparql_standin").config(baseURL=baseURL, namespaces={}, **onto_config)
+    elif request.param == "alchemy":
+        config = DBConfig.getInMemoryConfig(baseURL=baseURL, namespaces={}, **onto_config)
+    else:
+        config = DBConfig(store="columnar", baseURL=baseURL, namespaces={}, **onto_config)
+    api = OntologyAPI(config)
+    yield api
+    api.destroy("I know what I am doing")
+
+
+@pytest.fixture
+def populate():
+    """Returns a function adding the items ns.item0 ... of type owl:Thing with their ns.size
+    and, if "links" is set, the ns.next links between them.
+    """
+    def populate(onto, ns, count=20, links=True):
+        onto.addN([(ns[f"item{i}"], RDF.type, OWL.Thing) for i in range(count)])
+        onto.addN([(ns[f"item{i}"], ns.size, Literal(i)) for i in range(count)])
+        if links:
+            onto.addN([(ns[f"item{i}"], ns.next, ns[f"item{i + 1}"]) for i in range(count)])
+    return populate
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from knowl import DBConfig, OntologyDatabase
+from knowl.asyncDatabase import AsyncOntologyDatabase
+from knowl.tracing import RoundTripTracer
+from rdflib import URIRef, Literal
+
+EX = "http://example.org/async#"
+
+
+@pytest.mark.db_async_testing
+def test_async_alchemy():
+    database = OntologyDatabase(DBConfig.getInMemoryConfig(baseURL="http://example.org/async", namespaces={}), create=True)
+    database.setup()
+    adb = AsyncOntologyDatabase(database, concurrency=4)
+
+    async def scenario():
+        await adb.addN([(URIRef(EX + f"s{i}"), URIRef(EX + "p"), Literal(i)) for i in range(20)])
+        values = await asyncio.gather(*[adb.objects(URIRef(EX + f"s{i}"), URIRef(EX + "p")) for i in range(20)])
+        assert values == [[Literal(i)] for i in range(20)]
+        await adb.remove((URIRef(EX + "s0"), None, None))
+        assert await adb.triples((URIRef(EX + "s0"), None, None)) == []
+        result = await adb.query(f"SELECT (COUNT(?s) AS ?n) WHERE {{ ?s <{EX}p> ?o }}")
+        assert list(result)[0][0] == Literal(19)
+        await adb.close()
+
+    asyncio.run(scenario())
+    database.destroy("I know what I am doing")
+
+
+@pytest.mark.db_async_testing
+def test_async_fuseki(sparql_stub):
+    config = DBConfig(host="127.0.0.1", port=sparql_stub.server_port, database="ds", store="fuseki",
+                      baseURL="http://example.org/async-fuseki", namespaces={}, retry_backoff=0)
+    database = OntologyDatabase(config)
+    database.setup()
+    adb = AsyncOntologyDatabase(database, concurrency=4)
+    sparql_stub.variables = ["o"]
+    sparql_stub.bindings = [{"o": {"type": "literal", "value": "7", "datatype": "http://www.w3.org/2001/XMLSchema#integer"}}]
+
+    async def scenario():
+        values = await asyncio.gather(*[adb.objects(URIRef(EX + f"s{i}"), URIRef(EX + "p")) for i in range(12)])
+        assert values == [[Literal(7)]] * 12
+        await adb.addN([(URIRef(EX + "s"), URIRef(EX + "p"), Literal(1))])
+        await adb.query("SELECT ?o WHERE { ?s foaf:name ?o }")
+        await adb.close()
+
+    asyncio.run(scenario())
+    queries = [request for request in sparql_stub.requests if request[0].startswith("/ds/query")]
+    assert len(queries) == 13
+    assert "PREFIX foaf:" in queries[-1][2], "The bound namespaces must be declared, as in OntologyDatabase.query"
+    assert "default-graph-uri" in queries[0][0]
+    assert len({port for _, port, _ in queries}) <= 4, "At most 'concurrency' connections should be opened"
+    assert any("INSERT DATA" in body for path, _, body in sparql_stub.requests if path.startswith("/ds/update"))
+
+
+@pytest.mark.db_async_testing
+def test_async_fuseki_uses_store_logic(sparql_stub):
+    config = DBConfig(host="127.0.0.1", port=sparql_stub.server_port, database="ds", store="fuseki",
+                      baseURL="http://example.org/async-fuseki", namespaces={}, retry_backoff=0)
+    database = OntologyDatabase(config)
+    database.setup()
+    database._graph.store.kwargs["params"] = {"access": "token"}
+    instrumentation = database.enableInstrumentation()
+    adb = AsyncOntologyDatabase(database, concurrency=4)
+    sparql_stub.variables = ["o"]
+
+    async def scenario():
+        sparql_stub.drops = 1  # the update is received, but the connection breaks
+        await adb.addN([(URIRef(EX + "s"), URIRef(EX + "p"), Literal(1))])
+        await adb.objects(URIRef(EX + "s"), URIRef(EX + "p"))
+        await adb.close()
+
+    with RoundTripTracer(database) as tracer:
+        asyncio.run(scenario())
+    assert len(tracer) == 3, "The requests should be reported to the round trip listeners"
+    assert all("access=token" in path for path, _, _ in sparql_stub.requests), "The store parameters should be sent"
+    assert instrumentation.stats()["addN"]["retries"] == 1
+    assert instrumentation.stats()["triples"]["calls"] == 1
@@ -0,0 +1,46 @@
+import copy
+import json
+
+import pytest
+from knowl.benchmarks import generateOntology, runBenchmarks, compareResults
+from knowl.benchmarks.__main__ import main
+from rdflib.namespace import RDF, RDFS, OWL
+
+NS = "http://example.org/generated#"
+
+
+@pytest.mark.db_benchmark_testing
+def test_generator():
+    ontology = generateOntology(NS, depth=2, branching=3, instances=50, fanOut=3, seed=7)
+    assert ontology == generateOntology(NS, depth=2, branching=3, instances=50, fanOut=3, seed=7)
+    assert ontology.triples != generateOntology(NS, depth=2, branching=3, instances=50, fanOut=3, seed=8).triples
+    assert len(ontology.classes) == 1 + 3 + 9 and len(ontology.leaves) == 9
+    assert len(ontology.instances) == 50
+    triples = set(ontology.triples)
+    for leaf in ontology.leaves:
+        parent = next(o for s, p, o in triples if s == leaf and p == RDFS.subClassOf)
+        assert (parent, RDFS.subClassOf, ontology.classes[0]) in triples
+    for individual in ontology.instances:
+        properties = [p for s, p, o in triples if s == individual and p != RDF.type]
+        assert len(properties) == 3
+        assert any(s == individual and p == RDF.type and o in ontology.leaves for s, p, o in triples)
+    assert all((p, RDF.type, OWL.DatatypeProperty) in triples for p in ontology.dataProperties)
+
+
+@pytest.mark.db_benchmark_testing
+def test_run_and_compare(tmp_path):
+    results = runBenchmarks(["memory", "fuseki"], depth=2, branching=2, instances=20, fanOut=2, count=3, repeat=1,
+                            micro=["add", "value", "entity_get", "transitive_objects"], macro=["read_mostly"])
+    json.dumps(results)
+    for store in ["memory", "fuseki"]:
+        assert set(results["results"][store]) == {"mergeFileIntoDB", "add", "value", "entity_get", "transitive_objects", "read_mostly"}
+        assert results["results"][store]["mergeFileIntoDB"]["ops"] > 20
+    assert compareResults(results, results) == []
+    faster = copy.deepcopy(results)
+    faster["results"]["memory"]["value"]["median"] /= 2
+    assert [(store, name) for store, name, *_ in compareResults(results, faster)] == [("memory", "value")]
+
+    baseline = tmp_path / "baseline.json"
+    arguments = ["--store", "memory", "--benchmark", "add", "--instances", "10", "--count", "2", "--repeat", "1"]
+    assert main(arguments + ["--output", str(baseline)]) == 0
+    assert main(arguments + ["--output", str(tmp_path / "current.json"), "--baseline", str(baseline), "--tolerance", "1000"]) == 0
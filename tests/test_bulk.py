@@ -0,0 +1,110 @@
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl import sparql
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDF, RDFS, OWL
+
+EX = Namespace("http://example.org/bulk#")
+
+
+@pytest.fixture
+def onto_config():
+    return {"max_update_size": 400}
+
+
+@pytest.mark.db_bulk_testing
+def test_set_many(onto, populate):
+    populate(onto, EX)
+    counts = onto.setMany([(EX[f"item{i}"], EX.size, Literal(i * 10)) for i in range(15)] + [(EX.item0, EX.size, Literal(-1))])
+    assert counts == (15, 15)
+    assert onto.value(EX.item0, EX.size) == Literal(-1)
+    assert onto.value(EX.item14, EX.size) == Literal(140)
+    assert onto.value(EX.item15, EX.size) == Literal(15)
+    assert onto.setMany([(EX.newItem, EX.size, Literal(1))]) == (0, 1)
+
+
+@pytest.mark.db_bulk_testing
+def test_remove_n(onto, populate):
+    populate(onto, EX)
+    assert onto.removeN([(EX[f"item{i}"], EX.next, None) for i in range(10)]) == 10
+    assert onto.removeN([(EX.item15, None, None), (EX.item15, EX.size, None), (None, RDF.type, OWL.Thing)]) == 3 + 19
+    assert onto.removeN([(EX.item16, EX.size, Literal(16)), (EX.item17, EX.next, EX.item18)]) == 2
+    assert onto.removeN([(EX.item0, EX.next, None)]) == 0
+    assert set(onto.subjects(EX.next, None)) == {EX[f"item{i}"] for i in range(10, 20)} - {EX.item15, EX.item17}
+    assert list(onto.subjects(RDF.type, OWL.Thing)) == []
+    assert len(list(onto.subjects(EX.size, None))) == 18
+
+
+@pytest.mark.db_bulk_testing
+def test_replace_n(onto, populate):
+    populate(onto, EX, 5)
+    with onto.session():
+        assert onto.replaceN([(None, EX.size, None)], [(EX.item0, EX.size, Literal("big"))]) is None
+        assert len(list(onto.subjects(EX.size, None))) == 5
+    assert list(onto.subject_objects(EX.size)) == [(EX.item0, Literal("big"))]
+    assert onto.replaceN([(EX.item0, EX.size, None), (EX.item1, EX.next, None)], [(EX.item1, EX.next, EX.item3)]) == (2, 1)
+    assert list(onto.objects(EX.item1, EX.next)) == [EX.item3]
+
+
+@pytest.mark.db_bulk_testing
+def test_grouped_sparql_removals():
+    patterns = [(EX[f"item{i}"], EX.size, None) for i in range(3)] + [(EX.item9, None, None)]
+    updates = list(sparql.removalUpdates(patterns, EX.graph))
+    assert len(updates) == 2
+    assert updates[0].startswith(f"DELETE {{ GRAPH <{EX.graph}> {{ ?s ?p ?o . }} }} WHERE")
+    assert f"VALUES (?s ?p) {{ (<{EX.item0}> <{EX.size}>)" in updates[0]
+    assert updates[1] == f"DELETE WHERE {{ GRAPH <{EX.graph}> {{ <{EX.item9}> ?p ?o . }} }}"
+    assert len(list(sparql.removalUpdates(patterns[:3], maxSize=150))) == 3
+    queries = list(sparql.countQueries(patterns))
+    assert len(queries) == 1 and queries[0].count("UNION") == 1
+
+
+@pytest.mark.db_bulk_testing
+def test_count(onto, populate, round_trip_budget):
+    populate(onto, EX)
+    onto.remove((EX.item3, None, None))
+    onto.add((EX.extra, RDF.type, EX.Special))
+    onto.add((EX.item4, RDF.type, EX.Special))
+    onto.add((EX.Special, RDFS.subClassOf, OWL.Thing))
+    with round_trip_budget(onto, 5):
+        assert onto.count((None, RDF.type, OWL.Thing)) == 19
+        assert onto.count((EX.item5, None, None)) == 3
+        assert onto.count((None, EX.size, Literal(7))) == 1
+        assert onto.count((EX.missing, None, None)) == 0
+        assert onto.count() == 3 * 19 + 3
+    assert len(onto) == 3 * 19 + 3
+    assert onto.countEntsByClass(OWL.Thing) == 19
+    assert onto.countEntsByClass(OWL.Thing, includeSubclasses=True) == 20
+    assert onto.countEntsByClass(EX.Special) == 2
+
+
+@pytest.mark.db_bulk_testing
+def test_count_instances_retries(monkeypatch):
+    onto = OntologyAPI(DBConfig(store="columnar", baseURL="http://example.org/bulk/retries", namespaces={}, retries=2, retry_backoff=0))
+    onto.add((EX.item0, RDF.type, OWL.Thing))
+    store, calls = onto.graph.store, []
+
+    def failingCount(pattern):
+        calls.append(pattern)
+        raise ConnectionResetError("connection dropped")
+
+    monkeypatch.setattr(store, "count", failingCount)
+    with pytest.raises(ConnectionResetError):
+        onto.countEntsByClass(OWL.Thing)
+    assert len(calls) == 3, "The count must be attempted once per retry, not in nested retry loops"
+    monkeypatch.undo()
+    onto.destroy("I know what I am doing")
+
+
+@pytest.mark.db_bulk_testing
+def test_contains_many(onto, populate, round_trip_budget):
+    populate(onto, EX, 10)
+    triples = [(EX[f"item{i}"], RDF.type, OWL.Thing) for i in range(0, 20, 3)] + [
+        (EX.item2, EX.next, EX.item3), (EX.item2, EX.next, EX.item4), (EX.item5, EX.size, Literal(5)), (EX.item5, EX.size, Literal(6)),
+        (None, EX.next, EX.item1), (None, EX.next, EX.item0), (EX.item1, None, None), (None, None, None), (EX.item1, RDF.type, OWL.Thing)
+    ]
+    expected = [True] * 4 + [False] * 3 + [True, False, True, False, True, False, True, True, True]
+    with round_trip_budget(onto, 12):
+        assert onto.containsMany(triples) == expected
+    assert [triple in onto for triple in triples] == expected
+    assert onto.containsMany([]) == []
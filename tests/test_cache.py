@@ -0,0 +1,107 @@
+import pytest
+from knowl import OntologyDatabase, DBConfig
+from knowl.cache import TriplePatternCache, PreparedQueryCache
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, OWL
+
+EX = "http://example.org/cache#"
+a, b, name, size = URIRef(EX + "a"), URIRef(EX + "b"), URIRef(EX + "name"), URIRef(EX + "size")
+
+
+@pytest.fixture
+def ontoDB():
+    config = DBConfig(DBConfig.IN_MEMORY, baseURL="http://example.org/cache", cache_size=100)
+    db = OntologyDatabase(config, create=True)
+    db.setup()
+    db.addN([(a, RDF.type, OWL.Class), (a, name, Literal("A")), (b, name, Literal("B"))])
+    yield db
+    db.destroy("I know what I am doing")
+
+
+@pytest.mark.db_cache_testing
+def test_cache_hits_and_invalidation(ontoDB):
+    assert ontoDB.value(a, name) == Literal("A")
+    assert ontoDB.value(a, name) == Literal("A")
+    assert ontoDB.cacheStats["hits"] == 1
+    assert ontoDB.cacheStats["misses"] == 1
+
+    assert list(ontoDB.objects(b, name)) == [Literal("B")]
+    assert list(ontoDB.objects(a, size)) == []
+    assert (a, size, None) not in ontoDB
+    # writing a triple of "a" must not invalidate the patterns of "b"
+    ontoDB.add((a, size, Literal(3)))
+    assert (a, size, None) in ontoDB
+    # membership tests are answered from the cache, but do not fill it
+    hits = ontoDB.cacheStats["hits"]
+    assert (b, name, None) in ontoDB
+    assert ontoDB.cacheStats["hits"] == hits + 1
+    assert (None, name, None) in ontoDB
+    assert ontoDB.cacheStats["patterns"] == 2
+    assert ontoDB.cacheStats["invalidations"] == 1
+    assert list(ontoDB.objects(b, name)) == [Literal("B")]
+
+    ontoDB.set((a, name, Literal("AA")))
+    assert ontoDB.value(a, name) == Literal("AA")
+    ontoDB.remove((None, name, None))
+    assert ontoDB.value(b, name) is None
+    assert list(ontoDB.subjects(RDF.type, OWL.Class)) == [a]
+    ontoDB.update(f"DELETE DATA {{ <{a}> <{RDF.type}> <{OWL.Class}> }}")
+    assert list(ontoDB.subjects(RDF.type, OWL.Class)) == []
+
+
+@pytest.mark.db_cache_testing
+def test_cache_session_invalidation(ontoDB):
+    assert ontoDB.value(a, name) == Literal("A")
+    with ontoDB.session():
+        ontoDB.set((a, name, Literal("Z")))
+        assert ontoDB.value(a, name) == Literal("A")
+    assert ontoDB.value(a, name) == Literal("Z")
+
+
+@pytest.mark.db_cache_testing
+def test_cache_size_bound():
+    cache = TriplePatternCache(3)
+    cache.put((a, None, None), [(a, name, Literal(1)), (a, size, Literal(2))])
+    cache.put((b, None, None), [(b, name, Literal(1)), (b, size, Literal(2))])
+    assert (a, None, None) not in cache, "The least recently used entry should have been evicted"
+    cache.put((None, None, None), [(a, name, Literal(i)) for i in range(4)])
+    assert (None, None, None) not in cache, "Results bigger than the cache must not be cached"
+    assert cache.stats["triples"] == 2
+    assert cache.stats["evictions"] == 1
+
+
+@pytest.mark.db_cache_testing
+def test_prepared_queries(ontoDB):
+    text = "SELECT ?n WHERE { ?s ex:name ?n }"
+    ontoDB.bind("ex", EX)
+    for subject, expected in [(a, "A"), (b, "B"), (a, "A")]:
+        assert [row[0] for row in ontoDB.query(text, initBindings={"s": subject})] == [Literal(expected)]
+    stats = ontoDB.queryCacheStats
+    assert (stats["misses"], stats["hits"], stats["queries"]) == (1, 2, 1)
+    prepared = ontoDB.prepare(text)
+    assert [row[0] for row in ontoDB.query(prepared, initBindings={"s": b})] == [Literal("B")]
+    # other namespaces, other entry
+    assert list(ontoDB.query(text, initNs={"ex": "http://example.org/other#"})) == []
+    assert ontoDB.queryCacheStats["queries"] == 2
+    ontoDB.bind("other", "http://example.org/other#")
+    assert ontoDB.queryCacheStats["queries"] == 0
+
+
+@pytest.mark.db_cache_testing
+def test_prepared_query_cache_bound():
+    cache = PreparedQueryCache(2)
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert "a" not in cache and cache.get("c") == "C"
+    assert cache.stats["evictions"] == 1 and cache.stats["hitRate"] == 1.0
+
+
+@pytest.mark.db_cache_testing
+def test_prepared_sparql_requests(sparql_standin):
+    db = OntologyDatabase(sparql_standin.config(baseURL="http://example.org/cache/fuseki", namespaces={"ex": EX}))
+    db.addN([(a, name, Literal("A")), (b, name, Literal("B"))])
+    text = "SELECT ?n WHERE { ?s ex:name ?n }"
+    assert [row[0] for row in db.query(text, initBindings={"s": a})] == [Literal("A")]
+    assert [row[0] for row in db.query(text, initBindings={"s": b})] == [Literal("B")]
+    assert db.queryCacheStats["hits"] == 1
+    db.destroy("I know what I am doing")
@@ -0,0 +1,109 @@
+import random
+import time
+from itertools import product
+
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl.columnar import ColumnarStore, TripleIndex, PERMUTATIONS
+from rdflib import Graph, URIRef, Literal, BNode
+from rdflib.namespace import RDF, OWL
+
+EX = "http://example.org/columnar#"
+
+
+def randomTriples(count, seed=42):
+    rng = random.Random(seed)
+    subjects = [URIRef(EX + f"s{i}") for i in range(30)] + [BNode(f"b{i}") for i in range(5)]
+    predicates = [URIRef(EX + f"p{i}") for i in range(6)]
+    objects = subjects[:10] + [Literal(i) for i in range(10)] + [Literal("text", lang="en")]
+    return [(rng.choice(subjects), rng.choice(predicates), rng.choice(objects)) for _ in range(count)]
+
+
+def patterns(triples):
+    for s, p, o in triples[:20]:
+        for mask in product([True, False], repeat=3):
+            yield tuple(term if keep else None for term, keep in zip((s, p, o), mask))
+
+
+@pytest.mark.db_columnar_testing
+@pytest.mark.parametrize("mergeThreshold", [1, 50, 100000])
+def test_columnar_matches_memory_store(mergeThreshold):
+    triples = randomTriples(500)
+    columnar = Graph(ColumnarStore(mergeThreshold=mergeThreshold))
+    reference = Graph()
+    for triple in triples[:300]:
+        columnar.add(triple)
+        reference.add(triple)
+    columnar.addN((s, p, o, columnar) for s, p, o in triples[300:])
+    reference.addN((s, p, o, reference) for s, p, o in triples[300:])
+    for pattern in [triples[0], (triples[1][0], None, None), (None, triples[2][1], None)]:
+        columnar.remove(pattern)
+        reference.remove(pattern)
+    columnar.add(triples[1])  # re-add a removed triple
+    reference.add(triples[1])
+
+    assert len(columnar) == len(reference)
+    for pattern in patterns(triples):
+        assert set(columnar.triples(pattern)) == set(reference.triples(pattern)), pattern
+    assert (URIRef(EX + "unknown"), None, None) not in columnar
+
+    columnar.store.compact()
+    assert set(columnar) == set(reference)
+
+
+@pytest.mark.db_columnar_testing
+def test_merge_matches_build():
+    rng = random.Random(7)
+    triples = list({(rng.randrange(50), rng.randrange(5), rng.randrange(50)) for _ in range(2000)})
+    main, added = triples[:1500], triples[1500:]
+    removed = rng.sample(main, 300)
+    expected = set(main) - set(removed) | set(added)
+    for order in PERMUTATIONS.values():
+        merged = TripleIndex.build(order, main).merged(added, removed)
+        assert merged.columns == TripleIndex.build(order, expected).columns
+    assert TripleIndex.build((0, 1, 2), []).merged(added[:1], []).columns == TripleIndex.build((0, 1, 2), added[:1]).columns
+
+
+@pytest.mark.db_columnar_testing
+def test_lookups_with_delta():
+    store = ColumnarStore(mergeThreshold=float("inf"))
+    graph = Graph(store)
+    subjects = [URIRef(EX + f"s{i}") for i in range(1000)]
+    predicates = [URIRef(EX + f"p{i}") for i in range(10)]
+    graph.addN((s, p, Literal(i), graph) for i, s in enumerate(subjects) for p in predicates)
+    store.compact()
+
+    def lookups(expected):
+        start = time.perf_counter()
+        for s in subjects:
+            assert len(list(store.triples((s, predicates[3], None)))) == expected
+        return time.perf_counter() - start
+
+    compacted = lookups(1)
+    graph.addN((s, p, Literal(-i - 1), graph) for i, s in enumerate(subjects) for p in predicates[:5])  # 5000 pending additions
+    assert lookups(2) < 10 * compacted + 0.05, "The delta buffer should be searched, not scanned"
+
+    graph.remove((subjects[0], predicates[3], None))
+    graph.remove((subjects[1], None, Literal(-2)))
+    graph.add((subjects[0], predicates[3], Literal(0)))
+    assert len(store) == 10000 + 5000 - 1 - 5
+    for pattern in [(subjects[0], None, None), (subjects[1], None, None), (None, predicates[3], None), (None, None, Literal(-2)), (None, None, None)]:
+        assert store.count(pattern) == len(list(store.triples(pattern))), pattern
+    assert set(o for _, o in graph.predicate_objects(subjects[0])) == {Literal(0), Literal(-1)}
+
+
+@pytest.mark.db_columnar_testing
+def test_columnar_ontology():
+    config = DBConfig(host=DBConfig.IN_MEMORY, store="columnar", baseURL="http://example.org/columnar", namespaces={})
+    onto = OntologyAPI(config)
+    cube = URIRef(EX + "Cube")
+    onto.makeEntity(cube, {RDF.type: OWL.Class})
+    onto.bulk_load([(URIRef(EX + f"cube{i}"), RDF.type, cube) for i in range(100)])
+    entity = onto.makeEntity(URIRef(EX + "cube1"))
+    entity.size = 3
+    assert entity.size == Literal(3)
+    assert len(list(onto.getEntsByClass(cube, pageSize=30))) == 100
+    result = onto.query(f"SELECT (COUNT(?s) AS ?n) WHERE {{ ?s a <{cube}> }}")
+    assert list(result)[0][0] == Literal(100)
+    onto.destroy("I know what I am doing")
+    assert len(onto._graph) == 0
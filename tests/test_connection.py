@@ -0,0 +1,129 @@
+import http.client
+import time
+from contextlib import nullcontext
+
+import pytest
+from knowl.connection import HTTPConnectionPool, PooledSPARQLUpdateStore, RetryPolicy, SPARQLHTTPError, isTransientError
+from knowl.database import interact_with_db
+from rdflib import Graph, URIRef
+from sqlalchemy import exc as sqlalchemy_exc
+
+
+class FlakyDatabase():
+    connectionLock = nullcontext()
+    singleConnection = False
+
+    def __init__(self, failures, error):
+        self.retryPolicy = RetryPolicy(retries=3, backoff=0.001)
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.resets = 0
+
+    def _resetConnections(self):
+        self.resets += 1
+
+    @interact_with_db
+    def read(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+    @interact_with_db(idempotent=False)
+    def write(self):
+        self.calls += 1
+        raise self.error
+
+
+def operationalError(message, invalidated=False):
+    return sqlalchemy_exc.OperationalError("SELECT 1", {}, Exception(message), connection_invalidated=invalidated)
+
+
+@pytest.mark.db_connection_testing
+def test_error_classification():
+    assert isTransientError(operationalError("database is locked"))
+    assert isTransientError(operationalError("whatever", invalidated=True))
+    assert not isTransientError(operationalError("no such table: foo"))
+    assert not isTransientError(sqlalchemy_exc.IntegrityError("INSERT", {}, Exception("duplicate")))
+    assert isTransientError(SPARQLHTTPError(503, "Service Unavailable"))
+    assert not isTransientError(SPARQLHTTPError(400, "Bad Request"))
+    assert isTransientError(ConnectionResetError())
+    assert not isTransientError(ValueError())
+
+
+@pytest.mark.db_connection_testing
+def test_retry():
+    db = FlakyDatabase(2, operationalError("lost connection", invalidated=True))
+    assert db.read() == "ok"
+    assert db.calls == 3 and db.resets == 2
+
+    db = FlakyDatabase(10, operationalError("database is locked"))
+    with pytest.raises(sqlalchemy_exc.OperationalError):
+        db.read()
+    assert db.calls == 4 and db.resets == 0
+
+    db = FlakyDatabase(1, operationalError("no such table: foo"))
+    with pytest.raises(sqlalchemy_exc.OperationalError):
+        db.read()
+    assert db.calls == 1, "Non-transient errors must not be retried"
+
+    db = FlakyDatabase(1, operationalError("database is locked"))
+    with pytest.raises(sqlalchemy_exc.OperationalError):
+        db.write()
+    assert db.calls == 1, "Non-idempotent operations must not be retried"
+
+
+@pytest.mark.db_connection_testing
+def test_backoff_bounds():
+    policy = RetryPolicy(retries=5, backoff=0.1, maxBackoff=0.5)
+    for attempt in range(5):
+        assert 0 <= policy.delay(attempt) <= min(0.5, 0.1 * 2 ** attempt)
+
+
+@pytest.mark.db_connection_testing
+def test_keepalive_pool(sparql_stub):
+    pool = HTTPConnectionPool("127.0.0.1", sparql_stub.server_port, maxSize=2)
+    for _ in range(5):
+        status, _, _, _ = pool.request("POST", "/update", b"INSERT DATA {}", {"Content-Type": "application/sparql-update"})
+        assert status == 200
+    assert len({port for _, port, _ in sparql_stub.requests}) == 1, "All requests should reuse a single connection"
+    pool.clear()
+
+
+@pytest.mark.db_connection_testing
+def test_pooled_sparql_store(sparql_stub):
+    endpoint = f"http://127.0.0.1:{sparql_stub.server_port}"
+    store = PooledSPARQLUpdateStore(query_endpoint=endpoint + "/query", update_endpoint=endpoint + "/update")
+    graph = Graph(store, identifier=URIRef("http://example.org/graph"))
+    sparql_stub.variables = ["s"]
+    sparql_stub.bindings = [{"s": {"type": "uri", "value": "http://example.org/a"}}]
+    rows = list(graph.query("SELECT ?s WHERE { ?s ?p ?o }"))
+    assert rows[0][0] == URIRef("http://example.org/a")
+    graph.update("INSERT DATA { <http://example.org/a> <http://example.org/p> 1 }")
+    assert len({port for _, port, _ in sparql_stub.requests}) == 1
+
+    store.update_endpoint = endpoint + "/broken"
+    with pytest.raises(SPARQLHTTPError) as error:
+        graph.update("INSERT DATA { <http://example.org/a> <http://example.org/p> 2 }")
+    assert isTransientError(error.value)
+    store.close()
+
+
+@pytest.mark.db_connection_testing
+def test_pool_does_not_resend_updates(sparql_stub):
+    pool = HTTPConnectionPool("127.0.0.1", sparql_stub.server_port)
+    update = (b"INSERT DATA {}", {"Content-Type": "application/sparql-update"})
+    assert pool.request("POST", "/update", *update)[0] == 200
+    sparql_stub.drops = 1
+    with pytest.raises((ConnectionError, http.client.HTTPException)) as error:
+        pool.request("POST", "/update", *update)
+    assert isTransientError(error.value)
+    assert len(sparql_stub.requests) == 2, "The update might have been executed, it must not be sent again"
+
+    sparql_stub.closeIdle = True
+    assert pool.request("POST", "/query", b"SELECT * {}", idempotent=True)[0] == 200
+    time.sleep(0.1)
+    assert pool.request("POST", "/update", *update)[0] == 200, "The connection closed by the server should be discarded"
+    assert len(sparql_stub.requests) == 4
+    pool.clear()
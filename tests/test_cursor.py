@@ -0,0 +1,71 @@
+import pytest
+from knowl import DBConfig, OntologyAPI
+from rdflib import Literal, Namespace, Variable
+from rdflib.namespace import RDF, OWL
+
+EX = Namespace("http://example.org/cursor#")
+
+
+@pytest.fixture
+def onto_config():
+    return {"cursor_page_size": 7}
+
+
+@pytest.mark.db_cursor_testing
+def test_triples_cursor(onto, populate):
+    populate(onto, EX, 50, links=False)
+    with onto.triplesCursor((None, RDF.type, OWL.Thing)) as cursor:
+        assert cursor.pages == 1
+        first = cursor.fetchmany(10)
+        assert cursor.rows == 10 and cursor.pages == 2
+        rest = list(cursor)
+    assert cursor.closed and cursor.pages == 8
+    assert set(first + rest) == {(EX[f"item{i}"], RDF.type, OWL.Thing) for i in range(50)}
+    assert len(first + rest) == 50
+
+    assert set(onto.triplesCursor((EX.item3, None, None), pageSize=1)) == {(EX.item3, RDF.type, OWL.Thing), (EX.item3, EX.size, Literal(3))}
+    assert list(onto.triplesCursor((EX.missing, None, None))) == []
+
+
+@pytest.mark.db_cursor_testing
+def test_early_close(onto, populate):
+    populate(onto, EX, 50, links=False)
+    cursor = onto.triplesCursor((None, EX.size, None), pageSize=5)
+    assert len(cursor.fetchmany(3)) == 3
+    cursor.close()
+    assert cursor.closed and cursor.pages == 1
+    assert len(cursor.fetchmany(10)) == 2, "The rest of the retrieved page is still available"
+    # the connection was released
+    onto.add((EX.item0, EX.size, Literal(-1)))
+    assert len(list(onto.objects(EX.item0, EX.size))) == 2
+
+
+@pytest.mark.db_cursor_testing
+def test_query_cursor(onto, populate):
+    populate(onto, EX, 20, links=False)
+    query = "SELECT ?s ?size WHERE { ?s a owl:Thing ; <%s> ?size . }" % EX.size
+    with onto.queryCursor(query, initNs={"owl": OWL}, pageSize=4) as cursor:
+        rows = list(cursor)
+        assert cursor.variables == [Variable("s"), Variable("size")]
+    assert {(row.s, row.size.toPython()) for row in rows} == {(EX[f"item{i}"], i) for i in range(20)}
+
+    cursor = onto.queryCursor(query, initNs={"owl": OWL}, initBindings={"s": EX.item5})
+    assert [row.size for row in cursor] == [Literal(5)]
+
+
+@pytest.mark.db_cursor_testing
+def test_query_cursor_lock(monkeypatch, populate):
+    onto = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/cursor/locked", namespaces={}))
+    populate(onto, EX, 5, links=False)
+    store = onto._OntologyDatabase__store
+    select, locked = store._do_triples_select, []
+
+    def spySelect(*args, **kwargs):
+        locked.append(onto.connectionLock._is_owned())
+        return select(*args, **kwargs)
+
+    monkeypatch.setattr(store, "_do_triples_select", spySelect)
+    query = "SELECT ?s ?size WHERE { ?s a <%s> ; <%s> ?size . }" % (OWL.Thing, EX.size)
+    assert len(list(onto.queryCursor(query, pageSize=1))) == 5
+    assert len(locked) > 1 and all(locked), "The shared connection must only be used under the lock"
+    onto.destroy("I know what I am doing")
@@ -0,0 +1,164 @@
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl.databaseAPI import OntoEntity
+from knowl import sparql
+from rdflib import URIRef, Literal, BNode
+from rdflib.namespace import RDF, RDFS, OWL
+
+EX = "http://example.org/entity#"
+
+
+@pytest.fixture(scope="module")
+def onto():
+    api = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/entity"))
+    yield api
+    api.destroy("I know what I am doing")
+
+
+@pytest.mark.db_entity_testing
+def test_entity_snapshot(onto):
+    entity = onto.makeEntity(URIRef(EX + "box"), {RDF.type: OWL.Class, URIRef(EX + "color"): Literal("red")})
+    assert not entity.loaded
+    entity.refresh()
+    assert entity.loaded
+    assert entity.type == OWL.Class
+    assert entity.localType == "Class"
+    assert entity[URIRef(EX + "color")] == Literal("red")
+    # own writes keep the local copy up to date
+    entity.size = 3
+    assert entity.size == Literal(3)
+    entity[URIRef(EX + "color"), URIRef(EX + "weight")] = ["blue", 5]
+    assert entity[[URIRef(EX + "color"), URIRef(EX + "weight")]] == [Literal("blue"), Literal(5)]
+    del entity.size
+    assert entity.size == []
+    # changes made by other means are only visible after refresh
+    onto.add((entity.node, URIRef(EX + "label"), Literal("Box")))
+    assert entity[URIRef(EX + "label")] == []
+    assert entity.refresh()[URIRef(EX + "label")] == Literal("Box")
+    assert set(entity.properties) == set(onto.predicate_objects(entity.node))
+
+
+@pytest.mark.db_entity_testing
+def test_entity_name(onto):
+    color = URIRef(EX + "color")
+    entity = onto.makeEntity(URIRef(EX + "lamp"), {color: Literal("red")})
+    assert entity.node == URIRef(EX + "lamp") and isinstance(entity.node, URIRef)
+    assert [(s, type(s)) for s, _ in onto.subject_objects(color) if s == URIRef(EX + "lamp")] == [(URIRef(EX + "lamp"), URIRef)], \
+        "The IRI must not be turned into a blank node"
+    assert OntoEntity(onto, name="lamp").node == BNode("lamp")
+    onto.remove((URIRef(EX + "lamp"), None, None))
+
+
+@pytest.mark.db_entity_testing
+def test_entity_prefetch_on_first_access(onto):
+    onto.prefetch = True
+    try:
+        entity = onto.makeEntity(URIRef(EX + "ball"), {RDF.type: OWL.Class})
+        assert not entity.loaded
+        assert entity.type == OWL.Class
+        assert entity.loaded
+        entity.forget()
+        assert not entity.loaded
+    finally:
+        onto.prefetch = False
+
+
+@pytest.mark.db_entity_testing
+@pytest.mark.parametrize("store", ["alchemy", "sparql"])
+def test_get_ents_by_class(onto, store, monkeypatch):
+    shape, cube = URIRef(EX + "Shape"), URIRef(EX + "Cube")
+    size = URIRef(EX + "size")
+    onto.addN([(shape, RDF.type, OWL.Class), (cube, RDF.type, OWL.Class), (cube, RDFS.subClassOf, shape)])
+    onto.addN([(URIRef(EX + f"shape{i:02d}"), RDF.type, shape) for i in range(7)])
+    onto.addN([(URIRef(EX + f"cube{i:02d}"), RDF.type, cube) for i in range(5)])
+    onto.addN([(URIRef(EX + f"cube{i:02d}"), size, Literal(i)) for i in range(5)])
+    if store == "sparql":
+        # force the generic (SPARQL) implementation
+        monkeypatch.setattr(onto, "_OntologyDatabase__store_type", "generic")
+
+    shapes = list(onto.getEntsByClass(shape, pageSize=3))
+    assert [e.node for e in shapes] == [URIRef(EX + f"shape{i:02d}") for i in range(7)]
+    assert all(not e.loaded for e in shapes)
+    assert shapes[0] is next(onto.getEntsByClass(shape)), "Entities must be taken from the identity map"
+
+    everything = list(onto.getEntsByClass(shape, includeSubclasses=True, pageSize=4))
+    assert len(everything) == 12
+
+    cubes = list(onto.getEntsByClass(cube, prefetch=[size], pageSize=2))
+    assert all(e.loaded for e in cubes)
+    assert [e[size] for e in cubes] == [Literal(i) for i in range(5)]
+    cubes = list(onto.getEntsByClass(cube, prefetch=True, pageSize=2))
+    assert all(e.type == cube for e in cubes)
+    onto.remove((None, None, cube))
+    onto.remove((None, None, shape))
+
+
+@pytest.mark.db_entity_testing
+@pytest.mark.parametrize("store", ["alchemy", "sparql"])
+def test_get_blank_node_ents_by_class(onto, store, monkeypatch):
+    sphere, radius = URIRef(EX + "Sphere"), URIRef(EX + "radius")
+    members = [URIRef(EX + f"sphere{i}") for i in range(3)] + [BNode(f"sphere{i}") for i in range(4)]
+    onto.addN([(member, RDF.type, sphere) for member in members])
+    onto.addN([(member, radius, Literal(i)) for i, member in enumerate(members)])
+    if store == "sparql":
+        monkeypatch.setattr(onto, "_OntologyDatabase__store_type", "generic")
+    for pageSize in [1, 2, 3, 7, 10]:
+        spheres = list(onto.getEntsByClass(sphere, prefetch=[radius], pageSize=pageSize))
+        assert sorted(e.node for e in spheres) == sorted(members), pageSize
+        assert {e.node: e[radius] for e in spheres} == {member: Literal(i) for i, member in enumerate(members)}
+    onto.remove((None, None, sphere))
+    onto.remove((None, radius, None))
+
+
+@pytest.mark.db_entity_testing
+def test_instances_page_query():
+    query = sparql.instancesPageQuery([OWL.Class], RDF.type, after=URIRef(EX + "a"), limit=5)
+    assert "FILTER(isIRI(?s) && STR(?s) >" in query, "STR must not be applied to blank nodes"
+    query = sparql.instancesPageQuery([OWL.Class], RDF.type, limit=5, offset=10)
+    assert "STR(" not in query and "FILTER(isBlank(?s))" in query and "LIMIT 5 OFFSET 10" in query
+
+
+@pytest.mark.db_entity_testing
+def test_entity_update_round_trips(onto, round_trip_budget):
+    entity = onto.makeEntity(URIRef(EX + "crate"), {RDF.type: OWL.Class, URIRef(EX + "color"): Literal("red")})
+    color, tags = URIRef(EX + "color"), URIRef(EX + "tag")
+    with round_trip_budget(onto, 3):  # a DELETE per table (literals, resources) and an INSERT, in one transaction
+        entity[color, tags, tags] = ["green", "big", "heavy"]
+    assert entity[color] == Literal("green")
+    assert set(entity[tags]) == {Literal("big"), Literal("heavy")}
+    with round_trip_budget(onto, 3):
+        entity.color = "blue"
+    assert list(onto.objects(entity.node, color)) == [Literal("blue")]
+    onto.replaceProperties(entity.node, {tags: [], color: [Literal("black"), Literal("white")]})
+    assert list(onto.objects(entity.node, tags)) == []
+    assert set(onto.objects(entity.node, color)) == {Literal("black"), Literal("white")}
+
+
+@pytest.mark.db_entity_testing
+def test_entity_update_single_request(sparql_standin):
+    onto = OntologyAPI(sparql_standin.config(baseURL="http://example.org/entity/fuseki", namespaces={}))
+    entity = onto.makeEntity(URIRef(EX + "crate"), {URIRef(EX + "color"): Literal("red")})
+    updates = sparql_standin.updates
+    entity[URIRef(EX + "color"), URIRef(EX + "size")] = ["green", 3]
+    assert sparql_standin.updates - updates == 1
+    assert list(onto.objects(entity.node, URIRef(EX + "color"))) == [Literal("green")]
+    assert list(onto.objects(entity.node, URIRef(EX + "size"))) == [Literal(3)]
+    onto.destroy("I know what I am doing")
+
+
+@pytest.mark.db_entity_testing
+def test_exist_many(onto, round_trip_budget):
+    references = [URIRef(EX + f"tool{i}") for i in range(6)]
+    onto.addN([(r, RDF.type, OWL.Thing) for r in references[:3]] + [(references[3], URIRef(EX + "color"), Literal("red"))])
+    with round_trip_budget(onto, 3):  # a statement per table
+        assert onto.existMany(references) == [True, True, True, False, False, False]
+    assert onto.existMany(references, anyRecord=True) == [True] * 4 + [False] * 2
+    assert onto.existMany([str(r) for r in references[2:4]]) == [True, False]
+
+    made = onto.makeEntity(references[4:], {RDF.type: OWL.Thing})
+    assert [e.node for e in made] == references[4:]
+    entities = onto.getEntity(references)
+    assert entities[4:] == made, "Entities must be taken from the identity map"
+    assert entities[:4] == [None] * 4
+    onto.remove((references[5], None, None))
+    assert onto.getEntity(references[4:]) == [made[0], None]
@@ -1,2 +1,77 @@
 import pytest
-import sqlite3
\ No newline at end of file
+import sqlite3
+import threading
+from knowl import DBConfig, OntologyAPI, OntologyDatabase
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, OWL
+
+EX = "http://example.org/file#"
+
+
+@pytest.mark.db_file_testing
+def test_file_config(tmp_path):
+    path = str(tmp_path / "onto.db")
+    config = DBConfig.getFileConfig(path, baseURL="http://example.org/file", namespaces={})
+    assert config.path == path
+    assert config.DB_URI == "sqlite+pysqlite:///" + path
+    assert config.getDB_URI() == Literal(config.DB_URI), "No credentials are needed for a file"
+    assert DBConfig.getFileConfig("sqlite:///" + path).path == path
+    assert DBConfig.getInMemoryConfig().path is None
+    assert DBConfig().path is None
+
+
+@pytest.mark.db_file_testing
+def test_file_database(tmp_path):
+    path = str(tmp_path / "onto.db")
+    config = DBConfig.getFileConfig(path, baseURL="http://example.org/file", namespaces={}, sqlite_pragmas={"cache_size": -2000})
+    onto = OntologyAPI(config)
+    assert onto.path == path and not onto.singleConnection
+    with onto.session():
+        for i in range(20):
+            onto.makeEntity(URIRef(EX + f"cube{i}"), {RDF.type: OWL.Class})
+
+    with onto._graph.store.engine.connect() as connection:
+        pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode").lower() == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 5000
+        assert pragma("cache_size") == -2000
+
+    errors = []
+
+    def work(w):
+        try:
+            for i in range(20):
+                onto.add((URIRef(EX + f"cube{i}"), URIRef(EX + f"writer{w}"), Literal(i)))
+                assert (URIRef(EX + f"cube{i}"), RDF.type, OWL.Class) in onto
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+    # the data are in the file
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchall()[0][0] > 0
+    connection.close()
+    assert len(list(onto.triples((None, None, None)))) == 20 + 4 * 20
+    onto.destroy("I know what I am doing")
+
+
+@pytest.mark.db_file_testing
+def test_file_persistence(tmp_path):
+    config = DBConfig.getFileConfig(str(tmp_path / "persistent.db"), baseURL="http://example.org/persistent", namespaces={})
+    triple = (URIRef(EX + "sphere"), RDF.type, OWL.Class)
+    db = OntologyDatabase(config, create=True)
+    db.setup()
+    db.add(triple)
+    db.closelink()
+
+    db = OntologyDatabase(config)
+    db.setup()
+    assert triple in db
+    db.closelink()
@@ -0,0 +1,56 @@
+import pytest
+from knowl import DBConfig, OntologyDatabase
+from knowl import sparql
+from knowl.database import my_bnode_ext
+from rdflib import URIRef, BNode, Literal
+
+EX = "http://example.org/fuseki#"
+GRAPH = URIRef("http://example.org/fuseki")
+
+
+@pytest.fixture
+def fuseki(sparql_stub):
+    config = DBConfig(host="127.0.0.1", port=sparql_stub.server_port, database="ds", store="fuseki",
+                      baseURL=str(GRAPH), namespaces={}, max_update_size=2000)
+    db = OntologyDatabase(config)
+    db.setup()
+    yield db
+    db.closelink()
+
+
+@pytest.mark.db_fuseki_testing
+def test_data_updates_are_size_bounded():
+    triples = [(URIRef(EX + f"s{i}"), URIRef(EX + "p"), Literal(i)) for i in range(100)]
+    updates = list(sparql.dataUpdates("INSERT", triples, GRAPH, maxSize=1000))
+    assert len(updates) > 1
+    assert all(len(update) <= 1000 for update in updates)
+    assert all(update.startswith("INSERT DATA { GRAPH <http://example.org/fuseki> {") for update in updates)
+    assert sum(update.count(" .") for update in updates) == 100
+    update = next(sparql.dataUpdates("DELETE", [(BNode("x"), URIRef(EX + "p"), Literal(1))], nodeToSparql=my_bnode_ext))
+    assert update == f'DELETE DATA {{ <bnode:b@x> <{EX}p> "1"^^<http://www.w3.org/2001/XMLSchema#integer> . }}'
+
+
+@pytest.mark.db_fuseki_testing
+def test_fuseki_batched_writes(fuseki, sparql_stub):
+    triples = [(URIRef(EX + f"s{i}"), URIRef(EX + "p"), Literal(i)) for i in range(100)]
+    fuseki.addN(triples)
+    updates = [body for path, _, body in sparql_stub.requests if path.endswith("/update")]
+    assert 1 < len(updates) < 100, "The triples should be packed into a few size-bounded requests"
+    assert all(len(body) <= 2000 for body in updates)
+    assert all("INSERT DATA" in body for body in updates)
+    assert len({port for _, port, _ in sparql_stub.requests}) == 1, "The requests should reuse a keep-alive connection"
+
+    sparql_stub.requests.clear()
+    fuseki.set((URIRef(EX + "s1"), URIRef(EX + "p"), Literal("one")))
+    assert len(sparql_stub.requests) == 1
+    body = sparql_stub.requests[0][2]
+    assert body.startswith(f"WITH <{GRAPH}> DELETE {{") and "INSERT {" in body and "OPTIONAL" in body
+
+    sparql_stub.requests.clear()
+    with fuseki.session():
+        fuseki.remove((URIRef(EX + "s1"), None, None))
+        fuseki.remove((URIRef(EX + "s2"), URIRef(EX + "p"), Literal(2)))
+        fuseki.add((URIRef(EX + "s3"), URIRef(EX + "q"), Literal(3)))
+    assert len(sparql_stub.requests) == 1, "The session must be flushed in a single request"
+    body = sparql_stub.requests[0][2]
+    assert "DELETE DATA" in body and "DELETE WHERE" in body and "INSERT DATA" in body
@@ -0,0 +1,46 @@
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl.hierarchy import HierarchyIndex
+from rdflib import URIRef
+from rdflib.namespace import RDF, RDFS, OWL
+
+EX = "http://example.org/hierarchy#"
+A, B, C, D = (URIRef(EX + name) for name in "ABCD")
+
+
+@pytest.fixture(scope="module")
+def onto():
+    api = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/hierarchy"))
+    yield api
+    api.destroy("I know what I am doing")
+
+
+@pytest.mark.db_hierarchy_testing
+def test_index_incremental():
+    edges = [(B, A), (C, B)]
+    index = HierarchyIndex(RDFS.subClassOf, lambda: list(edges))
+    assert index.ancestors(C) == {A, B}
+    assert index.descendants(A) == {B, C}
+    index.triplesAdded([(D, RDFS.subClassOf, C), (D, RDF.type, OWL.Class)])
+    assert index.ancestors(D) == {A, B, C}
+    assert index.descendants(A) == {B, C, D}
+    index.triplesRemoved((C, RDFS.subClassOf, None))
+    assert index.ancestors(D) == {C}
+    assert index.descendants(A) == {B}
+    index.triplesAdded([(A, RDFS.subClassOf, D)])  # cycles must not break the closures
+    assert index.ancestors(A) == {C, D}
+
+
+@pytest.mark.db_hierarchy_testing
+def test_ontology_hierarchy(onto):
+    for child, parent in [(B, A), (C, B)]:
+        onto.makeEntity(child, {RDF.type: OWL.Class, RDFS.subClassOf: parent})
+    assert onto.isAncestorOf(A, C)
+    assert not onto.isAncestorOf(C, A)
+    assert onto.descendants(A) == {B, C}
+    onto.add((D, RDFS.subClassOf, C))
+    assert onto.ancestors(D) == {A, B, C}
+    onto.remove((B, RDFS.subClassOf, A))
+    assert not onto.isAncestorOf(A, D)
+    onto.add((URIRef(EX + "size"), RDFS.subPropertyOf, URIRef(EX + "dimension")))
+    assert onto.superProperties(URIRef(EX + "size")) == {URIRef(EX + "dimension")}
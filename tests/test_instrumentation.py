@@ -0,0 +1,89 @@
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl.instrumentation import Instrumentation, prometheusText
+from rdflib import URIRef, Literal, Namespace
+from rdflib.namespace import RDF, OWL
+
+EX = Namespace("http://example.org/instrumented#")
+
+
+@pytest.mark.db_instrumentation_testing
+def test_disabled_by_default():
+    onto = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/instrumented/off"))
+    assert onto.instrumentation is None
+    assert "add" not in vars(onto)
+    onto.destroy("I know what I am doing")
+
+
+@pytest.mark.db_instrumentation_testing
+def test_method_stats():
+    onto = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/instrumented/memory", instrumentation=True))
+    instrumentation = onto.instrumentation
+    assert instrumentation is not None
+    onto.addN([(EX[f"thing{i}"], RDF.type, OWL.Thing) for i in range(5)])
+    assert len(list(onto.subjects(RDF.type, OWL.Thing))) == 5
+    onto.add((EX.thing0, EX.size, Literal(3)))
+    with pytest.raises(Exception):
+        onto.add(("not", "a", "triple"))
+
+    stats = instrumentation.stats()
+    assert stats["addN"]["calls"] == 1
+    assert stats["subjects"]["calls"] == 1 and stats["subjects"]["rows"] == 5
+    assert stats["add"]["calls"] == 2 and stats["add"]["errors"] == 1
+    assert stats["add"]["histogram"][-1] == (float("inf"), 2)
+    assert stats["add"]["seconds"] > 0
+
+    text = prometheusText(stats)
+    assert 'knowl_calls_total{method="addN"} 1' in text
+    assert 'knowl_call_duration_seconds_bucket{method="add",le="+Inf"} 2' in text
+    exported = []
+    instrumentation.addExporter(exported.append)
+    instrumentation.export()
+    assert exported == [stats]
+
+    onto.disableInstrumentation()
+    assert onto.instrumentation is None
+    onto.value(EX.thing0, EX.size)
+    assert "value" not in instrumentation.stats()
+    onto.destroy("I know what I am doing")
+
+
+@pytest.mark.db_instrumentation_testing
+def test_retries_and_transfer(monkeypatch, sparql_standin):
+    onto = OntologyAPI(sparql_standin.config(baseURL="http://example.org/instrumented/fuseki", namespaces={}, retry_backoff=0))
+    instrumentation = onto.enableInstrumentation(Instrumentation())
+    onto.add((EX.cube, RDF.type, OWL.Thing))
+    assert onto.value(EX.cube, RDF.type) == OWL.Thing
+
+    stats = instrumentation.stats()
+    assert stats["add"]["bytesSent"] > 0
+    assert stats["value"]["bytesSent"] > 0 and stats["value"]["bytesReceived"] > 0
+
+    store = onto._OntologyDatabase__store
+    send = store._send
+    failures = [ConnectionResetError("connection dropped")] * 2
+
+    def flakySend(*args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return send(*args, **kwargs)
+
+    monkeypatch.setattr(store, "_send", flakySend)
+    assert onto.value(EX.cube, RDF.type) == OWL.Thing
+    stats = instrumentation.stats()
+    assert stats["value"]["calls"] == 2 and stats["value"]["errors"] == 0
+    assert stats["value"]["retries"] == 2 and stats["value"]["reconnects"] == 2
+    onto.destroy("I know what I am doing")
+
+
+@pytest.mark.db_instrumentation_testing
+def test_cursor():
+    onto = OntologyAPI(DBConfig(store="columnar", baseURL="http://example.org/instrumented/cursor", instrumentation=True))
+    onto.addN([(EX[f"thing{i}"], RDF.type, OWL.Thing) for i in range(10)])
+    with onto.triplesCursor((None, RDF.type, OWL.Thing), pageSize=4) as cursor:
+        assert len(cursor.fetchmany(5)) == 5
+        assert cursor.pages == 2
+    assert cursor.closed
+    stats = onto.instrumentation.stats()
+    assert stats["triplesCursor"]["calls"] == 1 and stats["triplesCursor"]["rows"] == 8
+    onto.destroy("I know what I am doing")
@@ -0,0 +1,147 @@
+import bz2
+import gzip
+import pytest
+from knowl import OntologyDatabase, DBConfig
+from knowl.loader import iterateTriples, batched, guessRDFFormat
+from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.namespace import RDF, OWL
+
+NT_DATA = """<http://example.org/a> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2002/07/owl#Class> .
+# a comment line
+
+<http://example.org/a> <http://example.org/label> "A class"@en .
+_:b1 <http://example.org/refersTo> <http://example.org/a> .
+_:b1 <http://example.org/value> "42"^^<http://www.w3.org/2001/XMLSchema#integer> .
+"""
+
+
+@pytest.fixture
+def ontoDB():
+    db = OntologyDatabase(DBConfig.getInMemoryConfig(baseURL="http://example.org/loader/"), create=True)
+    db.setup()
+    yield db
+    db.destroy("I know what I am doing")
+
+
+@pytest.mark.db_loading_testing
+@pytest.mark.parametrize("extension, opener", [(".nt", open), (".nt.gz", gzip.open), (".nt.bz2", bz2.open)])
+def test_iterate_ntriples(tmp_path, extension, opener):
+    path = str(tmp_path / ("data" + extension))
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write(NT_DATA)
+    assert guessRDFFormat(path) == "nt"
+    triples = list(iterateTriples(path))
+    assert len(triples) == 4
+    reference = Graph().parse(data=NT_DATA, format="nt")
+    assert {t for t in triples if not isinstance(t[0], BNode)} == {t for t in reference if not isinstance(t[0], BNode)}
+    # both triples with the "_:b1" label have to share the same blank node
+    bnodes = {t[0] for t in triples if isinstance(t[0], BNode)}
+    assert len(bnodes) == 1
+
+
+@pytest.mark.db_loading_testing
+def test_batched():
+    assert [len(b) for b in batched(range(7), 3)] == [3, 3, 1]
+    with pytest.raises(ValueError):
+        list(batched(range(7), 0))
+
+
+@pytest.mark.db_loading_testing
+def test_merge_file_streaming(ontoDB, tmp_path):
+    path = str(tmp_path / "data.nt.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(NT_DATA)
+    reports = []
+    loaded = ontoDB.mergeFileIntoDB(path, batchSize=3, progress=reports.append)
+    assert loaded == 4
+    assert len(ontoDB) == 4
+    assert [r.triples for r in reports] == [3, 4]
+    assert reports[-1].batches == 2
+    assert (URIRef("http://example.org/a"), RDF.type, OWL.Class) in ontoDB
+    assert Literal("A class", lang="en") in list(ontoDB.objects(URIRef("http://example.org/a"), URIRef("http://example.org/label")))
+
+
+@pytest.mark.db_loading_testing
+def test_merge_file_not_repeated(ontoDB, tmp_path, monkeypatch):
+    path = str(tmp_path / "data.nt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(NT_DATA)
+    addTriples, batches = ontoDB._addTriples, []
+
+    def flakyAddTriples(triples):
+        batches.append(triples)
+        if len(batches) == 2:
+            raise ConnectionResetError("connection dropped")
+        addTriples(triples)
+
+    monkeypatch.setattr(ontoDB, "_addTriples", flakyAddTriples)
+    with pytest.raises(ConnectionResetError):
+        ontoDB.mergeFileIntoDB(path, batchSize=3)
+    assert len(batches) == 2, "A repeated parse would create new blank nodes"
+    assert len(ontoDB) == 3
+
+
+@pytest.mark.db_loading_testing
+def test_merge_file_non_line_based(ontoDB, tmp_path):
+    path = str(tmp_path / "data.ttl")
+    Graph().parse(data=NT_DATA, format="nt").serialize(destination=path, format="turtle")
+    assert ontoDB.mergeFileIntoDB(path, batchSize=2) == 4
+    assert len(ontoDB) == 4
+
+
+@pytest.mark.db_loading_testing
+@pytest.mark.parametrize("workers", [1, 2])
+def test_merge_files_parallel(ontoDB, tmp_path, workers):
+    big = str(tmp_path / "big.nt")
+    with open(big, "w", encoding="utf-8") as f:
+        for i in range(200):
+            f.write(f"<http://example.org/e{i}> <http://example.org/next> _:n{i % 10} .\n")
+            f.write(f"_:n{i % 10} <http://example.org/index> \"{i % 10}\" .\n")
+    small = str(tmp_path / "small.nt.gz")
+    with gzip.open(small, "wt", encoding="utf-8") as f:
+        f.write(NT_DATA)
+    stats = ontoDB.mergeFilesIntoDB([big, small], workers=workers, batchSize=50, chunkSize=1024)
+    assert stats[big].triples == 400
+    assert stats[big].chunks > 1
+    assert stats[small].triples == 4
+    assert stats[small].chunks == 1
+    # the ten blank nodes of the big file must keep their identity across the chunks
+    nextNodes = set(ontoDB.objects(None, URIRef("http://example.org/next")))
+    assert len(nextNodes) == 10
+    assert len(ontoDB) == 200 + 10 + 4
+
+
+@pytest.mark.db_loading_testing
+@pytest.mark.parametrize("dropIndexes", [False, True])
+def test_bulk_load_matches_addN(tmp_path, dropIndexes):
+    path = str(tmp_path / "data.nt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(NT_DATA)
+    results = []
+    for i, bulk in enumerate([False, True]):
+        db = OntologyDatabase(DBConfig.getInMemoryConfig(baseURL=f"http://example.org/bulk{i}/"), create=True)
+        db.setup()
+        assert db.mergeFileIntoDB(path, bulk=bulk, dropIndexes=dropIndexes) == 4
+        # loading the same data twice must not create duplicates
+        assert db.bulk_load(list(db.triples((None, None, None))), batchSize=2) == 4
+        results.append({t for t in db.triples((None, None, None)) if not isinstance(t[0], BNode)})
+        assert len(db) == 4
+        db.destroy("I know what I am doing")
+    assert results[0] == results[1]
+
+
+@pytest.mark.db_loading_testing
+def test_bulk_load_error_wins(ontoDB, monkeypatch):
+    from knowl import alchemy
+
+    def brokenTriples():
+        yield URIRef("http://example.org/a"), RDF.type, OWL.Class
+        raise ValueError("corrupted input")
+
+    def failingCreateIndexes(indexes, connection):
+        raise RuntimeError("cannot create the indexes")
+
+    monkeypatch.setattr(alchemy, "createIndexes", failingCreateIndexes)
+    with pytest.raises(ValueError, match="corrupted input"):
+        ontoDB.bulk_load(brokenTriples(), batchSize=1, dropIndexes=True)
+    assert len(ontoDB) == 0
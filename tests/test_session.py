@@ -0,0 +1,59 @@
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl.session import ChangeSet
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, OWL
+
+EX = "http://example.org/session#"
+
+
+@pytest.fixture(scope="module")
+def onto():
+    api = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/session"))
+    yield api
+    api.destroy("I know what I am doing")
+
+
+@pytest.mark.db_session_testing
+def test_changeset_coalescing():
+    s, p, q = URIRef(EX + "s"), URIRef(EX + "p"), URIRef(EX + "q")
+    changes = ChangeSet()
+    changes.set((s, p, Literal(1)))
+    changes.set((s, p, Literal(2)))
+    assert changes.removals == [(s, p, None)]
+    assert changes.additions == [(s, p, Literal(2))]
+    changes.add((s, q, Literal(3)))
+    changes.remove((s, q, Literal(3)))
+    assert (s, q, Literal(3)) not in changes.additions
+    changes.remove((s, None, None))
+    # the general pattern makes the more specific removals redundant
+    assert changes.removals == [(s, None, None)]
+    assert changes.additions == []
+
+
+@pytest.mark.db_session_testing
+def test_session_flush(onto):
+    entity = onto.makeEntity(URIRef(EX + "cube"), {RDF.type: OWL.Class})
+    with onto.session() as changes:
+        entity.size = 1
+        entity.size = 2
+        entity[URIRef(EX + "color"), URIRef(EX + "weight")] = ["red", 3]
+        assert onto.value(entity.node, onto.baseNS["size"]) is None, "Changes must not be written before the end of the session"
+        assert len(changes.additions) == 3
+    assert onto.value(entity.node, onto.baseNS["size"]) == Literal(2)
+    assert onto.value(entity.node, URIRef(EX + "color")) == Literal("red")
+    assert onto.value(entity.node, URIRef(EX + "weight")) == Literal(3)
+    assert not onto.inSession
+
+
+@pytest.mark.db_session_testing
+def test_session_rollback(onto):
+    entity = onto.makeEntity(URIRef(EX + "sphere"), {RDF.type: OWL.Class})
+    entity.size = 1
+    with pytest.raises(KeyError):
+        with onto.session():
+            entity.size = 5
+            onto.remove((entity.node, None, None))
+            raise KeyError("abort")
+    assert onto.value(entity.node, onto.baseNS["size"]) == Literal(1)
+    assert entity.exists
@@ -0,0 +1,82 @@
+import pytest
+from knowl import DBConfig, OntologyDatabase
+from knowl import snapshot
+from rdflib import Graph, URIRef, Literal, BNode
+from rdflib.namespace import RDF, OWL, XSD
+
+EX = "http://example.org/shapes#"
+
+TRIPLES = [
+    (URIRef(EX + "cube"), RDF.type, OWL.Class),
+    (URIRef(EX + "cube"), URIRef(EX + "size"), Literal(3)),
+    (URIRef(EX + "cube"), URIRef(EX + "size"), Literal("3", datatype=XSD.string)),
+    (URIRef(EX + "cube"), URIRef(EX + "label"), Literal("kostka", lang="cs")),
+    (URIRef(EX + "cube"), URIRef(EX + "label"), Literal("null\0byte")),
+    (BNode("b1"), URIRef(EX + "partOf"), URIRef(EX + "cube")),
+]
+
+
+def columnarDatabase(**kwargs):
+    db = OntologyDatabase(DBConfig(store="columnar", baseURL="http://example.org/snapshot", namespaces={}, **kwargs))
+    db.setup()
+    return db
+
+
+@pytest.mark.db_snapshot_testing
+def test_snapshot_roundtrip(tmp_path):
+    path = str(tmp_path / "onto.snapshot")
+    source = OntologyDatabase(DBConfig.getInMemoryConfig(baseURL="http://example.org/snapshot", namespaces={"ex": EX}), create=True)
+    source.setup()
+    source.addN(TRIPLES)
+    assert source.save_snapshot(path) == len(TRIPLES)
+
+    db = columnarDatabase()
+    assert db.load_snapshot(path) == len(TRIPLES)
+    assert set(db.triples((None, None, None))) == set(TRIPLES)
+    assert set(db.objects(URIRef(EX + "cube"), URIRef(EX + "size"))) == {Literal(3), Literal("3", datatype=XSD.string)}
+    assert len(list(db.triples((None, URIRef(EX + "missing"), None)))) == 0
+    assert db.graph.namespace_manager.store.namespace("ex") == URIRef(EX)
+
+    # changes after the loading are kept in memory
+    db.add((URIRef(EX + "sphere"), RDF.type, OWL.Class))
+    db.remove((URIRef(EX + "cube"), URIRef(EX + "label"), None))
+    db.graph.store.compact()
+    assert set(db.subjects(RDF.type, OWL.Class)) == {URIRef(EX + "cube"), URIRef(EX + "sphere")}
+    assert len(db) == len(TRIPLES) - 1
+
+    # the snapshot of a mapped database and the loading at the setup
+    second = str(tmp_path / "second.snapshot")
+    db.save_snapshot(second)
+    assert set(columnarDatabase(snapshot=second).triples((None, None, None))) == set(db.triples((None, None, None)))
+
+
+@pytest.mark.db_snapshot_testing
+def test_snapshot_namespaces(tmp_path):
+    path = str(tmp_path / "onto.snapshot")
+    source = columnarDatabase()
+    source.bind("ex", "http://B/")
+    source.save_snapshot(path)
+
+    db = columnarDatabase()
+    db.bind("ex", "http://A/")
+    db.bind("old", "http://old/")
+    db.query("SELECT ?s WHERE { ?s ex:p ?o }")  # cached with the old prefixes
+    db.load_snapshot(path)
+    namespaces = dict(db.graph.namespaces())
+    assert namespaces["ex"] == URIRef("http://B/") and "old" not in namespaces
+    assert URIRef("http://A/") not in namespaces.values()
+    assert db.graph.qname(URIRef("http://B/thing")) == "ex:thing"
+    db.add((URIRef("http://B/s"), URIRef("http://B/p"), Literal(1)))
+    assert [row[0] for row in db.query("SELECT ?s WHERE { ?s ex:p ?o }")] == [URIRef("http://B/s")]
+
+
+@pytest.mark.db_snapshot_testing
+def test_snapshot_errors(tmp_path):
+    path = tmp_path / "broken.snapshot"
+    path.write_bytes(b"not a snapshot at all, just some bytes" * 4)
+    with pytest.raises(ValueError):
+        columnarDatabase().load_snapshot(str(path))
+    db = OntologyDatabase(DBConfig.getInMemoryConfig(), create=True)
+    with pytest.raises(ValueError):
+        db.load_snapshot(str(path))
+    assert snapshot.decodeTerm(snapshot.encodeTerm(Literal("x", lang="en"))) == Literal("x", lang="en")
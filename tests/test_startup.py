@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+from knowl import DBConfig, OntologyAPI
+from rdflib import URIRef
+from rdflib.namespace import RDF, OWL
+
+HEAVY_MODULES = ["sqlalchemy", "rdflib_sqlalchemy", "yaml", "rdflib.extras.infixowl", "asyncio", "concurrent.futures.process"]
+CONNECTION_MODULES = ["knowl.connection", "rdflib.plugins.stores.sparqlstore", "http.client", "xml.etree.ElementTree"]
+
+
+def importedModules(code, modules=HEAVY_MODULES):
+    """Runs the code in a fresh interpreter and returns the list of the given modules imported by it.
+    """
+    script = code + f"\nimport sys\nprint(','.join(m for m in {modules!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return [m for m in output.strip().split(",") if m]
+
+
+@pytest.mark.db_startup_testing
+def test_lazy_imports():
+    assert importedModules("import knowl") == []
+    assert importedModules("import knowl\nknowl.OntologyAPI(knowl.DBConfig(store='columnar')).getEntity") == []
+    assert "sqlalchemy" in importedModules("import knowl\nknowl.OntologyAPI(knowl.DBConfig.getInMemoryConfig()).namespaces")
+
+
+@pytest.mark.db_startup_testing
+def test_lazy_connection_imports():
+    # some rdflib versions import http.client themselves (via urllib.request), only the modules knowl adds are checked
+    byRdflib = importedModules("import rdflib", CONNECTION_MODULES)
+    assert importedModules("import knowl", CONNECTION_MODULES) == byRdflib
+    assert importedModules("import knowl\nknowl.OntologyAPI(knowl.DBConfig(store='columnar')).getEntity", CONNECTION_MODULES) == byRdflib
+
+
+@pytest.mark.db_startup_testing
+def test_deferred_connection():
+    onto = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/startup"))
+    store = onto._OntologyDatabase__store
+    assert store.engine is None, "The connection should be opened on the first use"
+    onto.makeEntity(URIRef("http://example.org/startup#cube"), {RDF.type: OWL.Class})
+    assert store.engine is not None
+    assert "base" in onto.namespaces
+    assert onto.existEntity(URIRef("http://example.org/startup#cube"))
+    onto.destroy("I know what I am doing")
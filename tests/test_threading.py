@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from knowl import DBConfig, OntologyAPI
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, OWL
+
+EX = "http://example.org/threading#"
+WRITERS = 4
+READERS = 4
+ENTITIES = 50
+
+
+@pytest.fixture(scope="module")
+def config():
+    return DBConfig.getInMemoryConfig(baseURL="http://example.org/threading", namespaces={})
+
+
+@pytest.mark.db_threading_testing
+def test_singleton_is_shared(config):
+    with ThreadPoolExecutor(8) as executor:
+        apis = list(executor.map(lambda _: OntologyAPI(config), range(16)))
+    assert all(api is apis[0] for api in apis)
+
+
+@pytest.mark.db_threading_testing
+def test_concurrent_readers_and_writers(config):
+    onto = OntologyAPI(config)
+    cube = URIRef(EX + "Cube")
+    onto.makeEntity(cube, {RDF.type: OWL.Class})
+    errors = []
+    done = threading.Event()
+
+    def writer(w):
+        try:
+            for i in range(ENTITIES):
+                entity = onto.makeEntity(URIRef(EX + f"cube_{w}_{i}"), {RDF.type: cube})
+                entity.size = i
+                with onto.session():
+                    entity.color = "red"
+                    entity.weight = w
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            while not done.is_set():
+                for entity in onto.getEntsByClass(cube, prefetch=True, pageSize=7):
+                    assert entity.type == cube
+                list(onto.triples((None, RDF.type, cube)))
+                onto.value(URIRef(EX + "cube_0_0"), onto.baseNS["size"])
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(READERS)]
+    writers = [threading.Thread(target=writer, args=(w,)) for w in range(WRITERS)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors, errors
+    entities = list(onto.getEntsByClass(cube))
+    assert len(entities) == WRITERS * ENTITIES
+    assert len({id(entity) for entity in entities}) == WRITERS * ENTITIES, "The identity map must not contain duplicates"
+    for w in range(WRITERS):
+        assert onto.value(URIRef(EX + f"cube_{w}_{ENTITIES - 1}"), onto.baseNS["weight"]) == Literal(w)
+    onto.destroy("I know what I am doing")
+
+
+@pytest.mark.db_threading_testing
+def test_lookups_do_not_wait_for_other_lookups(config, monkeypatch):
+    onto = OntologyAPI(config)
+    slow, fast = URIRef(EX + "slow"), URIRef(EX + "fast")
+    onto.makeEntity(fast, {RDF.type: OWL.Thing})
+    release, started = threading.Event(), threading.Event()
+    existEntity = onto.existEntity
+
+    def slowExistEntity(reference, anyRecord=False):
+        if reference == slow:  # simulates a slow database round trip
+            started.set()
+            release.wait(5)
+        return existEntity(reference, anyRecord)
+
+    monkeypatch.setattr(onto, "existEntity", slowExistEntity)
+    thread = threading.Thread(target=onto.getEntity, args=(slow,))
+    thread.start()
+    try:
+        assert started.wait(5)
+        with ThreadPoolExecutor(1) as executor:
+            assert executor.submit(onto.getEntity, fast).result(timeout=2).node == fast
+    finally:
+        release.set()
+        thread.join()
+    onto.destroy("I know what I am doing")
@@ -0,0 +1,71 @@
+import pytest
+from knowl import DBConfig, OntologyAPI
+from knowl.tracing import RoundTripTracer, shapeOf
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDF, OWL
+
+EX = Namespace("http://example.org/traced#")
+
+
+@pytest.fixture
+def onto():
+    onto = OntologyAPI(DBConfig.getInMemoryConfig(baseURL="http://example.org/traced"))
+    yield onto
+    onto.destroy("I know what I am doing")
+
+
+def makePeople(onto, count=5):
+    return [onto.makeEntity(EX[f"person{i}"], {RDF.type: OWL.Thing, EX.name: Literal(f"name{i}")}) for i in range(count)]
+
+
+@pytest.mark.db_tracing_testing
+def test_shape():
+    assert shapeOf('ASK { <http://a#x> ?p "some \\"text\\"" }') == shapeOf("ASK {  <http://a#y> ?p 'other' }") == "ASK { ? ?p ? }"
+    assert shapeOf("SELECT x FROM t WHERE id IN (?, ?, ?) AND n > 10") == shapeOf("SELECT x FROM t WHERE id IN (?) AND n > 2")
+    assert shapeOf("SELECT ?s1 WHERE { ?s1 ?p ?o }") == "SELECT ?s1 WHERE { ?s1 ?p ?o }"
+
+
+@pytest.mark.db_tracing_testing
+def test_repeated_queries(onto):
+    people = makePeople(onto)
+    names = []
+    with RoundTripTracer(onto) as tracer:
+        for person in people:
+            names.append(person.name)
+    assert names == [Literal(f"name{i}") for i in range(5)]
+    assert len(tracer) == 5
+    (callSite, roundTrips), = tracer.byCallSite().items()
+    assert callSite.startswith(__file__) and "test_repeated_queries" in callSite
+    assert {roundTrip.operation for roundTrip in roundTrips} == {"OntoEntity.__getattr__"}
+    (site, operation, shape, count), = tracer.repeated()
+    assert site == callSite and count == 5 and shape.startswith("SELECT")
+    assert "possible N+1 queries" in tracer.report()
+
+    onto.value(EX.person0, EX.name)
+    assert len(tracer) == 5, "The tracer should be inactive outside of the block"
+
+
+@pytest.mark.db_tracing_testing
+def test_budget(onto, round_trip_budget):
+    people = makePeople(onto, 3)
+    with round_trip_budget(onto, 3):
+        for person in people:
+            person.name
+    with pytest.raises(AssertionError, match="exceed the budget of 2"):
+        with round_trip_budget(onto, 2):
+            for person in people:
+                person.name
+
+
+@pytest.mark.db_tracing_testing
+def test_sparql_requests(sparql_standin):
+    onto = OntologyAPI(sparql_standin.config(baseURL="http://example.org/traced/fuseki", namespaces={}))
+    people = makePeople(onto, 3)
+    queries = sparql_standin.queries
+    with RoundTripTracer(onto) as tracer:
+        for person in people:
+            person.exists
+    assert len(tracer) == sparql_standin.queries - queries == 3
+    assert [roundTrip.operation for roundTrip in tracer.roundTrips] == ["OntoEntity.exists"] * 3
+    assert tracer.repeated()[0][3] == 3
+    onto.destroy("I know what I am doing")